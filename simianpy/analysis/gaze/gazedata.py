@@ -8,7 +8,6 @@ import xarray as xr
 from numpy.typing import ArrayLike
 
 from simianpy.misc import binary_digitize
-from simianpy.analysis.gaze.trialgazedata import TrialGazeData
 
 
 query_fmt = Mapping[Literal["min", "max"], Number]
@@ -322,6 +321,8 @@ class GazeData:
         trial_metadata: Optional[pd.DataFrame] = None,
         time_step: Optional[float] = None,
     ):
+        from simianpy.analysis.gaze.trialgazedata import TrialGazeData
+
         if isinstance(event_timestamps, pd.Series):
             if event_labels is None:
                 event_labels = event_timestamps.index.to_numpy()
@@ -465,13 +466,32 @@ class GazeData:
         return gd
 
     @classmethod
-    def from_monkeylogic(cls, path: str, align_event: Optional[int]=None):
+    def from_monkeylogic(
+        cls,
+        path: str,
+        align_event: Optional[int] = None,
+        trial_filter: Optional[Callable[[Mapping], bool]] = None,
+        pbar: bool = True,
+    ):
         """Load gaze data from a MonkeyLogic .gaze file
 
+        Trials are streamed from the file into preallocated, typed buffers
+        (float64 time, float32 position, int32 trialid) which grow geometrically
+        as needed, so only one trial is held in memory at a time.
+
         Parameters
         ----------
         path : str
             The path to the .gaze file
+        align_event : int, optional
+            If provided, the time of each trial is expressed relative to the first
+            occurrence of this marker instead of the absolute trial start time,
+            by default None
+        trial_filter : Callable[[Mapping], bool], optional
+            Called with each trial dict as yielded by `mlread.load`; trials for which
+            it returns False are skipped, by default None
+        pbar : bool, optional
+            Whether to display a progress bar while reading trials, by default True
 
         Returns
         -------
@@ -482,33 +502,44 @@ class GazeData:
 
         from simianpy.io.monkeylogic.mlread import load
 
-        data = load(Path(path), include_user_vars=False)
-
-        if align_event is None:
-            eyedata = np.concatenate(
-                [
-                    np.c_[
-                        np.repeat(trial["trialid"], trial["eye"].shape[-1]),
-                        np.arange(trial["eye"].shape[-1]) + trial["start_time"],
-                        trial["eye"].T,
-                    ]
-                    for trial in data
-                ]
-            )
-        else:
-            eyedata = np.concatenate(
-                [
-                    np.c_[
-                        np.repeat(trial["trialid"], trial["eye"].shape[-1]),
-                        np.arange(trial["eye"].shape[-1]) - trial["timestamps"][trial["markers"]==align_event][0],
-                        trial["eye"].T,
-                    ]
-                    for trial in data
-                ]
-            )
-        trialid = eyedata[:, 0].astype('int16')
-        time = eyedata[:, 1] / 1000  # convert to seconds
-        eye = eyedata[:, 2:]
+        data = load(Path(path), include_user_vars=False, pbar=pbar)
+
+        capacity = 0
+        n_samples = 0
+        time = np.empty(0, dtype=np.float64)
+        eye = np.empty((0, 2), dtype=np.float32)
+        trialid = np.empty(0, dtype=np.int32)
+        for trial in data:
+            if trial_filter is not None and not trial_filter(trial):
+                continue
+            trial_eye = np.asarray(trial["eye"])
+            n_trial = trial_eye.shape[-1]
+            if n_samples + n_trial > capacity:
+                capacity = max(2 * capacity, n_samples + n_trial, 1 << 16)
+                time = _grow(time, capacity, n_samples)
+                eye = _grow(eye, capacity, n_samples, n_cols=trial_eye.shape[0])
+                trialid = _grow(trialid, capacity, n_samples)
+            if align_event is None:
+                offset = trial["start_time"]
+            else:
+                offset = -trial["timestamps"][trial["markers"] == align_event][0]
+            sl = slice(n_samples, n_samples + n_trial)
+            np.add(np.arange(n_trial, dtype=np.float64), offset, out=time[sl])
+            time[sl] /= 1000  # convert to seconds
+            eye[sl] = trial_eye.T
+            trialid[sl] = trial["trialid"]
+            n_samples += n_trial
+
+        # release the unused tail of the buffers in place
+        for buffer in (time, eye, trialid):
+            buffer.resize((n_samples, *buffer.shape[1:]), refcheck=False)
         gaze = GazeData.from_arrays(time, eye, ["eyeh", "eyev"], trialid=trialid)
         return gaze
 
+
+def _grow(buffer: np.ndarray, capacity: int, n_valid: int, n_cols: Optional[int] = None):
+    """Return a buffer with room for `capacity` rows holding the first `n_valid` rows of `buffer`"""
+    shape = (capacity,) if buffer.ndim == 1 else (capacity, n_cols or buffer.shape[1])
+    grown = np.empty(shape, dtype=buffer.dtype)
+    grown[:n_valid] = buffer[:n_valid]
+    return grown
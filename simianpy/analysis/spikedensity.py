@@ -153,8 +153,10 @@ class SDF(GlobalOptimizationMixin):
         Computes mean and error terms for a spike density function across multiple trials
         Loops through using the appropriate parse_single_trial_* function as specified by 'input'
         Returns pd.DataFrame(index=SDF.timestamps,columns=['mean','variance','se'] if variance else ['mean'])
-    SDF.compute_all(data, input='timestamps')
+    SDF.compute_all(data, input='timestamps', method='binned')
         Computes individual spike density functions across multiple trials/units
+        method='events' adds the window at each spike time instead of binning and
+        convolving, which is much faster for sparse spiking
         
 
     References
@@ -285,7 +287,9 @@ class SDF(GlobalOptimizationMixin):
             sdf["se"] = (sdf["variance"] / n) ** 0.5
         return sdf
 
-    def compute_all(self, data, input="timestamps"):
+    def compute_all(self, data, input="timestamps", method="binned"):
+        if method == "events":
+            return self._compute_all_events(data, input)
         if input == "timestamps":
             data = self.xp.array([self._binarize(trial) for trial in data])
         elif input == "binary":
@@ -297,3 +301,35 @@ class SDF(GlobalOptimizationMixin):
         if self.output_units == "rate":
             sdf *= self.sampling_rate
         return sdf
+
+    def _compute_all_events(self, data, input="timestamps"):
+        """compute_all from spike times directly: the window is added at each
+        spike's time instead of convolving the binned spike trains (see
+        simianpy.analysis.spiketrain.kerneldensity). Runs on the CPU."""
+        from simianpy.analysis.spiketrain.kerneldensity import (
+            kernel_density,
+            sampled_kernel,
+        )
+
+        if input != "timestamps" or not isinstance(
+            self.convolve, simianpy.signal.Convolve
+        ):
+            raise ValueError(
+                "method='events' requires input='timestamps' and a window (not convolve)"
+            )
+        trials = [np.asarray(trial, dtype=float).ravel() for trial in data]
+        rows = np.repeat(np.arange(len(trials)), [trial.size for trial in trials])
+        spike_times = np.concatenate(trials) if trials else np.array([])
+        bins = np.asarray(self.hist_bins)
+        in_bins = (spike_times >= bins[0]) & (spike_times <= bins[-1])
+        window = self.convolve.window.values
+        # lags of the window samples as applied by convolve(..., 'same')
+        lags = (np.arange(window.size) - (window.size - 1) // 2) * (1e3 / self.sampling_rate)
+        kernel, support = sampled_kernel(window, lags)
+        timestamps = self.timestamps.get() if self.use_gpu else np.asarray(self.timestamps)
+        sdf = kernel_density(
+            spike_times[in_bins], rows[in_bins], len(trials), timestamps, kernel, support
+        )
+        if self.output_units == "rate":
+            sdf *= self.sampling_rate
+        return sdf
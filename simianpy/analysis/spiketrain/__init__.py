@@ -3,6 +3,9 @@ from collections import namedtuple
 import numpy as np
 import scipy.stats
 
+from .isi import isi_statistics
+from .sparsepsth import SparsePSTH
+from .spikeindex import SpikeIndex
 from .spiketrainset import SpikeTrainSet
 # from .psth_factory import psth_factory
 
@@ -19,7 +22,7 @@ def CV(isi):
 
 def LV(isi):
     isi = np.asarray(isi)
-    lv = (3 * (isi.size - 2)) * (
+    lv = (3 / (isi.size - 1)) * (
         ((isi[:-1] - isi[1:]) / (isi[:-1] + isi[1:])) ** 2
     ).sum()
     return lv
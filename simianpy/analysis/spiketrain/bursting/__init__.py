@@ -0,0 +1 @@
+from .poisson_burst_detection import detect_bursts, poisson_surprise_burst_detection
@@ -1,24 +1,91 @@
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
+import pandas as pd
+import scipy.special
 import scipy.stats
 
+MAX_SPIKES_IN_BURST_TO_EVALUATE = 10
+
 
 def drop_overlapping(bursts):
+    """Merge each burst into the previous one when they overlap
+
+    A burst overlaps the previous one if it starts before (or when) the
+    previous one ends; the merged burst ends where the later one ends. Since
+    that only compares neighbours, the merge is a single sweep over the
+    onsets and offsets.
+    """
+    if not bursts:
+        return []
+    onsets = np.array([burst["onset"] for burst in bursts])
+    offsets = np.array([burst["offset"] for burst in bursts])
+    starts = np.flatnonzero(np.r_[True, onsets[1:] > offsets[:-1]])
+    ends = np.r_[starts[1:], len(bursts)] - 1
     bursts_filtered = []
-    if bursts:
-        bursts_filtered.append(bursts.pop(0))
-        while bursts:
-            next_burst = bursts.pop(0)
-            if bursts_filtered[-1]["offset"] >= next_burst["onset"]:
-                bursts_filtered[-1]["offset"] = next_burst["offset"]
-            else:
-                bursts_filtered.append(next_burst)
+    for start, end in zip(starts, ends):
+        burst = bursts[start]
+        burst["offset"] = bursts[end]["offset"]
+        bursts_filtered.append(burst)
     return bursts_filtered
 
 
+def _surprise(spike_train, onsets, offsets, average_rate):
+    """-poisson.logsf(offsets - onsets - 1, rate x duration) for arrays of windows
+
+    Same arithmetic as scipy.stats.poisson.logsf (log of pdtrc at the floored
+    count, 0 for negative counts) without its per-call overhead.
+    """
+    onsets, offsets = np.broadcast_arrays(np.atleast_1d(onsets), np.atleast_1d(offsets))
+    count = (offsets - onsets - 1).astype(np.float64)
+    mu = (spike_train[offsets] - spike_train[onsets]) * average_rate
+    with np.errstate(divide="ignore"):
+        logsf = np.log(scipy.special.pdtrc(np.floor(count), mu))
+    logsf[count < 0] = 0.0
+    logsf[~(mu >= 0)] = np.nan
+    return -logsf
+
+
 def poisson_surprise_burst_detection(
-    spike_train, time_range=None, minimum_burst_spikes=3, criterion=0.05
+    spike_train,
+    time_range=None,
+    minimum_burst_spikes=3,
+    criterion=0.05,
+    method="blocks",
+    block_size=32,
 ):
-    max_spikes_in_burst_to_evaluate = 10
+    """Detect bursts with the Poisson surprise method (Legendy & Salcman, 1985)
+
+    Parameters
+    ----------
+    spike_train : array_like
+        Spike times
+    time_range : tuple or None, optional
+        (start, end) over which the average rate is computed, by default the
+        range of the spike times
+    minimum_burst_spikes : int, optional
+        By default 3
+    criterion : float, optional
+        Bursts must have a Poisson probability below criterion, by default 0.05
+    method : {'blocks', 'loop'}, optional
+        'blocks' (default) evaluates the surprise of blocks of candidate
+        windows at once, 'loop' calls scipy.stats.poisson.logsf for each
+        window. Both give identical bursts
+    block_size : int, optional
+        Number of burst extensions evaluated at once by 'blocks', by default 32
+
+    Returns
+    -------
+    bursts : list of dict
+        'onset' and 'offset' times and 'surprise' of each burst
+    """
+    if method == "blocks":
+        return _poisson_surprise_blocks(
+            spike_train, time_range, minimum_burst_spikes, criterion, block_size
+        )
+    if method != "loop":
+        raise ValueError(f"method must be 'blocks' or 'loop', not {method!r}")
+    max_spikes_in_burst_to_evaluate = MAX_SPIKES_IN_BURST_TO_EVALUATE
     bursts = []
     spike_train = np.sort(spike_train)
     n_spikes = spike_train.size
@@ -142,3 +209,178 @@ def poisson_surprise_burst_detection(
     #     else:
     #         activation['activation_offset'] = activation['offset']
     return bursts
+
+
+def _poisson_surprise_blocks(
+    spike_train, time_range, minimum_burst_spikes, criterion, block_size
+):
+    """poisson_surprise_burst_detection(method='loop') with vectorized surprise
+
+    Follows the same state machine: idle spikes are skipped by searching the
+    precomputed burst candidates, extensions evaluate the surprise of
+    block_size offsets at once and trimming evaluates all onsets at once.
+    """
+    bursts = []
+    spike_train = np.sort(spike_train)
+    n_spikes = spike_train.size
+    if minimum_burst_spikes < 2:
+        raise ValueError("minimum_burst_spikes must be 2 or greater")
+    if n_spikes <= minimum_burst_spikes:
+        return bursts
+
+    if time_range is None:
+        start_time, end_time = spike_train[0], spike_train[-1]
+    else:
+        start_time, end_time = time_range
+    duration = end_time - start_time
+    average_rate = n_spikes / duration
+    instant_rate = minimum_burst_spikes / (
+        spike_train[(minimum_burst_spikes - 1) :]
+        - spike_train[: -(minimum_burst_spikes - 1)]
+    )
+    n_candidates = instant_rate.size
+    candidates = np.flatnonzero(instant_rate >= average_rate / 2)
+    threshold = -np.log(criterion)
+
+    spike_idx = 0
+    while True:
+        next_candidate = np.searchsorted(candidates, spike_idx)
+        if next_candidate == candidates.size:
+            break
+        onset = int(candidates[next_candidate])
+        offset = onset + minimum_burst_spikes
+        extend_forward, extend_forward_surprise = 0, 0
+        spike_idx = offset + 1
+
+        # extend the burst forward until MAX_SPIKES_IN_BURST_TO_EVALUATE
+        # spikes in a row do not increase its surprise
+        surprise_new = None
+        while spike_idx < n_candidates and surprise_new is None:
+            stop = min(spike_idx + block_size, n_candidates)
+            values = _surprise(spike_train, onset, np.arange(spike_idx, stop), average_rate)
+            for value in values:
+                if extend_forward < MAX_SPIKES_IN_BURST_TO_EVALUATE:
+                    if value > extend_forward_surprise:
+                        offset = spike_idx
+                        extend_forward = 0
+                        extend_forward_surprise = value
+                    else:
+                        extend_forward += 1
+                    spike_idx += 1
+                else:
+                    surprise_new = value
+                    break
+
+        if surprise_new is None:
+            # evaluate last burst if it was missed
+            if offset >= n_spikes:
+                offset = n_spikes - 1
+            surprise = _surprise(spike_train, onset, offset, average_rate)[0]
+            if surprise > threshold and offset - onset > minimum_burst_spikes:
+                bursts.append(dict(onset=onset, offset=offset, surprise=surprise))
+            break
+
+        # trim onsets while the surprise increases
+        onsets = np.arange(onset + 1, offset)
+        trimmed = _surprise(spike_train, onsets, offset, average_rate)
+        previous = np.r_[surprise_new, trimmed[:-1]]
+        stops = np.flatnonzero(~(trimmed < previous))
+        if stops.size:
+            onset, surprise = int(onsets[stops[0]]), trimmed[stops[0]]
+        elif onsets.size:
+            onset, surprise = offset, trimmed[-1]
+        else:
+            onset, surprise = onset + 1, surprise_new
+        if surprise > threshold and offset - onset > minimum_burst_spikes:
+            bursts.append(dict(onset=onset, offset=offset, surprise=surprise))
+        else:
+            spike_idx = onset
+        spike_idx += 1
+
+    bursts = drop_overlapping(bursts)
+    for burst in bursts:
+        burst["onset"] = spike_train[burst["onset"]]
+        burst["offset"] = spike_train[burst["offset"]]
+    return bursts
+
+
+def _detect_unit_bursts(trains, time_range, minimum_burst_spikes, criterion):
+    """Bursts of each (row, spike_train) of a unit, as rows of a burst table"""
+    rows = []
+    for row, spike_train in trains:
+        for burst in poisson_surprise_burst_detection(
+            spike_train, time_range, minimum_burst_spikes, criterion
+        ):
+            rows.append((*row, burst["onset"], burst["offset"], burst["surprise"]))
+    return rows
+
+
+def detect_bursts(
+    spiketrainset,
+    time_range="window",
+    minimum_burst_spikes=3,
+    criterion=0.05,
+    n_jobs=None,
+):
+    """Poisson surprise bursts of every unit and trial of a SpikeTrainSet
+
+    Each unit's trains (one per trial, and epoch if any) are processed by a
+    worker process.
+
+    Parameters
+    ----------
+    spiketrainset : SpikeTrainSet
+    time_range : 'window', tuple or None, optional
+        Range over which the average rate of each train is computed, by
+        default the window of the SpikeTrainSet. If None, the range of the
+        spikes of each train
+    minimum_burst_spikes, criterion :
+        See poisson_surprise_burst_detection
+    n_jobs : int or None, optional
+        Number of worker processes. If None, uses the number of CPUs. If 1,
+        runs in this process
+
+    Returns
+    -------
+    bursts : pd.DataFrame
+        One row per burst with columns 'unitid', 'trialid', ('epoch',)
+        'onset', 'offset' and 'surprise'
+    """
+    if isinstance(time_range, str) and time_range == "window":
+        time_range = tuple(spiketrainset.window)
+    keys = [spiketrainset.spike_times]
+    columns = ["unitid", "trialid"]
+    labels = [spiketrainset.unitids, spiketrainset.trialids]
+    if spiketrainset.epochids is not None:
+        keys.append(spiketrainset.epochids)
+        columns.append("epoch")
+        if spiketrainset.epoch_names is not None:
+            labels.append(np.take(spiketrainset.epoch_names, spiketrainset.epochids))
+        else:
+            labels.append(spiketrainset.epochids)
+    keys.extend([spiketrainset.trialids, spiketrainset.unitids])
+    order = np.lexsort(keys)
+    spike_times = np.asarray(spiketrainset.spike_times)[order]
+    labels = [np.asarray(label)[order] for label in labels]
+    changes = np.zeros(spike_times.size, dtype=bool)
+    for label in labels:
+        changes[1:] |= label[1:] != label[:-1]
+    starts = np.flatnonzero(np.r_[True, changes[1:]]) if spike_times.size else np.array([], dtype=int)
+    stops = np.r_[starts[1:], spike_times.size]
+
+    # one task per unit
+    units = {}
+    for start, stop in zip(starts, stops):
+        row = tuple(label[start].item() if hasattr(label[start], "item") else label[start] for label in labels)
+        units.setdefault(row[0], []).append((row, spike_times[start:stop]))
+    args = (time_range, minimum_burst_spikes, criterion)
+    if n_jobs == 1:
+        results = [_detect_unit_bursts(trains, *args) for trains in units.values()]
+    else:
+        with ProcessPoolExecutor(n_jobs) as pool:
+            futures = [pool.submit(_detect_unit_bursts, trains, *args) for trains in units.values()]
+            results = [future.result() for future in futures]
+    return pd.DataFrame(
+        [row for rows in results for row in rows],
+        columns=columns + ["onset", "offset", "surprise"],
+    )
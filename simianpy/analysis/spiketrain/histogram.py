@@ -0,0 +1,118 @@
+"""Histogram engine for spike trains
+
+Bins spikes by integer codes (trial, unit, epoch...) and time with np.bincount
+into a preallocated integer array, instead of np.histogramdd on a float copy
+of every coordinate.
+"""
+from typing import Sequence, Tuple
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+
+def digitize_times(spike_times: ArrayLike, time_bins: ArrayLike) -> np.ndarray:
+    """Index of the time bin of each spike, -1 outside of the bins
+
+    Bins are half open [left, right) except for the last one, which includes
+    its right edge, as in np.histogram. For uniform bins the index is computed
+    arithmetically and corrected against the edges, so the result matches
+    np.searchsorted exactly.
+
+    Parameters
+    ----------
+    spike_times : array_like
+    time_bins : array_like
+        Monotonically increasing bin edges
+
+    Returns
+    -------
+    idx : np.ndarray of np.intp
+    """
+    spike_times = np.asarray(spike_times)
+    edges = np.asarray(time_bins, dtype=np.float64)
+    n_bins = edges.size - 1
+    if n_bins < 1:
+        raise ValueError("time_bins must have at least two edges")
+    step = (edges[-1] - edges[0]) / n_bins
+    if step > 0 and np.allclose(np.diff(edges), step, rtol=1e-9, atol=0):
+        idx = np.floor((spike_times - edges[0]) / step)
+        idx[np.isnan(idx)] = 0
+        np.clip(idx, 0, n_bins - 1, out=idx)
+        idx = idx.astype(np.intp)
+        idx -= spike_times < edges[idx]
+        idx += spike_times >= edges[np.minimum(idx + 1, n_bins)]
+    else:
+        idx = np.searchsorted(edges, spike_times, side="right") - 1
+    # the last edge belongs to the last bin
+    idx[spike_times == edges[-1]] = n_bins - 1
+    idx[(spike_times < edges[0]) | (spike_times > edges[-1]) | np.isnan(spike_times)] = -1
+    return idx
+
+
+def linear_index(codes: Sequence[np.ndarray], shape: Sequence[int]) -> np.ndarray:
+    """Combine per-dimension codes into a C-order linear index, -1 where any code is out of range"""
+    linear = np.zeros(len(codes[0]) if len(codes) else 0, dtype=np.int64)
+    valid = np.ones(linear.size, dtype=bool)
+    for code, size in zip(codes, shape):
+        code = np.asarray(code)
+        valid &= (code >= 0) & (code < size)
+        linear *= size
+        linear += code
+    linear[~valid] = -1
+    return linear
+
+
+def bincount_nd(
+    codes: Sequence[np.ndarray],
+    shape: Tuple[int, ...],
+    dtype=np.int32,
+    max_cells: int = 1 << 26,
+) -> np.ndarray:
+    """Count occurrences of each combination of integer codes
+
+    Equivalent to np.histogramdd of the codes with unit bins, but the codes
+    are combined into a linear index and counted with np.bincount. Outputs
+    larger than max_cells are counted in slices of the linear index (after a
+    sort) so the int64 bincount buffer stays bounded.
+
+    Parameters
+    ----------
+    codes : sequence of np.ndarray
+        One array of codes per dimension, each in range(shape[dim]).
+        Negative codes are ignored
+    shape : tuple of int
+    dtype : np.dtype, optional
+        dtype of the output, by default np.int32. Use np.uint16 to save memory
+        when counts per bin are known to be small (checked)
+    max_cells : int, optional
+        Size of the slices counted at once, by default 2**26
+
+    Returns
+    -------
+    counts : np.ndarray
+        Array of the given shape and dtype
+    """
+    shape = tuple(int(size) for size in shape)
+    n_cells = int(np.prod(shape))
+    linear = linear_index(codes, shape)
+    linear = linear[linear >= 0]
+
+    counts = np.zeros(n_cells, dtype=dtype)
+    max_count = np.iinfo(dtype).max if np.issubdtype(dtype, np.integer) else None
+
+    def _store(start, stop, values):
+        binned = np.bincount(values - start, minlength=stop - start)
+        if max_count is not None and binned.size and binned.max() > max_count:
+            raise OverflowError(f"spike counts exceed the range of {np.dtype(dtype)}")
+        counts[start:stop] = binned
+
+    if n_cells <= max_cells:
+        _store(0, n_cells, linear)
+    else:
+        linear.sort()
+        for start in range(0, n_cells, max_cells):
+            stop = min(start + max_cells, n_cells)
+            lo, hi = np.searchsorted(linear, [start, stop])
+            if hi > lo:
+                _store(start, stop, linear[lo:hi])
+    return counts.reshape(shape)
@@ -0,0 +1,152 @@
+"""Inter-spike interval statistics of many spike trains at once
+
+Spikes are sorted by train and time once; ISIs are segmented diffs within
+each train and per-train statistics are reductions over contiguous segments
+(np.add.reduceat), instead of a Python loop calling ISI/CV/LV/gamma per train.
+"""
+from typing import Dict, Optional
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+
+def segment_isi(spike_times: ArrayLike, trains: ArrayLike, assume_sorted: bool = False):
+    """ISIs within each train
+
+    Parameters
+    ----------
+    spike_times : array_like
+    trains : array_like of int
+        Train (e.g. unit x trial code) of each spike
+    assume_sorted : bool, optional
+        If True, spikes are already sorted by train then time
+
+    Returns
+    -------
+    isi : np.ndarray
+        Sorted by train, then time
+    isi_trains : np.ndarray
+        Train of each ISI
+    """
+    spike_times = np.asarray(spike_times, dtype=np.float64)
+    trains = np.asarray(trains, dtype=np.int64)
+    if not assume_sorted:
+        order = np.lexsort((spike_times, trains))
+        spike_times, trains = spike_times[order], trains[order]
+    same = trains[1:] == trains[:-1]
+    return np.diff(spike_times)[same], trains[1:][same]
+
+
+def _segments(values: np.ndarray, groups: np.ndarray, n_groups: int):
+    """Sum of values within runs of equal (sorted) groups, scattered to n_groups"""
+    sums = np.zeros(n_groups)
+    if values.size:
+        starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+        sums[groups[starts]] = np.add.reduceat(values, starts)
+    return sums
+
+
+def gamma_shape(mean: ArrayLike, mean_log: ArrayLike, n_newton: int = 3) -> np.ndarray:
+    """Maximum likelihood shape of gamma distributions (location 0)
+
+    Uses the closed form approximation of the shape from
+    s = log(mean) - mean(log(x)), refined with a few Newton steps (Minka, 2002).
+    NaN where s is not positive and finite (fewer than two distinct values).
+    """
+    import scipy.special
+
+    s = np.log(np.asarray(mean, dtype=np.float64)) - np.asarray(mean_log, dtype=np.float64)
+    valid = np.isfinite(s) & (s > 0)
+    shape = np.full(s.shape, np.nan)
+    s = s[valid]
+    k = (3 - s + np.sqrt((s - 3) ** 2 + 24 * s)) / (12 * s)
+    for _ in range(n_newton):
+        k = 1 / (
+            1 / k
+            + (np.log(k) - scipy.special.digamma(k) - s)
+            / (k**2 * (1 / k - scipy.special.polygamma(1, k)))
+        )
+    shape[valid] = k
+    return shape
+
+
+def isi_statistics(
+    spike_times: ArrayLike,
+    trains: ArrayLike,
+    n_trains: Optional[int] = None,
+    groups: Optional[ArrayLike] = None,
+    n_groups: Optional[int] = None,
+    burst_isi: float = 0.005,
+    assume_sorted: bool = False,
+) -> Dict[str, np.ndarray]:
+    """ISI statistics of every train, or of groups of trains pooled
+
+    Parameters
+    ----------
+    spike_times : array_like
+    trains : array_like of int
+        Train of each spike, in range(n_trains). ISIs are taken within trains
+    n_trains : int or None
+        By default max(trains) + 1
+    groups : array_like of int or None
+        Group of each train (e.g. its unit, to pool the trials of a unit).
+        Negative groups are dropped. If None, each train is its own group
+    n_groups : int or None
+        By default max(groups) + 1
+    burst_isi : float, optional
+        ISIs shorter than this count towards burst_fraction, by default
+        0.005 (5 ms for spike times in seconds)
+    assume_sorted : bool, optional
+        If True, spikes are already sorted by train then time
+
+    Returns
+    -------
+    statistics : dict of np.ndarray
+        Per group: 'n_isi', 'mean_isi', 'cv' (std / mean), 'lv' (local
+        variation, Shinomoto et al., 2003), 'burst_fraction', and
+        'gamma_shape' and 'gamma_scale' (maximum likelihood fit, location 0).
+        NaN where undefined
+    """
+    trains = np.asarray(trains, dtype=np.int64)
+    if n_trains is None:
+        n_trains = int(trains.max()) + 1 if trains.size else 0
+    if groups is None:
+        groups = np.arange(n_trains)
+    groups = np.asarray(groups, dtype=np.int64)
+    if n_groups is None:
+        n_groups = int(groups.max()) + 1 if groups.size else 0
+
+    isi, isi_trains = segment_isi(spike_times, trains, assume_sorted=assume_sorted)
+    # consecutive ISI pairs, within a train
+    pair = isi_trains[1:] == isi_trains[:-1]
+    a, b = isi[:-1][pair], isi[1:][pair]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        lv_terms = 3 * ((a - b) / (a + b)) ** 2
+    pair_groups = groups[isi_trains[1:][pair]]
+    isi_groups = groups[isi_trains]
+
+    # pool the trains of each group into contiguous segments
+    keep = isi_groups >= 0
+    order = np.argsort(isi_groups[keep], kind="stable")
+    isi, isi_groups = isi[keep][order], isi_groups[keep][order]
+    keep = pair_groups >= 0
+    order = np.argsort(pair_groups[keep], kind="stable")
+    lv_terms, pair_groups = lv_terms[keep][order], pair_groups[keep][order]
+
+    n = _segments(np.ones(isi.size), isi_groups, n_groups)
+    n_pairs = _segments(np.ones(lv_terms.size), pair_groups, n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = _segments(isi, isi_groups, n_groups) / n
+        variance = _segments((isi - mean[isi_groups]) ** 2, isi_groups, n_groups) / n
+        mean_log = _segments(np.log(isi), isi_groups, n_groups) / n
+        statistics = {
+            "n_isi": n.astype(np.int64),
+            "mean_isi": mean,
+            "cv": np.sqrt(variance) / mean,
+            "lv": _segments(lv_terms, pair_groups, n_groups) / n_pairs,
+            "burst_fraction": _segments((isi < burst_isi).astype(np.float64), isi_groups, n_groups) / n,
+        }
+        shape = gamma_shape(mean, mean_log)
+        statistics["gamma_shape"] = shape
+        statistics["gamma_scale"] = mean / shape
+    return statistics
@@ -0,0 +1,194 @@
+from typing import Mapping, Optional, Sequence
+
+import numpy as np
+from numpy.typing import ArrayLike
+import pandas as pd
+import xarray as xr
+
+from simianpy.analysis.spiketrain.histogram import linear_index
+
+
+class SparsePSTH:
+    """PSTH stored as the linear index and count of its nonzero bins
+
+    Mirrors the dense xr.DataArray returned by SpikeTrainSet.to_psth
+    (same dims and coords) in memory proportional to the number of nonzero
+    bins. Selection, sums and means over trials (or groups of trials)
+    operate on the nonzero bins only; `to_dataarray` densifies the result.
+
+    >>> psth = sts.to_psth(time_step=0.001, sparse=True)
+    >>> psth.sel(unitid=[3, 4]).groupby_mean('condition').to_dataarray()
+
+    Parameters
+    ----------
+    index : np.ndarray
+        Sorted, unique C-order linear index of each nonzero bin
+    counts : np.ndarray
+        Value of each nonzero bin
+    dims : sequence of str
+    coords : mapping
+        Labels along each dim
+    trial_coords : mapping or None
+        Extra coordinates along 'trialid' (e.g. trial metadata columns)
+    """
+
+    def __init__(
+        self,
+        index: np.ndarray,
+        counts: np.ndarray,
+        dims: Sequence[str],
+        coords: Mapping[str, ArrayLike],
+        trial_coords: Optional[Mapping[str, ArrayLike]] = None,
+    ):
+        self.index = np.asarray(index, dtype=np.int64)
+        self.counts = np.asarray(counts)
+        self.dims = tuple(dims)
+        self.coords = {dim: np.asarray(coords[dim]) for dim in self.dims}
+        self.shape = tuple(self.coords[dim].size for dim in self.dims)
+        self.trial_coords = (
+            {} if trial_coords is None else {k: np.asarray(v) for k, v in trial_coords.items()}
+        )
+
+    @classmethod
+    def from_codes(cls, codes, dims, coords, trial_coords=None, dtype=np.int32):
+        """Count occurrences of each combination of codes (one array per dim)"""
+        shape = [len(coords[dim]) for dim in dims]
+        linear = linear_index(codes, shape)
+        index, counts = np.unique(linear[linear >= 0], return_counts=True)
+        return cls(index, counts.astype(dtype), dims, coords, trial_coords)
+
+    def __repr__(self):
+        shape = ", ".join(f"{dim}: {size}" for dim, size in zip(self.dims, self.shape))
+        return f"SparsePSTH({shape}; nnz={self.nnz})"
+
+    @property
+    def nnz(self) -> int:
+        return self.index.size
+
+    @property
+    def sizes(self) -> dict:
+        return dict(zip(self.dims, self.shape))
+
+    @property
+    def density(self) -> float:
+        n_cells = int(np.prod(self.shape))
+        return self.nnz / n_cells if n_cells else 0.0
+
+    def _codes(self):
+        return np.unravel_index(self.index, self.shape)
+
+    def _rebuild(self, codes, counts, dims, coords, trial_coords):
+        """New SparsePSTH from (possibly repeated) codes and counts, summing duplicates"""
+        shape = [len(coords[dim]) for dim in dims]
+        linear = linear_index(codes, shape)
+        keep = linear >= 0
+        index, inverse = np.unique(linear[keep], return_inverse=True)
+        summed = np.bincount(inverse, weights=counts[keep], minlength=index.size)
+        summed = summed.astype(counts.dtype, copy=False)
+        return SparsePSTH(index, summed, dims, coords, trial_coords)
+
+    def isel(self, **indexers) -> "SparsePSTH":
+        """Select positions along dims (like xr.DataArray.isel with array indexers)"""
+        codes = list(self._codes())
+        coords = dict(self.coords)
+        trial_coords = dict(self.trial_coords)
+        for dim, positions in indexers.items():
+            axis = self.dims.index(dim)
+            positions = np.atleast_1d(np.arange(self.shape[axis])[positions])
+            lookup = np.full(self.shape[axis], -1)
+            lookup[positions] = np.arange(positions.size)
+            codes[axis] = lookup[codes[axis]]
+            coords[dim] = self.coords[dim][positions]
+            if dim == "trialid":
+                trial_coords = {k: v[positions] for k, v in trial_coords.items()}
+        return self._rebuild(codes, self.counts, self.dims, coords, trial_coords)
+
+    def sel(self, **indexers) -> "SparsePSTH":
+        """Select labels along dims (like xr.DataArray.sel with list indexers)"""
+        positions = {}
+        for dim, labels in indexers.items():
+            labels = np.atleast_1d(labels)
+            index = {label: idx for idx, label in enumerate(self.coords[dim].tolist())}
+            missing = [label for label in labels.tolist() if label not in index]
+            if missing:
+                raise KeyError(f"{missing} not found in {dim}")
+            positions[dim] = np.array([index[label] for label in labels.tolist()], dtype=int)
+        return self.isel(**positions)
+
+    def sum(self, dim: str | Sequence[str]) -> "SparsePSTH":
+        """Sum over one or more dims"""
+        dims_to_sum = [dim] if isinstance(dim, str) else list(dim)
+        codes = self._codes()
+        dims = [d for d in self.dims if d not in dims_to_sum]
+        kept = [codes[self.dims.index(d)] for d in dims]
+        coords = {d: self.coords[d] for d in dims}
+        trial_coords = self.trial_coords if "trialid" in dims else None
+        return self._rebuild(kept, self.counts, dims, coords, trial_coords)
+
+    def mean(self, dim: str | Sequence[str]) -> "SparsePSTH":
+        """Mean over one or more dims (bins without spikes count as zeros)"""
+        dims_to_sum = [dim] if isinstance(dim, str) else list(dim)
+        n = int(np.prod([self.sizes[d] for d in dims_to_sum]))
+        summed = self.sum(dims_to_sum)
+        summed.counts = summed.counts / n if n else summed.counts.astype(float)
+        return summed
+
+    def groupby_mean(self, by: str | Sequence[str] | ArrayLike) -> "SparsePSTH":
+        """Mean over trials within groups of trials, replacing the 'trialid' dim
+
+        Parameters
+        ----------
+        by : str, list of str or array_like
+            Trial coordinate(s) (e.g. trial metadata columns), or one label per
+            trial. Trials with a missing label are dropped
+
+        Returns
+        -------
+        SparsePSTH
+            With a dim named after `by` (or 'group') in place of 'trialid'
+        """
+        if isinstance(by, str) or (
+            isinstance(by, (list, tuple)) and all(isinstance(b, str) for b in by)
+        ):
+            names = [by] if isinstance(by, str) else list(by)
+            labels = [self.trial_coords[name] for name in names]
+            dim = names[0] if len(names) == 1 else "group"
+        else:
+            labels = [np.asarray(by)]
+            dim = "group"
+        missing = np.zeros(self.sizes["trialid"], dtype=bool)
+        for label in labels:
+            missing |= np.asarray(pd.isna(label))
+        if len(labels) == 1:
+            keys = labels[0]
+        else:
+            keys = np.empty(len(labels[0]), dtype=object)
+            keys[:] = list(zip(*labels))
+        groups, group_codes = np.unique(keys[~missing], return_inverse=True)
+        trial_to_group = np.full(self.sizes["trialid"], -1)
+        trial_to_group[~missing] = group_codes
+        n_trials = np.bincount(group_codes, minlength=groups.size)
+
+        codes = list(self._codes())
+        axis = self.dims.index("trialid")
+        codes[axis] = trial_to_group[codes[axis]]
+        dims = list(self.dims)
+        dims[axis] = dim
+        coords = {d: self.coords[d] for d in self.dims if d != "trialid"}
+        coords[dim] = groups
+        grouped = self._rebuild(codes, self.counts.astype(float), dims, coords, None)
+        grouped.counts /= n_trials[np.unravel_index(grouped.index, grouped.shape)[axis]]
+        return grouped
+
+    def to_dataarray(self) -> xr.DataArray:
+        """Densify into an xr.DataArray"""
+        data = np.zeros(self.shape, dtype=self.counts.dtype)
+        data.reshape(-1)[self.index] = self.counts
+        psth = xr.DataArray(data, coords=self.coords, dims=self.dims)
+        if self.trial_coords and "trialid" in self.dims:
+            psth = psth.assign_coords(
+                {name: ("trialid", values) for name, values in self.trial_coords.items()}
+            )
+        return psth
+
+    todense = to_dataarray
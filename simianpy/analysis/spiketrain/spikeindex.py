@@ -0,0 +1,134 @@
+from typing import Iterator, Tuple
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from simianpy.misc.ragged import ragged_arange
+
+
+class SpikeIndex:
+    """Offset tables of spikes sorted by unit, trial (epoch) and time
+
+    Spikes of a unit are contiguous and, within a unit, so are the spikes of
+    each trial (a "row"). Rows are found by offsets rather than by masking
+    every spike, so a unit or a (unit, trial) row is a slice of the arrays.
+
+    Parameters
+    ----------
+    units : np.ndarray
+        Sorted unique unit ids
+    unit_ptr : np.ndarray
+        Rows of units[i] are unit_ptr[i]:unit_ptr[i + 1]
+    row_trials : np.ndarray
+        Trial id of each row
+    row_ptr : np.ndarray
+        Spikes of row j are row_ptr[j]:row_ptr[j + 1]
+    """
+
+    def __init__(
+        self,
+        units: np.ndarray,
+        unit_ptr: np.ndarray,
+        row_trials: np.ndarray,
+        row_ptr: np.ndarray,
+    ):
+        self.units = np.asarray(units)
+        self.unit_ptr = np.asarray(unit_ptr, dtype=np.int64)
+        self.row_trials = np.asarray(row_trials)
+        self.row_ptr = np.asarray(row_ptr, dtype=np.int64)
+
+    @classmethod
+    def build(cls, unitids: ArrayLike, trialids: ArrayLike) -> "SpikeIndex":
+        """Index arrays already sorted by unit then trial"""
+        unitids, trialids = np.asarray(unitids), np.asarray(trialids)
+        n_spikes = unitids.size
+        changes = np.ones(n_spikes, dtype=bool)
+        changes[1:] = (unitids[1:] != unitids[:-1]) | (trialids[1:] != trialids[:-1])
+        row_start = np.flatnonzero(changes)
+        row_units = unitids[row_start]
+        unit_changes = np.ones(row_start.size, dtype=bool)
+        unit_changes[1:] = row_units[1:] != row_units[:-1]
+        unit_row_start = np.flatnonzero(unit_changes)
+        return cls(
+            row_units[unit_row_start],
+            np.append(unit_row_start, row_start.size),
+            trialids[row_start],
+            np.append(row_start, n_spikes),
+        )
+
+    def __repr__(self):
+        return f"SpikeIndex(n_units={self.n_units}, n_rows={self.n_rows}, n_spikes={self.n_spikes})"
+
+    @property
+    def n_units(self) -> int:
+        return self.units.size
+
+    @property
+    def n_rows(self) -> int:
+        return self.row_trials.size
+
+    @property
+    def n_spikes(self) -> int:
+        return int(self.row_ptr[-1]) if self.row_ptr.size else 0
+
+    def unit_positions(self, units: ArrayLike) -> np.ndarray:
+        """Position of each unit id in self.units (KeyError if missing)"""
+        units = np.atleast_1d(units)
+        positions = np.searchsorted(self.units, units)
+        found = positions < self.n_units
+        found[found] = self.units[positions[found]] == units[found]
+        if not found.all():
+            raise KeyError(f"Units not found: {units[~found].tolist()}")
+        return positions
+
+    def unit_slice(self, position: int) -> slice:
+        """Spikes of the unit at position"""
+        return slice(
+            int(self.row_ptr[self.unit_ptr[position]]),
+            int(self.row_ptr[self.unit_ptr[position + 1]]),
+        )
+
+    def present_positions(self, units: ArrayLike) -> np.ndarray:
+        """Sorted unique positions of the given unit ids in self.units, ignoring missing ids"""
+        units = np.atleast_1d(units)
+        if units.size == 0 or self.n_units == 0:
+            return np.array([], dtype=np.intp)
+        positions = np.minimum(np.searchsorted(self.units, units), self.n_units - 1)
+        found = self.units[positions] == units
+        return np.unique(positions[found])
+
+    def spikes(self, units=None, trials=None) -> slice | np.ndarray:
+        """Spikes of the given units and trials, like masking unitids and trialids
+
+        Unit and trial ids that are not in the index are ignored.
+
+        Returns
+        -------
+        spikes : slice or np.ndarray
+            A slice if the spikes are contiguous (e.g. consecutive units of
+            all trials), else the indices of the spikes in order
+        """
+        if units is None:
+            positions = np.arange(self.n_units)
+        else:
+            positions = self.present_positions(units)
+        if positions.size == 0:
+            return slice(0, 0)
+        if trials is None and np.all(np.diff(positions) == 1):
+            # consecutive units are a single slice of the arrays
+            return slice(
+                int(self.row_ptr[self.unit_ptr[positions[0]]]),
+                int(self.row_ptr[self.unit_ptr[positions[-1] + 1]]),
+            )
+        rows = ragged_arange(self.unit_ptr[positions], self.unit_ptr[positions + 1])
+        if trials is not None:
+            rows = rows[np.isin(self.row_trials[rows], trials)]
+        return ragged_arange(self.row_ptr[rows], self.row_ptr[rows + 1])
+
+    def iter_rows(self) -> Iterator[Tuple[int, object, slice]]:
+        """(unit position, trial id, spike slice) of every row"""
+        for position in range(self.n_units):
+            for row in range(self.unit_ptr[position], self.unit_ptr[position + 1]):
+                yield position, self.row_trials[row], slice(
+                    int(self.row_ptr[row]), int(self.row_ptr[row + 1])
+                )
@@ -1,4 +1,4 @@
-from typing import Optional, Sequence, Tuple, Mapping, Callable
+from typing import Optional, Sequence, Tuple, Mapping, Callable, Iterator
 import zipfile
 import io
 
@@ -7,6 +7,14 @@ from numpy.typing import ArrayLike
 import pandas as pd
 import xarray as xr
 
+from simianpy.analysis.spiketrain.histogram import bincount_nd, digitize_times, linear_index
+from simianpy.analysis.spiketrain.isi import isi_statistics
+from simianpy.analysis.spiketrain.kerneldensity import kernel_density, sampled_kernel
+from simianpy.analysis.spiketrain.sparsepsth import SparsePSTH
+from simianpy.analysis.spiketrain.spikeindex import SpikeIndex
+from simianpy.analysis.spiketrain.storage import read_array, write_array
+from simianpy.misc.ragged import iter_ragged_arange
+
 
 try:
     from simianpy.analysis.spiketrain.spiketrainsetviewer import launch_viewer
@@ -16,6 +24,39 @@ except ImportError:
 else:
     pyqtmgl = True
 
+
+def _has_parquet() -> bool:
+    import importlib.util
+
+    return any(importlib.util.find_spec(name) is not None for name in ("pyarrow", "fastparquet"))
+
+
+def convolve_time(
+    x: np.ndarray, kernel: np.ndarray, max_block_bytes: int = 1 << 27
+) -> np.ndarray:
+    """Convolve every row of x (time along the last axis) with kernel, mode 'same'
+
+    Matches np.convolve(row, kernel, mode='same') for rows at least as long as
+    the kernel, but all rows of a block are convolved in one float32
+    overlap-add FFT call (scipy.signal.oaconvolve). Blocks hold at most
+    max_block_bytes of input.
+    """
+    import scipy.signal
+
+    x = np.asarray(x)
+    n_time = x.shape[-1]
+    rows = x.reshape(-1, n_time)
+    kernel = np.asarray(kernel, dtype=np.float32)[np.newaxis, :]
+    out = np.empty(rows.shape, dtype=np.float32)
+    step = max(1, max_block_bytes // max(1, n_time * 4))
+    for start in range(0, rows.shape[0], step):
+        block = rows[start : start + step].astype(np.float32)
+        out[start : start + step] = scipy.signal.oaconvolve(
+            block, kernel, mode="same", axes=-1
+        )
+    return out.reshape(x.shape)
+
+
 class SpikeTrainSet:
     def __init__(
         self,
@@ -26,6 +67,7 @@ class SpikeTrainSet:
         trial_metadata: Optional[pd.DataFrame] = None,
         epochids: Optional[np.ndarray] = None,
         epoch_names: Optional[Sequence[str]] = None,
+        index: Optional[SpikeIndex] = None,
     ):
         """Initialize SpikeTrainSet
 
@@ -40,6 +82,9 @@ class SpikeTrainSet:
         window : tuple or None
             Tuple of (start, end) of window around event timestamps
             if None, use the range of spike_times
+        index : SpikeIndex or None
+            Offset tables of the arrays, which must then be sorted by unit,
+            trial, epoch and time. See build_index
 
         Raises
         ------
@@ -49,7 +94,7 @@ class SpikeTrainSet:
         if not (len(trialids) == len(unitids) == len(spike_times)):
             raise ValueError("All inputs must be the same length")
         if window is None:
-            window = (self.spike_times.min(), self.spike_times.max())
+            window = (spike_times.min(), spike_times.max())
         if window[0] > window[1]:
             raise ValueError("Window start must be less than or equal to window end")
         self.trialids = trialids
@@ -72,9 +117,12 @@ class SpikeTrainSet:
             self.epochids = None
             self.n_epochs = None
         self.epoch_names = epoch_names
-        if self.epoch_names is not None:
-            if len(self.epoch_names) != self.n_epochs:
-                raise ValueError("Length of epoch_names must match number of epochs exactly")
+        if self.epoch_names is not None and self.epochids is not None:
+            # subsets (see select) may not contain spikes of every named epoch
+            if len(epochids) and (np.min(epochids) < 0 or np.max(epochids) >= len(self.epoch_names)):
+                raise ValueError("epochids must index into epoch_names")
+            self.n_epochs = len(self.epoch_names)
+        self.index = index
 
     def __repr__(self):
         return (
@@ -83,6 +131,140 @@ class SpikeTrainSet:
             f"{', n_epochs=' + str(self.n_epochs) if self.epochids is not None else ''}"
         )
 
+    def build_index(self) -> "SpikeTrainSet":
+        """Sort spikes by unit, trial, epoch and time (in place) and index them
+
+        Afterwards the spikes of a unit, or of a unit in a trial, are
+        contiguous: `select` by unit and trial, `iter_units` and `iter_trials`
+        use slices of the arrays instead of masks. The index is saved and
+        loaded along with the SpikeTrainSet.
+
+        Returns
+        -------
+        self : SpikeTrainSet
+        """
+        keys = [self.spike_times]
+        if self.epochids is not None:
+            keys.append(self.epochids)
+        keys.extend([self.trialids, self.unitids])
+        order = np.lexsort(keys)
+        self.spike_times = self.spike_times[order]
+        self.trialids = self.trialids[order]
+        self.unitids = self.unitids[order]
+        if self.epochids is not None:
+            self.epochids = self.epochids[order]
+        self.index = SpikeIndex.build(self.unitids, self.trialids)
+        return self
+
+    def _subset(self, spikes, index: Optional[SpikeIndex] = None) -> "SpikeTrainSet":
+        """SpikeTrainSet of the spikes selected by a slice (views), mask or indices"""
+        return type(self)(
+            self.trialids[spikes],
+            self.unitids[spikes],
+            self.spike_times[spikes],
+            self.window,
+            trial_metadata=self.trial_metadata,
+            epochids=None if self.epochids is None else self.epochids[spikes],
+            epoch_names=self.epoch_names,
+            index=index,
+        )
+
+    def select(
+        self,
+        units: Optional[ArrayLike] = None,
+        trials: Optional[ArrayLike] = None,
+        epochs: Optional[Sequence[str]] = None,
+        time: Optional[Tuple[float, float]] = None,
+    ) -> "SpikeTrainSet":
+        """Spikes of a subset of units, trials, epochs and/or a time range
+
+        With an index (see build_index), units and trials are located through
+        the offset tables: a single unit (or a run of consecutive units) is
+        returned as views of the arrays, without touching other spikes.
+
+        Parameters
+        ----------
+        units, trials : array_like or None
+            Unit and trial ids to keep. If None, all are kept
+        epochs : Sequence[str] or None
+            Epoch names to keep
+        time : tuple or None
+            (start, end) of the spike times to keep, inclusive. The window of
+            the SpikeTrainSet is unchanged
+
+        Returns
+        -------
+        SpikeTrainSet
+        """
+        if self.index is not None and (units is not None or trials is not None):
+            spikes = self.index.spikes(units=units, trials=trials)
+        else:
+            spikes = np.ones(len(self.spike_times), dtype=bool)
+            if units is not None:
+                spikes &= np.isin(self.unitids, units)
+            if trials is not None:
+                spikes &= np.isin(self.trialids, trials)
+        subset = self._subset(spikes)
+
+        mask = None
+        if epochs is not None:
+            if subset.epochids is None or subset.epoch_names is None:
+                raise ValueError("Epoch names must be provided in SpikeTrainSet if epochs parameter is used")
+            mask = np.isin(subset.epochids, [subset.epoch_names.index(epoch) for epoch in epochs])
+        if time is not None:
+            time_mask = (subset.spike_times >= time[0]) & (subset.spike_times <= time[1])
+            mask = time_mask if mask is None else mask & time_mask
+        if mask is not None:
+            subset = subset._subset(mask)
+        if self.index is not None:
+            # a subset of sorted spikes stays sorted
+            subset.index = SpikeIndex.build(subset.unitids, subset.trialids)
+        return subset
+
+    def iter_units(self) -> Iterator[Tuple[object, "SpikeTrainSet"]]:
+        """Yield (unitid, SpikeTrainSet of that unit) with views of the arrays
+
+        Builds the index first if needed (see build_index).
+        """
+        if self.index is None:
+            self.build_index()
+        index = self.index
+        for position, unit in enumerate(index.units):
+            rows = slice(index.unit_ptr[position], index.unit_ptr[position + 1] + 1)
+            row_ptr = index.row_ptr[rows]
+            unit_index = SpikeIndex(
+                index.units[position : position + 1],
+                np.array([0, row_ptr.size - 1]),
+                index.row_trials[rows][:-1],
+                row_ptr - row_ptr[0],
+            )
+            yield unit, self._subset(index.unit_slice(position), index=unit_index)
+
+    def iter_trials(self, unit=None) -> Iterator[Tuple[object, object, np.ndarray]]:
+        """Yield (unitid, trialid, spike_times) of every unit and trial with spikes
+
+        spike_times is a view, sorted by epoch and time. Builds the index first
+        if needed (see build_index).
+
+        Parameters
+        ----------
+        unit : optional
+            Only iterate over the trials of this unit
+        """
+        if self.index is None:
+            self.build_index()
+        index = self.index
+        if unit is None:
+            positions = range(index.n_units)
+        else:
+            positions = index.unit_positions(unit)
+        for position in positions:
+            unitid = index.units[position]
+            for row in range(index.unit_ptr[position], index.unit_ptr[position + 1]):
+                yield unitid, index.row_trials[row], self.spike_times[
+                    index.row_ptr[row] : index.row_ptr[row + 1]
+                ]
+
     @classmethod
     def from_arrays(
         cls,
@@ -93,6 +275,7 @@ class SpikeTrainSet:
         event_labels: Optional[ArrayLike] = None,
         trial_metadata: Optional[pd.DataFrame] = None,
         epoch_names: Optional[Sequence[str]] = None,
+        max_chunk_spikes: int = 1 << 24,
     ) -> "SpikeTrainSet":
         """Generate SpikeTrainSet from arrays of spike and event timestamps
 
@@ -110,6 +293,9 @@ class SpikeTrainSet:
             Array of event labels
         epoch_names : list or None
             List of epoch names, must match number of epochs if provided
+        max_chunk_spikes : int
+            Spikes are gathered in pieces of at most this many spikes (a
+            single window is never split), bounding temporary memory
 
         Returns
         -------
@@ -156,16 +342,26 @@ class SpikeTrainSet:
         lidx = np.searchsorted(spike_timestamps, left, side="left")
         ridx = np.searchsorted(spike_timestamps, right, side="right")
         lengths = ridx - lidx
-        offset = np.repeat(event_timestamps_flat, lengths)
         event_labels_rep = np.repeat(event_labels_flat, lengths)
         if epochids is not None:
             epochids = np.array(epochids)[evt_sort_idx]
             epochids_rep = np.repeat(epochids, lengths)
         else:
             epochids_rep = None
-        spk_idx = np.concatenate([np.arange(l, r) for l, r in zip(lidx, ridx)])
-        spike_times_aligned = spike_timestamps[spk_idx] - offset
-        spike_labels_aligned = spike_labels[spk_idx]
+        # gather the spikes of each window in pieces of at most max_chunk_spikes
+        n_spikes = lengths.sum()
+        spike_times_aligned = np.empty(
+            n_spikes, dtype=np.result_type(spike_timestamps, event_timestamps_flat)
+        )
+        spike_labels_aligned = np.empty(n_spikes, dtype=spike_labels.dtype)
+        for events, positions, spk_idx in iter_ragged_arange(
+            lidx, ridx, max_size=max_chunk_spikes
+        ):
+            offset = np.repeat(event_timestamps_flat[events], lengths[events])
+            np.subtract(
+                spike_timestamps[spk_idx], offset, out=spike_times_aligned[positions]
+            )
+            spike_labels_aligned[positions] = spike_labels[spk_idx]
         return cls(event_labels_rep, spike_labels_aligned, spike_times_aligned, window, trial_metadata=trial_metadata, epochids=epochids_rep, epoch_names=epoch_names)
 
     @classmethod
@@ -200,6 +396,217 @@ class SpikeTrainSet:
             trial_metadata=trial_metadata,
         )
 
+    @classmethod
+    def concat(
+        cls,
+        spike_train_sets: Sequence["SpikeTrainSet"],
+        relabel: Optional[str] = None,
+        keys: Optional[Sequence] = None,
+        return_units: bool = False,
+    ):
+        """Concatenate SpikeTrainSets (e.g. sessions or recording blocks)
+
+        Arrays are copied once into preallocated outputs. Windows and epoch
+        names must match.
+
+        Parameters
+        ----------
+        spike_train_sets : sequence of SpikeTrainSet
+        relabel : str or None, optional
+            If None, trial and unit ids are kept: trial ids must not repeat
+            across sets and units with the same id are merged. Otherwise
+            trial and unit ids are renumbered to consecutive integers (set by
+            set, in sorted order within a set) and the trial metadata gets a
+            `relabel` column with the key of each trial's set and a
+            f"{relabel}_trialid" column with its original id
+        keys : sequence or None, optional
+            Key of each set, by default 0, 1, ...
+        return_units : bool, optional
+            If True (and relabel is given), also return a pd.DataFrame indexed
+            by the new unit ids with the key and original id of each unit
+
+        Returns
+        -------
+        SpikeTrainSet or (SpikeTrainSet, pd.DataFrame)
+        """
+        sets = list(spike_train_sets)
+        if not sets:
+            raise ValueError("Need at least one SpikeTrainSet to concatenate")
+        keys = list(range(len(sets))) if keys is None else list(keys)
+        if len(keys) != len(sets):
+            raise ValueError("keys must have one entry per SpikeTrainSet")
+        first = sets[0]
+        for sts in sets[1:]:
+            if tuple(sts.window) != tuple(first.window):
+                raise ValueError(f"Windows differ: {first.window} and {sts.window}")
+            if (sts.epochids is None) != (first.epochids is None):
+                raise ValueError("Either all or none of the SpikeTrainSets must have epochs")
+            if sts.epoch_names != first.epoch_names:
+                raise ValueError(f"Epoch names differ: {first.epoch_names} and {sts.epoch_names}")
+
+        sizes = [len(sts.spike_times) for sts in sets]
+        bounds = np.concatenate([[0], np.cumsum(sizes)])
+        spike_times = np.concatenate([sts.spike_times for sts in sets])
+        epochids = None
+        if first.epochids is not None:
+            epochids = np.concatenate([sts.epochids for sts in sets])
+
+        metadata = []
+        if relabel is None:
+            trialids = np.concatenate([sts.trialids for sts in sets])
+            unitids = np.concatenate([sts.unitids for sts in sets])
+            n_trials = sum(np.unique(sts.trialids).size for sts in sets)
+            if np.unique(trialids).size != n_trials:
+                raise ValueError("Trial ids repeat across SpikeTrainSets, use relabel")
+            index = None
+            units = None
+        else:
+            trialids = np.empty(bounds[-1], dtype=np.int64)
+            unitids = np.empty(bounds[-1], dtype=np.int64)
+            trial_offset = unit_offset = 0
+            units = []
+            for key, sts, start, stop in zip(keys, sets, bounds[:-1], bounds[1:]):
+                trials, trial_codes = np.unique(sts.trialids, return_inverse=True)
+                set_units, unit_codes = np.unique(sts.unitids, return_inverse=True)
+                trialids[start:stop] = trial_codes + trial_offset
+                unitids[start:stop] = unit_codes + unit_offset
+                new_trials = pd.Index(np.arange(trials.size) + trial_offset, name="trialid")
+                if sts.trial_metadata is not None:
+                    frame = sts.trial_metadata.loc[trials].set_axis(new_trials)
+                else:
+                    frame = pd.DataFrame(index=new_trials)
+                frame[relabel] = [key] * trials.size
+                frame[f"{relabel}_trialid"] = trials
+                metadata.append(frame)
+                units.append(
+                    pd.DataFrame(
+                        {relabel: [key] * set_units.size, f"{relabel}_unitid": set_units},
+                        index=pd.Index(np.arange(set_units.size) + unit_offset, name="unitid"),
+                    )
+                )
+                trial_offset += trials.size
+                unit_offset += set_units.size
+            units = pd.concat(units)
+            # renumbering keeps the order of indexed sets, so the result stays sorted
+            index = None
+            if all(sts.index is not None for sts in sets):
+                index = SpikeIndex.build(unitids, trialids)
+
+        if relabel is None and any(sts.trial_metadata is not None for sts in sets):
+            for sts in sets:
+                if sts.trial_metadata is not None:
+                    metadata.append(sts.trial_metadata)
+                else:
+                    metadata.append(pd.DataFrame(index=np.unique(sts.trialids)))
+        trial_metadata = pd.concat(metadata) if metadata else None
+
+        concatenated = cls(
+            trialids,
+            unitids,
+            spike_times,
+            first.window,
+            trial_metadata=trial_metadata,
+            epochids=epochids,
+            epoch_names=first.epoch_names,
+            index=index,
+        )
+        if return_units:
+            if relabel is None:
+                raise ValueError("return_units requires relabel")
+            return concatenated, units
+        return concatenated
+
+    def append_trials(
+        self,
+        trialids: ArrayLike,
+        unitids: ArrayLike,
+        spike_times: ArrayLike,
+        epochids: Optional[ArrayLike] = None,
+        trial_metadata: Optional[pd.DataFrame] = None,
+    ) -> "SpikeTrainSet":
+        """Append the spikes of new trials in place
+
+        The arrays are views of buffers grown geometrically, so appending
+        trials one at a time (e.g. online, as they complete) costs amortized
+        O(spikes appended). Drops the index, if any (see build_index).
+
+        Parameters
+        ----------
+        trialids, unitids, spike_times : array_like
+            Spikes of the new trials, relative to their event like the
+            existing ones. Trial ids must be new
+        epochids : array_like or None
+            Required if the SpikeTrainSet has epochs
+        trial_metadata : pd.DataFrame or None
+            Metadata of the new trials, indexed by trial id. Required if the
+            SpikeTrainSet has trial metadata
+
+        Returns
+        -------
+        self : SpikeTrainSet
+        """
+        values = {
+            "trialids": np.asarray(trialids),
+            "unitids": np.asarray(unitids),
+            "spike_times": np.asarray(spike_times),
+        }
+        if (epochids is None) != (self.epochids is None):
+            raise ValueError("epochids must be given if and only if the SpikeTrainSet has epochs")
+        if epochids is not None:
+            values["epochids"] = np.asarray(epochids)
+            if self.epoch_names is not None and values["epochids"].size and (
+                values["epochids"].min() < 0 or values["epochids"].max() >= len(self.epoch_names)
+            ):
+                raise ValueError("epochids must index into epoch_names")
+        n_new = values["spike_times"].size
+        if any(value.size != n_new for value in values.values()):
+            raise ValueError("All inputs must be the same length")
+        if self.trial_metadata is not None and trial_metadata is None:
+            raise ValueError("trial_metadata must be given for the new trials")
+
+        buffers = getattr(self, "_buffers", None)
+        n = len(self.spike_times)
+        if buffers is None or any(
+            getattr(self, name) is None
+            or getattr(self, name).base is not buffers[name]
+            or len(getattr(self, name)) != n
+            for name in values
+        ):
+            # arrays were replaced (or never appended to): restart from them
+            buffers = {name: getattr(self, name) for name in values}
+            self._seen = {
+                "trialids": set(np.unique(self.trialids).tolist()),
+                "unitids": set(np.unique(self.unitids).tolist()),
+            }
+        new_trials = np.unique(values["trialids"])
+        if not self._seen["trialids"].isdisjoint(new_trials.tolist()):
+            raise ValueError("Trial ids must not already be in the SpikeTrainSet")
+
+        for name, value in values.items():
+            buffer = buffers[name]
+            dtype = np.result_type(buffer.dtype, value.dtype)
+            if buffer.size < n + n_new or dtype != buffer.dtype or buffer is getattr(self, name):
+                grown = np.empty(max(n + n_new, 2 * buffer.size, 1024), dtype=dtype)
+                grown[:n] = buffer[:n]
+                buffers[name] = buffer = grown
+            buffer[n : n + n_new] = value
+            setattr(self, name, buffer[: n + n_new])
+        self._buffers = buffers
+
+        if trial_metadata is not None:
+            existing = self.trial_metadata
+            if existing is None:
+                existing = pd.DataFrame(index=np.array(sorted(self._seen["trialids"])))
+            self.trial_metadata = pd.concat([existing, trial_metadata.loc[new_trials]])
+        self._seen["trialids"].update(new_trials.tolist())
+        self._seen["unitids"].update(np.unique(values["unitids"]).tolist())
+        self.n_trials = len(self._seen["trialids"])
+        self.n_units = len(self._seen["unitids"])
+        if self.epochids is not None and self.epoch_names is None:
+            self.n_epochs = np.unique(self.epochids).size
+        self.index = None
+        return self
+
     def to_dataframe(self):
         """Convert spike train set to DataFrame
 
@@ -216,12 +623,102 @@ class SpikeTrainSet:
             }
         )
 
+    def _row_codes(
+        self,
+        epochs: Optional[Sequence[str]] = None,
+        units: Optional[ArrayLike] = None,
+        trials: Optional[ArrayLike] = None,
+    ):
+        """Spike times of the selected spikes with their trial, unit and epoch codes
+
+        The labels along each dim are those of the whole SpikeTrainSet (or the
+        requested units and trials that it contains), not only of the selected
+        spikes: a trial without spikes in the selected units or epochs is kept
+        with zero counts.
+
+        Returns
+        -------
+        spike_times : np.ndarray
+        codes : list of np.ndarray
+            Code of each spike along each of dims
+        dims : list of str
+            ['trialid', 'unitid'] and 'epoch' if epochids is provided
+        coords : dict
+            Labels along each of dims
+        """
+        trialids_unique = np.unique(self.trialids)
+        unitids_unique = np.unique(self.unitids)
+        mask = None
+        if units is not None:
+            mask = np.isin(self.unitids, units)
+            unitids_unique = unitids_unique[np.isin(unitids_unique, units)]
+        if trials is not None:
+            trial_mask = np.isin(self.trialids, trials)
+            mask = trial_mask if mask is None else mask & trial_mask
+            trialids_unique = trialids_unique[np.isin(trialids_unique, trials)]
+        selected_epoch_ids = None
+        if self.epochids is not None and epochs is not None:
+            if self.epoch_names is None:
+                raise ValueError("Epoch names must be provided in SpikeTrainSet if epochs parameter is used")
+            selected_epoch_ids = [self.epoch_names.index(epoch) for epoch in epochs if epoch in self.epoch_names]
+            epoch_mask = np.isin(self.epochids, selected_epoch_ids)
+            mask = epoch_mask if mask is None else mask & epoch_mask
+
+        def _select(values):
+            return values if mask is None else values[mask]
+
+        coords = {
+            "trialid": trialids_unique,
+            "unitid": unitids_unique,
+        }
+        # the selected ids are all among the labels
+        codes = [
+            np.searchsorted(trialids_unique, _select(self.trialids)),
+            np.searchsorted(unitids_unique, _select(self.unitids)),
+        ]
+        if self.epochids is not None:
+            epochids = _select(self.epochids)
+            if selected_epoch_ids is not None:
+                # epochs are ordered as requested; none may remain, giving an empty epoch axis
+                lookup = np.full(max(selected_epoch_ids, default=-1) + 1, -1)
+                lookup[selected_epoch_ids] = np.arange(len(selected_epoch_ids))
+                epochids_digitized = lookup[epochids]
+                coords["epoch"] = [self.epoch_names[idx] for idx in selected_epoch_ids]
+            elif self.epoch_names is not None:
+                # epochids index into epoch_names
+                epochids_digitized = epochids
+                coords["epoch"] = list(self.epoch_names)
+            else:
+                epochids_unique = np.unique(self.epochids)
+                epochids_digitized = np.searchsorted(epochids_unique, epochids)
+                coords["epoch"] = epochids_unique
+            codes.append(epochids_digitized)
+            dims = ["trialid", "unitid", "epoch"]
+        else:
+            dims = ["trialid", "unitid"]
+        return _select(self.spike_times), codes, dims, coords
+
+    def _time_bins(self, time_bins: Optional[ArrayLike] = None, time_step: Optional[float] = None) -> np.ndarray:
+        """Edges of the time bins given explicitly or by a step spanning the window"""
+        if time_step is None:
+            if time_bins is None:
+                raise ValueError("Either time_bins or time_step must be provided")
+            return np.asarray(time_bins)
+        left, right = self.window
+        left = left - (time_step / 2)
+        right = right + time_step
+        return np.arange(left, right, time_step)
+
     def to_psth(
         self, 
         time_bins: Optional[ArrayLike] = None, 
         time_step: Optional[float] = None,
-        epochs: Optional[Sequence[str]] = None
-    ) -> xr.DataArray:
+        epochs: Optional[Sequence[str]] = None,
+        units: Optional[ArrayLike] = None,
+        trials: Optional[ArrayLike] = None,
+        dtype=np.int32,
+        sparse: bool = False,
+    ) -> xr.DataArray | SparsePSTH:
         """Convert spike train set to PSTH matrix
         
         Parameters
@@ -232,6 +729,19 @@ class SpikeTrainSet:
             Time step to use for the histogram. If None, will calculate from time_bins.
         epochs : Sequence[str] or None
             Sequence of epoch names corresponding to epoch IDs.
+        units : ArrayLike or None
+            Subset of unit ids to bin. If None, all units are used.
+        trials : ArrayLike or None
+            Subset of trial ids to bin. If None, all trials are used.
+        dtype : np.dtype
+            dtype of the counts, by default np.int32 (float64 before counts
+            were binned with bincount_nd; pass np.float64 for the previous
+            output). np.uint16 uses half the memory (an OverflowError is
+            raised if a bin exceeds its range).
+        sparse : bool
+            If True, return a SparsePSTH holding only the nonzero bins, which
+            supports selection, sums and (grouped) means over trials without
+            densifying. Use for fine bins over large trial x unit grids.
 
         Raises
         ------
@@ -240,83 +750,240 @@ class SpikeTrainSet:
 
         Returns
         -------
-        psth : xr.DataArray
+        psth : xr.DataArray or SparsePSTH
             DataArray with dimensions ['trialid', 'unitid', 'epoch', 'time'] if epochids is provided,
             otherwise ['trialid', 'unitid', 'time']. Contains the counts of spikes in each bin.
 
         """
-        if time_step is None:
-            if time_bins is None:
-                raise ValueError("Either time_bins or time_step must be provided")
-            time_bin_array = np.asarray(time_bins)
-            time_step = time_bin_array[1] - time_bin_array[0]
-        else:
-            left, right = self.window
-            left = left - (time_step / 2)
-            right = right + time_step
-            time_bin_array = np.arange(left, right, time_step)
-        trialids_unique, trialids_digitized = np.unique(
-            self.trialids, return_inverse=True
-        )
-        unitids_unique, unitids_digitized = np.unique(self.unitids, return_inverse=True)
-        time = time_bin_array[:-1] + (time_bin_array[1] - time_bin_array[0]) / 2
-        coords = {
-            "trialid": trialids_unique,
-            "unitid": unitids_unique,
-            "time": time,
-        }
-        if self.epochids is not None:
-            # mask epochs if epoch names are provided
-            if epochs is not None:
-                if self.epoch_names is None:
-                    raise ValueError("Epoch names must be provided in SpikeTrainSet if epochs parameter is used")
-                selected_epoch_ids = [self.epoch_names.index(epoch) for epoch in epochs if epoch in self.epoch_names]
-                mask = np.isin(self.epochids, selected_epoch_ids)
-                trialids_digitized = trialids_digitized[mask]
-                unitids_digitized = unitids_digitized[mask]
-                spike_times = self.spike_times[mask]
-                epochids = self.epochids[mask]
-            else:
-                spike_times = self.spike_times
-                epochids = self.epochids
-
-
-            epochids_unique, epochids_digitized = np.unique(
-                epochids, return_inverse=True
-            )
-            # Create a 3D histogram for trialid, unitid, and epochid
-            psth, _ = np.histogramdd(
-                np.array([trialids_digitized, unitids_digitized, epochids_digitized, spike_times]).T,
-                bins=[
-                    np.arange(trialids_unique.size + 1),
-                    np.arange(unitids_unique.size + 1),
-                    np.arange(epochids_unique.size + 1),
-                    time_bin_array,
-                ]
-            )
-            coords["epoch"] = epochs if epochs is not None else (self.epoch_names if self.epoch_names is not None else epochids_unique)
-            dims = ["trialid", "unitid", "epoch", "time"]
-        else:
-            psth, _ = np.histogramdd(
-                np.array([trialids_digitized, unitids_digitized, self.spike_times]).T,
-                bins=[
-                    np.arange(trialids_unique.size + 1),
-                    np.arange(unitids_unique.size + 1),
-                    time_bin_array,
-                ]
-            )
-            dims = ["trialid", "unitid", "time"]
+        time_bin_array = self._time_bins(time_bins, time_step)
+        spike_times, codes, dims, coords = self._row_codes(epochs, units, trials)
+        trialids_unique = coords["trialid"]
+        coords["time"] = time_bin_array[:-1] + (time_bin_array[1] - time_bin_array[0]) / 2
+        dims = dims + ["time"]
+        shape = [len(coords[dim]) for dim in dims]
+        codes.append(digitize_times(spike_times, time_bin_array))
+        if sparse:
+            trial_coords = None
+            if self.trial_metadata is not None:
+                trial_coords = {
+                    col: self.trial_metadata.loc[trialids_unique, col].to_numpy()
+                    for col in self.trial_metadata.columns
+                }
+            return SparsePSTH.from_codes(codes, dims, coords, trial_coords, dtype=dtype)
+        psth = bincount_nd(codes, shape, dtype=dtype)
         psth = xr.DataArray(psth, coords=coords, dims=dims)
         # Attach trial metadata as coordinates if present
         if self.trial_metadata is not None:
             psth = psth.assign_coords({
-                col: ("trialid", self.trial_metadata.loc[trialids_unique, col].values)
+                col: ("trialid", self.trial_metadata.loc[trialids_unique, col].to_numpy())
                 for col in self.trial_metadata.columns
             })
         return psth
 
-    def to_sdf(self, window: str | Tuple[str, int] | Callable[[np.ndarray], np.ndarray]="psp", epochs: Optional[Sequence[str]] = None) -> xr.DataArray:
-        psth = self.to_psth(time_step=0.001, epochs=epochs)
+    def condition_psth(
+        self,
+        by: Optional[str | Sequence[str]] = None,
+        time_bins: Optional[ArrayLike] = None,
+        time_step: Optional[float] = None,
+        epochs: Optional[Sequence[str]] = None,
+        units: Optional[ArrayLike] = None,
+        trials: Optional[ArrayLike] = None,
+        sem: bool = False,
+    ) -> xr.DataArray | xr.Dataset:
+        """Mean PSTH over the trials of each condition
+
+        Equivalent to `to_psth(...).groupby(by).mean()` (or `.mean('trialid')`
+        if by is None), but spikes are binned straight into a
+        group x unit (x epoch) x time accumulator and divided by the number of
+        trials per group, without building the per-trial PSTH. Groups count
+        every trial of the SpikeTrainSet (or of trials), including those
+        without spikes in the selected units or epochs. Trials with a missing
+        condition label are dropped.
+
+        Parameters
+        ----------
+        by : str, list of str or None
+            Trial metadata column(s). One column gives a leading dim named
+            after it; several give one trailing dim per column (all
+            combinations, NaN where a combination has no trials)
+        time_bins, time_step, epochs, units, trials :
+            As in to_psth
+        sem : bool
+            If True, also compute the standard error of the mean,
+            sqrt(variance / n_trials) with the population variance. Per-trial
+            counts are only taken at their nonzero bins
+
+        Returns
+        -------
+        psth : xr.DataArray or xr.Dataset
+            Mean spike counts per bin, with an 'n_trials' coordinate along the
+            group dim(s). A Dataset with 'mean' and 'sem' if sem is True
+        """
+        time_bin_array = self._time_bins(time_bins, time_step)
+        spike_times, codes, dims, coords = self._row_codes(epochs, units, trials)
+        trialids_unique = coords.pop("trialid")
+        trial_codes = codes[0]
+        codes = codes[1:] + [digitize_times(spike_times, time_bin_array)]
+        dims = dims[1:] + ["time"]
+        coords["time"] = time_bin_array[:-1] + (time_bin_array[1] - time_bin_array[0]) / 2
+
+        if by is None:
+            group_names, group_labels = [], []
+            trial_to_group = np.zeros(trialids_unique.size, dtype=np.int64)
+        else:
+            if self.trial_metadata is None:
+                raise ValueError("Cannot group trials without trial metadata")
+            group_names = [by] if isinstance(by, str) else list(by)
+            missing_columns = [g for g in group_names if g not in self.trial_metadata.columns]
+            if missing_columns:
+                raise ValueError(f"Group columns {missing_columns} not found in trial metadata")
+            table = self.trial_metadata.loc[trialids_unique, group_names]
+            valid = ~table.isna().any(axis=1).values
+            group_labels, group_codes = [], []
+            for name in group_names:
+                labels, label_codes = np.unique(table[name].to_numpy()[valid], return_inverse=True)
+                group_labels.append(labels)
+                group_codes.append(label_codes)
+            trial_to_group = np.full(trialids_unique.size, -1, dtype=np.int64)
+            trial_to_group[valid] = linear_index(group_codes, [labels.size for labels in group_labels])
+        group_shape = [labels.size for labels in group_labels]
+        n_groups = int(np.prod(group_shape))
+        n_trials = np.bincount(trial_to_group[trial_to_group >= 0], minlength=n_groups)
+
+        shape = [n_groups] + [len(coords[dim]) for dim in dims]
+        spike_groups = trial_to_group[trial_codes]
+        sums = bincount_nd([spike_groups] + codes, shape, dtype=np.int64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scale = 1.0 / n_trials
+        scale = scale.reshape([-1] + [1] * len(dims))
+        mean = sums * scale
+        if sem:
+            # second moment from the nonzero per-trial bins
+            cells = linear_index([trial_codes] + codes, [trialids_unique.size] + shape[1:])
+            cells, counts = np.unique(cells[cells >= 0], return_counts=True)
+            cell_codes = np.unravel_index(cells, [trialids_unique.size] + shape[1:])
+            cells = linear_index([trial_to_group[cell_codes[0]]] + list(cell_codes[1:]), shape)
+            grouped = cells >= 0
+            squares = np.bincount(
+                cells[grouped],
+                weights=counts[grouped].astype(np.float64) ** 2,
+                minlength=int(np.prod(shape)),
+            ).reshape(shape)
+            variance = np.maximum(squares * scale - mean**2, 0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                error = np.sqrt(variance * scale)
+
+        def _to_dataarray(values):
+            values = values.reshape(group_shape + shape[1:])
+            array_dims = group_names + dims
+            if len(group_names) > 1:
+                # as xarray's groupby over several variables
+                array_dims = dims + group_names
+                values = np.moveaxis(values, list(range(len(group_names))), list(range(-len(group_names), 0)))
+            array_coords = dict(coords, **dict(zip(group_names, group_labels)))
+            return xr.DataArray(values, coords=array_coords, dims=array_dims)
+
+        psth = _to_dataarray(mean)
+        if sem:
+            psth = xr.Dataset({"mean": psth, "sem": _to_dataarray(error)})
+        if group_names:
+            psth = psth.assign_coords(n_trials=(group_names, n_trials.reshape(group_shape)))
+        else:
+            psth = psth.assign_coords(n_trials=int(n_trials[0]))
+        return psth
+
+    def isi_statistics(
+        self,
+        by: str = "unit",
+        burst_isi: float = 0.005,
+        epochs: Optional[Sequence[str]] = None,
+        units: Optional[ArrayLike] = None,
+        trials: Optional[ArrayLike] = None,
+    ) -> xr.Dataset:
+        """ISI statistics of every unit (pooling trials) or every unit x trial
+
+        ISIs are taken within each trial (and epoch) window, for all trains at
+        once (see simianpy.analysis.spiketrain.isi.isi_statistics).
+
+        Parameters
+        ----------
+        by : {'unit', 'trial'}
+            'unit' pools the ISIs of all trials of a unit, 'trial' gives
+            statistics per unit and trial
+        burst_isi : float, optional
+            ISIs shorter than this count towards burst_fraction, by default 0.005
+        epochs, units, trials : optional
+            Subsets, as in to_psth
+
+        Returns
+        -------
+        statistics : xr.Dataset
+            n_isi, mean_isi, cv, lv, burst_fraction, gamma_shape and
+            gamma_scale with dims ['unitid', ('epoch')] or
+            ['trialid', 'unitid', ('epoch')]
+        """
+        if by not in ("unit", "trial"):
+            raise ValueError(f"by must be 'unit' or 'trial', not {by!r}")
+        spike_times, codes, dims, coords = self._row_codes(epochs, units, trials)
+        shape = [len(coords[dim]) for dim in dims]
+        trains = linear_index(codes, shape)
+        keep = trains >= 0
+        n_trains = int(np.prod(shape))
+        if by == "unit":
+            # the trains of a unit (and epoch) differ only by their trial
+            group_shape = shape[1:]
+            groups = np.arange(n_trains) % int(np.prod(group_shape))
+            coords.pop("trialid")
+            dims, shape = dims[1:], group_shape
+        else:
+            groups = None
+        statistics = isi_statistics(
+            spike_times[keep],
+            trains[keep],
+            n_trains,
+            groups=groups,
+            n_groups=int(np.prod(shape)),
+            burst_isi=burst_isi,
+        )
+        return xr.Dataset(
+            {name: (dims, values.reshape(shape)) for name, values in statistics.items()},
+            coords=coords,
+        )
+
+    def to_sdf(
+        self,
+        window: str | Tuple[str, int] | Callable[[np.ndarray], np.ndarray]="psp",
+        epochs: Optional[Sequence[str]] = None,
+        max_block_bytes: int = 1 << 27,
+        chunks: Optional[Mapping[str, int]] = None,
+        method: str = "fft",
+    ) -> xr.DataArray:
+        """Spike density function: the 1 ms PSTH convolved with a kernel along time
+
+        Parameters
+        ----------
+        window : str, tuple or callable
+            "psp" (20 ms causal PSP kernel), ("gaussian", window_size) or a
+            function applied to each 1-D time series
+        epochs : Sequence[str] or None
+            see to_psth
+        max_block_bytes : int
+            Rows are convolved in blocks of at most this many float32 bytes,
+            by default 128 MiB
+        chunks : mapping or None
+            If provided, the PSTH is split into dask chunks along the non-time
+            dims (e.g. {"trialid": 500}) and the blocks are convolved lazily
+        method : str
+            "fft" convolves the binned PSTH. "events" adds the kernel at each
+            spike's exact time instead (see kernel_density), which is much
+            cheaper when most bins are empty (low rates, long windows).
+            Only for "psp" and "gaussian" windows
+
+        Returns
+        -------
+        sdf : xr.DataArray
+            float32, same dims as the PSTH
+        """
         if window == "psp":
             window_size = 0.02  # 20 ms default
             def psp_kernel(t, tau=0.005, t_peak=0.001):
@@ -325,8 +992,6 @@ class SpikeTrainSet:
                 return k
             t_kernel = np.arange(0, window_size, 0.001)
             kernel = psp_kernel(t_kernel)
-            def convolve(signal):
-                return np.convolve(signal, kernel, mode='same').astype(np.float32)
         elif isinstance(window, tuple) and window[0] == "gaussian":
             window_size = window[1]
             def gaussian_kernel(t, sigma=0.005):
@@ -335,22 +1000,68 @@ class SpikeTrainSet:
                 return k
             t_kernel = np.arange(-window_size / 2, window_size / 2, 0.001)
             kernel = gaussian_kernel(t_kernel)
-            def convolve(signal):
-                return np.convolve(signal, kernel, mode='same').astype(np.float32)
         elif callable(window):
-            convolve = window  # type: ignore
+            kernel = None
         else:
             raise ValueError("Invalid window parameter")
 
-        sdf = xr.apply_ufunc(
-            convolve,
+        if method == "events":
+            if kernel is None:
+                raise ValueError("method='events' requires a 'psp' or 'gaussian' window")
+            return self._event_sdf(kernel, epochs)
+        elif method != "fft":
+            raise ValueError(f"Invalid method: {method}")
+        psth = self.to_psth(time_step=0.001, epochs=epochs)
+        if chunks is not None:
+            psth = psth.chunk({**chunks, "time": -1})
+        if kernel is None:
+            return xr.apply_ufunc(
+                window,
+                psth,
+                input_core_dims=[["time"]],
+                output_core_dims=[["time"]],
+                vectorize=True,
+                dask="parallelized",
+                output_dtypes=[np.float32],
+            )
+        # one batched FFT convolution per block of rows instead of a loop over rows
+        return xr.apply_ufunc(
+            convolve_time,
             psth,
+            kwargs={"kernel": kernel, "max_block_bytes": max_block_bytes},
             input_core_dims=[["time"]],
             output_core_dims=[["time"]],
-            vectorize=True,
             dask="parallelized",
             output_dtypes=[np.float32],
         )
+
+    def _event_sdf(self, kernel: np.ndarray, epochs: Optional[Sequence[str]] = None) -> xr.DataArray:
+        """to_sdf without the dense PSTH: kernel samples are stamped at each spike"""
+        spike_times, codes, dims, coords = self._row_codes(epochs)
+        left, right = self.window
+        time_bin_array = np.arange(left - 0.0005, right + 0.001, 0.001)
+        coords["time"] = time_bin_array[:-1] + 0.0005
+        dims = dims + ["time"]
+        shape = [len(coords[dim]) for dim in dims]
+        # lags of the kernel samples as applied by np.convolve(..., mode='same')
+        lags = (np.arange(kernel.size) - (kernel.size - 1) // 2) * 0.001
+        kernel_fn, support = sampled_kernel(kernel, lags)
+        in_bins = (spike_times >= time_bin_array[0]) & (spike_times <= time_bin_array[-1])
+        rows = linear_index(codes, shape[:-1])
+        sdf = kernel_density(
+            spike_times[in_bins],
+            rows[in_bins],
+            int(np.prod(shape[:-1])),
+            coords["time"],
+            kernel_fn,
+            support,
+        )
+        sdf = xr.DataArray(sdf.reshape(shape), coords=coords, dims=dims)
+        if self.trial_metadata is not None:
+            sdf = sdf.assign_coords({
+                col: ("trialid", self.trial_metadata.loc[coords["trialid"], col].to_numpy())
+                for col in self.trial_metadata.columns
+            })
         return sdf
 
     def get_plotting_data(self, 
@@ -359,16 +1070,46 @@ class SpikeTrainSet:
             palette: Optional[str | Mapping]=None,
             psth_params: Optional[Mapping]=None
         ):
+        """Raster and PSTH data for plotting (see SpikeTrainSetViewer)
+
+        Trial positions and group codes are computed once per trial and
+        broadcast to the spikes with integer takes.
+
+        Parameters
+        ----------
+        group : str, list of str or None
+            Trial metadata column(s) to color (and sort) trials by
+        sort : str, list of str or None
+            Trial metadata column(s) to sort trials by
+        palette : str, mapping or None
+            Name of a matplotlib colormap (by default 'Set1' if grouped) or a
+            mapping of group tuples to colors
+        psth_params : mapping or None
+            Keyword arguments of condition_psth. If None, no PSTH is computed
+
+        Returns
+        -------
+        output : pd.DataFrame
+            One row per spike: 'trialid' (the position of its trial in the
+            sort order), 'unitid', 'spike_times', 'epoch' (categorical) and
+            'groupids' (-1 for trials with a missing group) if grouped. The
+            (n_spikes, 4) float32 RGBA color of each spike is in
+            output.attrs['colors'] (it used to be a 'colors' column of tuples)
+        psth : xr.DataArray or None
+        palette : dict
+            Color of each group
+        """
         # if a sort parameter is provided, we will sort trials by those values
         # if grouped, we will sort by group at the end
         sort_keys = []
         output = {}
-        unique_groups = np.ones(self.trialids.size, dtype=int)  # Default to single group if no grouping
+        trials, trial_codes = np.unique(self.trialids, return_inverse=True)
+        trial_positions = np.arange(trials.size)
+        trial_colors = np.zeros((trials.size, 4), dtype=np.float32)
+        trial_colors[:, 3] = 1
         if self.trial_metadata is None:
             if sort is not None or group is not None:
                 raise ValueError("Cannot sort or group trials without trial metadata")
-            else:
-                _, trialids = np.unique(self.trialids, return_inverse=True)
         else:
             if sort is not None:
                 if isinstance(sort, str):
@@ -384,18 +1125,18 @@ class SpikeTrainSet:
                 sort_keys.extend(group)
 
             if sort_keys:
-                sorted_table = self.trial_metadata.sort_values(by=sort_keys, ascending=True)
-                sorted_table['sorted_trialid'] = np.arange(len(sorted_table))
-                trialids = sorted_table.loc[self.trialids, 'sorted_trialid'].values
-            else:
-                _, trialids = np.unique(self.trialids, return_inverse=True)
-        
+                sorted_index = self.trial_metadata.sort_values(by=sort_keys, ascending=True).index
+                trial_positions = sorted_index.get_indexer(trials)
+
             if group is not None:
-                groupdata = self.trial_metadata.loc[self.trialids, group]
-                mask = groupdata.isna().any(axis=1)
+                groupdata = self.trial_metadata.loc[trials, group]
+                mask = groupdata.isna().any(axis=1).values
                 groupdata = groupdata.to_records(index=False) #type: ignore
-                unique_groups, output['groupids'] = np.unique(groupdata, return_inverse=True)
-                output['groupids'] = np.where(mask, -1, output['groupids'])
+                # missing values are left out, so each group gets one code
+                unique_groups, valid_groups = np.unique(groupdata[~mask], return_inverse=True)
+                trial_groups = np.full(trials.size, -1)
+                trial_groups[~mask] = valid_groups
+                output['groupids'] = trial_groups[trial_codes]
 
                 if palette is None:
                     palette = 'Set1'
@@ -407,110 +1148,242 @@ class SpikeTrainSet:
                     else:
                         colors = cmap(np.arange(cmap.N))
 
+                    present = np.unique(trial_groups[trial_groups >= 0])
                     palette = {
-                        tuple(g): colors[i % len(colors)]
-                        for i, g in enumerate(unique_groups)
-                        if i in output['groupids']
+                        tuple(unique_groups[i]): colors[i % len(colors)]
+                        for i in present
                     }
-                colors = np.array([palette.get(tuple(g), (0,0,0)) for g in unique_groups])
-                output['colors'] = list(map(tuple, np.take(colors, output['groupids'], axis=0)))
+                from matplotlib.colors import to_rgba
+                group_colors = np.array(
+                    [to_rgba(palette.get(tuple(g), (0, 0, 0))) for g in unique_groups] + [(0, 0, 0, 1)],
+                    dtype=np.float32,
+                )
+                # trials with a missing group (-1) take the last row (black)
+                trial_colors = group_colors[trial_groups]
 
         if psth_params is None:
             # psth_params = {}
             psth = None
         else:
-            psth = self.to_psth(**psth_params)
-            if group is not None:
-                psth = psth.groupby(group).mean()
-            else:
-                psth = psth.mean(dim='trialid')
+            psth = self.condition_psth(by=group, **psth_params)
 
-        output['trialid'] = trialids
+        output['trialid'] = trial_positions[trial_codes]
         output['unitid'] = self.unitids
         output['spike_times'] = self.spike_times
         if self.epochids is not None:
             if self.epoch_names is not None:
-                output['epoch'] = np.take(self.epoch_names, self.epochids)
+                output['epoch'] = pd.Categorical.from_codes(self.epochids, self.epoch_names)
             else:
                 output['epoch'] = self.epochids
 
-        if output.get('colors') is None:
-            output['colors'] = [(0,0,0)] * len(output['trialid'])
+        if group is None:
             palette = {'default': (0, 0, 0)}
         output = pd.DataFrame(output)
+        output.attrs['colors'] = trial_colors[trial_codes]
         return output, psth, palette
 
     def get_firing_rates(
-        self, window: Optional[Tuple[float, float]] = None
+        self,
+        window: Optional[Tuple[float, float]] = None,
+        windows: Optional[Sequence[Tuple[float, float]]] = None,
+        width: Optional[float] = None,
+        step: Optional[float] = None,
+        epochs: Optional[Sequence[str]] = None,
+        units: Optional[ArrayLike] = None,
+        trials: Optional[ArrayLike] = None,
     ) -> xr.DataArray:
-        if window is None:
-            window = self.window
-        # check that the window is within the range of the spike times
-        if window[0] < self.window[0] or window[1] > self.window[1]:
+        """Firing rates (spikes / duration) in one or many windows
+
+        Spikes in [start, end] are counted in every window at once: each spike
+        is located among the sorted window edges with searchsorted and the
+        cumulative counts per row at the edges are differenced.
+
+        Parameters
+        ----------
+        window : tuple or None
+            A single (start, end) window, by default the window of the
+            SpikeTrainSet. Ignored if windows or width is given
+        windows : sequence of tuple or None
+            (start, end) of each window; windows may overlap
+        width, step : float or None
+            Sliding windows of the given width, every step, spanning the
+            window of the SpikeTrainSet
+        epochs, units, trials : optional
+            Subsets, as in to_psth
+
+        Returns
+        -------
+        fr : xr.DataArray
+            For a single window, dims ['trialid', 'unitid', ('epoch',) 'time']
+            with one time bin at the window center. Otherwise the last dim is
+            'window', with 'window_start' and 'window_end' coordinates
+        """
+        single = windows is None and width is None
+        if width is not None:
+            if step is None:
+                raise ValueError("step must be provided with width")
+            n_windows = int(np.floor((self.window[1] - self.window[0] - width) / step + 1e-9)) + 1
+            starts = self.window[0] + np.arange(max(n_windows, 0)) * step
+            bounds = np.column_stack([starts, starts + width])
+        elif windows is not None:
+            bounds = np.asarray(windows, dtype=np.float64).reshape(-1, 2)
+        else:
+            bounds = np.asarray([self.window if window is None else window], dtype=np.float64)
+        # check that the windows are within the range of the spike times
+        if (bounds[:, 0] < self.window[0]).any() or (bounds[:, 1] > self.window[1]).any():
             raise ValueError(
                 "Window must be within the range of the provided SpikeTrainSet"
             )
-        duration = window[1] - window[0]
-        fr = self.to_psth(time_bins=window) / duration
+        if (bounds[:, 0] > bounds[:, 1]).any():
+            raise ValueError("Window start must be less than or equal to window end")
+
+        spike_times, codes, dims, coords = self._row_codes(epochs, units, trials)
+        edges, edge_codes = np.unique(bounds, return_inverse=True)
+        edge_codes = edge_codes.reshape(bounds.shape)
+        shape = [len(coords[dim]) for dim in dims] + [edges.size + 1]
+        # spikes before each edge (for starts) and up to each edge (for ends)
+        before = bincount_nd(codes + [np.searchsorted(edges, spike_times, side="right")], shape)
+        up_to = bincount_nd(codes + [np.searchsorted(edges, spike_times, side="left")], shape)
+        before = np.cumsum(before, axis=-1)
+        up_to = np.cumsum(up_to, axis=-1)
+        counts = up_to[..., edge_codes[:, 1]] - before[..., edge_codes[:, 0]]
+        fr = counts / (bounds[:, 1] - bounds[:, 0])
+
+        if single:
+            dims = dims + ["time"]
+            coords["time"] = bounds.mean(axis=1)
+        else:
+            dims = dims + ["window"]
+            coords["window"] = np.arange(bounds.shape[0])
+        fr = xr.DataArray(fr, coords=coords, dims=dims)
+        if not single:
+            fr = fr.assign_coords(window_start=("window", bounds[:, 0]), window_end=("window", bounds[:, 1]))
+        if self.trial_metadata is not None:
+            fr = fr.assign_coords({
+                col: ("trialid", self.trial_metadata.loc[coords["trialid"], col].to_numpy())
+                for col in self.trial_metadata.columns
+            })
         return fr
 
-    def save(self, path: str):
-        """Save the SpikeTrainSet as a DataArray in a zip file."""
+    _index_arrays = ("units", "unit_ptr", "row_trials", "row_ptr")
+
+    def save(self, path: str, metadata_format: Optional[str] = None):
+        """Save the SpikeTrainSet in a zip file
+
+        Arrays are stored uncompressed with their data aligned in the file, so
+        `load(path, mmap=True)` maps them without copying (see
+        simianpy.analysis.spiketrain.storage).
+
+        Parameters
+        ----------
+        path : str
+        metadata_format : {'parquet', 'csv'} or None
+            Format of the trial metadata. Parquet keeps dtypes; by default it
+            is used if pyarrow (or fastparquet) is installed, else CSV
+        """
+        if metadata_format is None:
+            metadata_format = "parquet" if _has_parquet() else "csv"
+        if metadata_format not in ("parquet", "csv"):
+            raise ValueError(f"metadata_format must be 'parquet' or 'csv', not {metadata_format!r}")
         with zipfile.ZipFile(path, "w") as zf:
-            with zf.open("spike_times.npy", "w") as f:
-                np.save(f, self.spike_times)
-            with zf.open("trialids.npy", "w") as f:
-                np.save(f, self.trialids)
-            with zf.open("unitids.npy", "w") as f:
-                np.save(f, self.unitids)
+            write_array(zf, "spike_times.npy", self.spike_times)
+            write_array(zf, "trialids.npy", self.trialids)
+            write_array(zf, "unitids.npy", self.unitids)
             with zf.open("window.txt", "w") as f:
                 value = f"{self.window[0]} {self.window[1]}"
                 f.write(value.encode("utf-8"))
-            # Save trial metadata as CSV if present
             if self.trial_metadata is not None:
-                with zf.open("trial_metadata.csv", "w") as f:
-                    csv_bytes = self.trial_metadata.to_csv().encode("utf-8")
-                    f.write(csv_bytes)
+                if metadata_format == "parquet":
+                    with zf.open("trial_metadata.parquet", "w") as f:
+                        f.write(self.trial_metadata.to_parquet())
+                else:
+                    with zf.open("trial_metadata.csv", "w") as f:
+                        csv_bytes = self.trial_metadata.to_csv().encode("utf-8")
+                        f.write(csv_bytes)
             if self.epochids is not None:
-                with zf.open("epochids.npy", "w") as f:
-                    np.save(f, self.epochids)
+                write_array(zf, "epochids.npy", self.epochids)
             if self.epoch_names is not None:
                 with zf.open("epoch_names.txt", "w") as f:
                     f.write("\n".join(self.epoch_names).encode("utf-8"))
+            if self.index is not None:
+                for name in self._index_arrays:
+                    with zf.open(f"index_{name}.npy", "w") as f:
+                        np.save(f, getattr(self.index, name))
 
     @classmethod
-    def load(cls, path: str) -> "SpikeTrainSet":
+    def load(cls, path: str, mmap: bool = False, units: Optional[ArrayLike] = None) -> "SpikeTrainSet":
+        """Load a SpikeTrainSet saved with `save`
+
+        Parameters
+        ----------
+        path : str
+        mmap : bool, optional
+            If True, arrays are read-only memory maps of the file instead of
+            in-memory copies, by default False. Files written by older
+            versions are mapped too but their arrays may be unaligned
+        units : array_like or None, optional
+            Only load the spikes of these units. With a stored index (see
+            build_index) only their spans of the file are read
+
+        Returns
+        -------
+        SpikeTrainSet
+        """
+        names = ["spike_times", "trialids", "unitids"]
         with zipfile.ZipFile(path, "r") as zf:
-            with zf.open("spike_times.npy") as f:
-                spike_times = np.load(f)
-            with zf.open("trialids.npy") as f:
-                trialids = np.load(f)
-            with zf.open("unitids.npy") as f:
-                unitids = np.load(f)
+            members = set(zf.namelist())
+            if "epochids.npy" in members:
+                names.append("epochids")
+            arrays = {
+                name: read_array(path, zf, f"{name}.npy", mmap=mmap or units is not None)
+                for name in names
+            }
             with zf.open("window.txt") as f:
                 window = tuple(map(float, f.read().decode("utf-8").split()))
                 if len(window) != 2:
                     raise ValueError("Window must be a tuple of length 2")
-            # Try to load trial metadata
-            try:
+            if "trial_metadata.parquet" in members:
+                with zf.open("trial_metadata.parquet") as f:
+                    trial_metadata = pd.read_parquet(io.BytesIO(f.read()))
+            elif "trial_metadata.csv" in members:
                 with zf.open("trial_metadata.csv") as f:
                     trial_metadata = pd.read_csv(io.StringIO(f.read().decode("utf-8")), index_col=0)
-            except KeyError:
+            else:
                 trial_metadata = None
-            
-            # Try to load epochids
-            try:
-                with zf.open("epochids.npy") as f:
-                    epochids = np.load(f)
-            except KeyError:
-                epochids = None
-            # Try to load epoch names
-            try:
+            if "epoch_names.txt" in members:
                 with zf.open("epoch_names.txt") as f:
                     epoch_names = f.read().decode("utf-8").splitlines()
-            except KeyError:
+            else:
                 epoch_names = None
-        return cls(trialids, unitids, spike_times, window, trial_metadata=trial_metadata, epochids=epochids, epoch_names=epoch_names)
+            if all(f"index_{name}.npy" in members for name in cls._index_arrays):
+                index_arrays = {}
+                for name in cls._index_arrays:
+                    with zf.open(f"index_{name}.npy") as f:
+                        index_arrays[name] = np.load(f)
+                index = SpikeIndex(**index_arrays)
+            else:
+                index = None
+
+        if units is not None:
+            if index is not None:
+                spikes = index.spikes(units=units)
+            else:
+                spikes = np.isin(arrays["unitids"], units)
+            arrays = {name: array[spikes] for name, array in arrays.items()}
+            if index is not None:
+                index = SpikeIndex.build(arrays["unitids"], arrays["trialids"])
+        if not mmap:
+            arrays = {name: np.array(array) for name, array in arrays.items()}
+        return cls(
+            arrays["trialids"],
+            arrays["unitids"],
+            arrays["spike_times"],
+            window,
+            trial_metadata=trial_metadata,
+            epochids=arrays.get("epochids"),
+            epoch_names=epoch_names,
+            index=index,
+        )
 
     def view(self):
         if not pyqtmgl or launch_viewer is None:
@@ -115,6 +115,7 @@ class SpikeTrainSetViewer(QtWidgets.QWidget):
             group=group,
             psth_params=dict(time_step=timestep),
         )
+        self.colors = self.spk.attrs['colors']
         for plot in self.psthplots:
             plot.nodes_by_name.clear() #TODO: implement direct clear method
             for group in self.cmap.keys():
@@ -140,7 +141,7 @@ class SpikeTrainSetViewer(QtWidgets.QWidget):
                 epochpsth = self.psth.query("unitid == @unitid & epoch == @epoch")
 
             # Raster
-            colors = np.array(epochspk.colors.values.tolist())
+            colors = self.colors[epochspk.index.values, :3]
             self.rasterplots[i].update_node('raster',
                 x=epochspk.spike_times,
                 y=epochspk.trialid,
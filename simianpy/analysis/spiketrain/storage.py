@@ -0,0 +1,87 @@
+"""Uncompressed, aligned npy members in zip files
+
+Arrays are stored (not deflated) and the local header of each member is
+padded with an extra field so that the array data, after the npy header,
+starts on an `ALIGNMENT` byte boundary. The arrays can then be memory mapped
+straight from the zip file.
+"""
+import io
+import struct
+import zipfile
+
+import numpy as np
+
+ALIGNMENT = 4096
+# extra field id used for padding (as written by Android's zipalign)
+_PADDING_ID = 0xD935
+_LOCAL_HEADER_SIZE = 30
+_ZIP64_EXTRA_SIZE = 20
+
+
+def _npy_header_size(array: np.ndarray) -> int:
+    """Size of the header np.save writes before the data of array"""
+    header = np.lib.format.header_data_from_array_1_0(array)
+    buffer = io.BytesIO()
+    try:
+        np.lib.format.write_array_header_1_0(buffer, header)
+    except ValueError:
+        np.lib.format.write_array_header_2_0(buffer, header)
+    return buffer.tell()
+
+
+def write_array(zf: zipfile.ZipFile, name: str, array: np.ndarray, alignment: int = ALIGNMENT):
+    """np.save array as an uncompressed member whose data is aligned in the file"""
+    array = np.asanyarray(array)
+    zinfo = zipfile.ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0))
+    zinfo.compress_type = zipfile.ZIP_STORED
+    zip64 = array.nbytes + alignment > zipfile.ZIP64_LIMIT
+    # zf.start_dir is where the next local header is written
+    header_size = (
+        _LOCAL_HEADER_SIZE
+        + len(name.encode("utf-8"))
+        + 4
+        + (_ZIP64_EXTRA_SIZE if zip64 else 0)
+        + _npy_header_size(array)
+    )
+    padding = -(zf.start_dir + header_size) % alignment
+    zinfo.extra = struct.pack("<HH", _PADDING_ID, padding) + b"\0" * padding
+    with zf.open(zinfo, "w", force_zip64=zip64) as f:
+        np.save(f, array)
+
+
+def _data_offset(fp, zinfo: zipfile.ZipInfo) -> int:
+    """Offset of the member data in the zip file, from its local header"""
+    fp.seek(zinfo.header_offset)
+    header = fp.read(_LOCAL_HEADER_SIZE)
+    name_length, extra_length = struct.unpack("<HH", header[26:30])
+    return zinfo.header_offset + _LOCAL_HEADER_SIZE + name_length + extra_length
+
+
+def read_array(path, zf: zipfile.ZipFile, name: str, mmap: bool = False) -> np.ndarray:
+    """Load an npy member, memory mapped (read only) if mmap and the member is stored
+
+    Deflated members and object arrays are always read into memory.
+    """
+    zinfo = zf.getinfo(name)
+    if mmap and zinfo.compress_type == zipfile.ZIP_STORED:
+        with open(path, "rb") as fp:
+            fp.seek(_data_offset(fp, zinfo))
+            version = np.lib.format.read_magic(fp)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fp)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fp)
+            offset = fp.tell()
+        if not dtype.hasobject:
+            if int(np.prod(shape)) == 0:
+                return np.empty(shape, dtype=dtype)
+            return np.memmap(
+                path,
+                dtype=dtype,
+                mode="r",
+                offset=offset,
+                shape=shape,
+                order="F" if fortran_order else "C",
+            )
+    with zf.open(name) as f:
+        return np.load(f)
@@ -4,21 +4,33 @@ Tools
 -----
     Nex -- class for working with Neuroexplorer files
     OpenEphys -- class for working with OpenEphys files
+    OpenEphysBinary -- class for working with OpenEphys binary format recordings
     RHS -- class for working with Intan RHS files
+    Phy -- class for working with Kilosort/Phy spike sorting output
+    Trodes -- class for working with SpikeGadgets Trodes extracted files
+    TrodesRec -- class for reading SpikeGadgets Trodes '.rec' files directly
+    Recording -- interface for chunked access to continuous data (see `get_recording`)
     ephys2nex -- convert OpenEphys files to Neuroexplorer (.nex) files
+    recording_to_nex -- stream any Recording into a nex5 file, with optional band-pass and decimation
+    export_binary -- write any Recording to an interleaved int16 file for spike sorters
 
 
 Modules
 -------
     File -- baseclass for file io
     nex -- io for Neuroexplorer file format ('.nex', '.nex5')
-    openephys -- io for OpenEphys file format ('.continuous', '.spikes', '.events')
+    openephys -- io for OpenEphys file formats ('.continuous', '.spikes', '.events', 'structure.oebin')
     intan -- io for intan file formats ('.rhs')
+    trodes -- io for SpikeGadgets Trodes file formats ('.rec' and extracted files)
+    phy -- io for Kilosort/Phy spike sorting output ('spike_times.npy', 'cluster_group.tsv')
+    recording -- chunked continuous data interface shared by all readers
     convert -- functions for converting between file formats
 """
-from .convert import ephys2nex
+from .convert import ephys2nex, recording_to_nex
 from .intan import RHS
 from .nex import Nex
-from .openephys import OpenEphys
-from .raw import load_raw
-from .trodes import Trodes
+from .openephys import OpenEphys, OpenEphysBinary
+from .phy import Phy
+from .raw import export_binary, load_raw, load_raw_recording
+from .recording import ArrayRecording, ChannelListRecording, Recording
+from .trodes import Trodes, TrodesRec
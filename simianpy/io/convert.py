@@ -2,17 +2,21 @@
 
 Currently implemented:
 ephys2nex -- convert OpenEphys files to Neuroexplorer (nex) files
+recording_to_nex -- stream any Recording into a nex5 file of continuous variables
 """
 import os
 import time
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from itertools import groupby
 
 import numpy as np
-import scipy
 
 from simianpy.io.nex.nexfile import NexWriter
+from simianpy.io.nex.stream import Nex5ContinuousWriter
 from simianpy.io.openephys import load
+from simianpy.io.recording import ArrayRecording
+from simianpy.signal.resample import Resampler, resample
 from simianpy.misc import getLogger
 
 
@@ -156,12 +160,18 @@ def ephys2nex(
         continuous_fpath = os.path.join(ephys_path, fname)
         continuous_data = load(continuous_fpath, logger)
 
-        # decimates by factor 30, using Chebyshev type I infinite impulse response filter of order 8 (in theory this is the same as MATLAB decimate)
+        # polyphase resampling to SamplingRate_continuous with an anti-aliasing FIR filter
+        recording = ArrayRecording(
+            continuous_data["data"][:, None],
+            sampling_rate=int(continuous_data["header"]["sampleRate"]),
+            t_start=continuous_data["timestamps"][0],
+        )
+        timestamps, values = resample(recording, SamplingRate_continuous)
         writer.AddContVarWithSingleFragment(
             name=eye_channel,
-            timestampOfFirstDataPoint=continuous_data["timestamps"][0],
+            timestampOfFirstDataPoint=timestamps[0],
             SamplingRate=SamplingRate_continuous,
-            values=scipy.signal.decimate(continuous_data["data"], 30),
+            values=values[:, 0],
         )
 
     # add event codes
@@ -196,4 +206,153 @@ def ephys2nex(
     writer.WriteNexFile(nexfile_path)
 
     logger.info(f"\nSuccessfully wrote nexfile at path: {nexfile_path}")
-    logger.info(f"Total time: {(time.time() - start_time):.3f} seconds\n\n")
\ No newline at end of file
+    logger.info(f"Total time: {(time.time() - start_time):.3f} seconds\n\n")
+
+
+def recording_to_nex(
+    recording,
+    nexfile_path,
+    channel_names=None,
+    channels=None,
+    band=None,
+    filter_order=3,
+    resample_to=None,
+    scale=1.0,
+    ADtoMV=None,
+    timestampFrequency=None,
+    chunksize=1e6,
+    margin=None,
+    n_jobs=None,
+    pbar=False,
+    logger=None,
+):
+    """Write channels of a Recording as nex5 continuous variables, chunk by chunk
+
+    Each block of `chunksize` samples is optionally band-pass filtered
+    (zero-phase, using `margin` samples of context on each side of the block)
+    and resampled with a streaming polyphase Resampler. Groups of channels are
+    processed on a thread pool and written straight to their place in the
+    file with Nex5ContinuousWriter, so memory use is bounded by the block size.
+
+    Parameters
+    ----------
+    recording: simianpy.io.Recording
+    nexfile_path: str or Path
+        Must end with '.nex5'
+    channel_names: list of str or None, optional, default: None
+        Name of each variable. If None, 'AD{idx}'
+    channels: list or None, optional, default: None
+        Subset of the recording's channels
+    band: tuple of float or None, optional, default: None
+        (low, high) cutoffs in Hz of a Butterworth band-pass. None for either
+        bound gives a high-pass or low-pass filter
+    filter_order: int, optional, default: 3
+    resample_to: float or None, optional, default: None
+        Output sampling rate in Hz. If None, the recording's sampling rate
+    scale: float, optional, default: 1.0
+        Multiplies the samples, e.g. to convert them to mV
+    ADtoMV: float or None, optional, default: None
+        see Nex5ContinuousWriter. If None, values are stored as float32
+    timestampFrequency: float or None, optional, default: None
+        If None, the recording's sampling rate
+    chunksize: int, optional, default: 1e6
+    margin: int or None, optional, default: None
+        Context (in samples) read around each block for filtering.
+        If None, 3 periods of the lowest cutoff frequency
+    n_jobs: int or None, optional, default: None
+        Number of threads. Channels are split into this many groups
+    pbar: bool, optional, default: False
+    logger: logging.Logger, optional
+    """
+    import scipy.signal
+
+    if logger is None:
+        logger = getLogger(__name__)
+    if not str(nexfile_path).endswith(".nex5"):
+        raise ValueError(f"nexfile_path must end with '.nex5': {nexfile_path}")
+    chunksize = int(chunksize)
+    if channels is None:
+        channels = list(range(recording.n_channels))
+    if channel_names is None:
+        channel_names = [f"AD{idx}" for idx in range(len(channels))]
+    if len(channel_names) != len(channels):
+        raise ValueError(
+            f"Got {len(channel_names)} channel names for {len(channels)} channels"
+        )
+    fs = recording.sampling_rate
+    if timestampFrequency is None:
+        timestampFrequency = fs
+
+    sos = None
+    if band is not None:
+        low, high = band
+        if low is not None and high is not None:
+            btype, cutoff = "bandpass", [low, high]
+        elif low is not None:
+            btype, cutoff = "highpass", low
+        else:
+            btype, cutoff = "lowpass", high
+        sos = scipy.signal.butter(filter_order, cutoff, btype=btype, fs=fs, output="sos")
+        if margin is None:
+            margin = int(np.ceil(3 * fs / min(np.atleast_1d(cutoff))))
+    margin = 0 if sos is None else int(margin)
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    groups = [group for group in np.array_split(np.arange(len(channels)), n_jobs) if group.size]
+    if resample_to is None or resample_to == fs:
+        resamplers = None
+        sampling_rate = fs
+        n_out = recording.n_samples
+    else:
+        resamplers = [Resampler.from_rates(fs, resample_to) for _ in groups]
+        sampling_rate = fs * resamplers[0].up / resamplers[0].down
+        n_out = resamplers[0].n_out(recording.n_samples)
+    t_start = float(recording.get_times(0, 1)[0]) if recording.n_samples else 0.0
+
+    def _process(group_idx, chunk_start, chunk_stop, out_start):
+        group = groups[group_idx]
+        left = min(margin, chunk_start)
+        right = min(margin, recording.n_samples - chunk_stop)
+        traces = recording.get_traces(
+            chunk_start - left, chunk_stop + right, [channels[idx] for idx in group]
+        ).astype(np.float32)
+        if scale != 1:
+            traces *= scale
+        if sos is not None:
+            traces = scipy.signal.sosfiltfilt(sos, traces, axis=0)
+        traces = traces[left : traces.shape[0] - right]
+        if resamplers is not None:
+            traces = resamplers[group_idx](
+                traces, final=chunk_stop == recording.n_samples
+            )
+        for column, idx in enumerate(group):
+            writer.write(idx, out_start, traces[:, column])
+        return traces.shape[0]
+
+    logger.info(
+        f"Writing {len(channels)} channels at {sampling_rate} Hz to {nexfile_path}"
+    )
+    starts = range(0, recording.n_samples, chunksize)
+    if pbar:
+        from tqdm import tqdm
+
+        starts = tqdm(starts, desc="Writing continuous data")
+    with Nex5ContinuousWriter(
+        nexfile_path,
+        timestampFrequency,
+        channel_names,
+        n_out,
+        sampling_rate,
+        t_start=t_start,
+        ADtoMV=ADtoMV,
+    ) as writer, ThreadPoolExecutor(len(groups)) as pool:
+        out_start = 0
+        for chunk_start in starts:
+            chunk_stop = min(chunk_start + chunksize, recording.n_samples)
+            futures = [
+                pool.submit(_process, idx, chunk_start, chunk_stop, out_start)
+                for idx in range(len(groups))
+            ]
+            # every group advances its resampler by the same number of samples
+            out_start += [future.result() for future in futures][0]
+    return nexfile_path
@@ -1 +1 @@
-from .io import load, RHS
+from .io import load, RHS, RHSRecording
@@ -2,6 +2,7 @@ import numpy as np
 import pandas as pd
 
 from ..File import File
+from ..recording import ChannelListRecording, Recording
 from . import load_intan_rhs_format
 
 
@@ -101,6 +102,31 @@ class RHS(File):
 
         return continuous_data
 
+    def get_recording(self, keys=None):
+        """Get continuous data described in the recipe as a Recording
+
+        Parameters
+        ----------
+        keys: list of str or None, optional, default: None
+            subset of continuous data that will be included
+            if None, includes all continuous data in the recipe
+
+        Returns
+        -------
+        recording: ChannelListRecording
+            Channels can be selected by name
+        """
+        vars = self.recipe["continuous_data"]
+        if keys is not None:
+            vars = {var["name"]: var for var in vars}
+            vars = [vars[key] for key in keys]
+        return ChannelListRecording(
+            [self._data[var["source"]][var["idx"]] for var in vars],
+            sampling_rate=self._data["frequency_parameters"]["amplifier_sample_rate"],
+            time_base=self._data["t"],
+            channel_names=[var["name"] for var in vars],
+        )
+
     def get_event_data(self):
         def _get_events(eventinfo):
             eventdata = np.sum(
@@ -128,3 +154,64 @@ class RHS(File):
             index=self.timestamps,
             columns=self.recipe["stimulation_data"],
         )
+
+
+class RHSRecording(Recording):
+    """Memory mapped amplifier data of an RHS file as a Recording of raw int16 samples
+
+    The file is not read up front, unlike RHS. Only the data blocks overlapping
+    the requested samples are read; the offset binary samples are shifted to
+    signed int16 (multiply by 0.195 for microvolts).
+
+    Parameters
+    ----------
+    filename: str or Path
+
+    Attributes
+    ----------
+    header: dict
+    channel_names: list of str
+        native channel names of the amplifier channels (e.g. 'A-000')
+    """
+
+    samples_per_block = 128
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.header, self._blocks = load_intan_rhs_format.map_data(filename)
+        self.sampling_rate = float(self.header["sample_rate"])
+        self.channel_names = [
+            channel["native_channel_name"]
+            for channel in self.header["amplifier_channels"]
+        ]
+        if self._blocks.shape[0] > 0:
+            self.t_start = int(self._blocks["t"][0, 0]) / self.sampling_rate
+
+    @property
+    def n_samples(self):
+        return self._blocks.shape[0] * self.samples_per_block
+
+    @property
+    def n_channels(self):
+        return len(self.channel_names)
+
+    def get_times(self, start=None, stop=None):
+        start, stop, _ = slice(start, stop).indices(self.n_samples)
+        first, offset = divmod(start, self.samples_per_block)
+        last = -(-max(start, stop) // self.samples_per_block)
+        t = self._blocks["t"][first:last].reshape(-1)
+        return t[offset : offset + max(0, stop - start)] / self.sampling_rate
+
+    def _get_traces(self, start, stop, channels):
+        if not isinstance(channels, slice):
+            channels = [
+                self.channel_names.index(channel) if isinstance(channel, str) else channel
+                for channel in channels
+            ]
+        first, offset = divmod(start, self.samples_per_block)
+        last = -(-stop // self.samples_per_block)
+        # (n_blocks, n_channels, 128) -> (n_samples, n_channels)
+        blocks = self._blocks["amplifier_data"][first:last][:, channels, :]
+        traces = blocks.transpose(0, 2, 1).reshape(-1, blocks.shape[1])
+        traces = traces[offset : offset + stop - start]
+        return (traces ^ np.uint16(0x8000)).view(np.int16)
@@ -95,38 +95,7 @@ def read_data(
         #         chunksize = num_data_blocks
 
         # define the data type for the data based on what channels are present
-        dtype = [("t", np.dtype("<i"), 128)]
-        if header["num_amplifier_channels"] > 0:
-            dtype.append(
-                ("amplifier_data", np.uint16, (header["num_amplifier_channels"], 128))
-            )
-            if header["dc_amplifier_data_saved"]:
-                dtype.append(
-                    (
-                        "dc_amplifier_data",
-                        np.uint16,
-                        (header["num_amplifier_channels"], 128),
-                    )
-                )
-            dtype.append(
-                ("stim_data_raw", np.uint16, (header["num_amplifier_channels"], 128))
-            )
-
-        if header["num_board_adc_channels"] > 0:
-            dtype.append(
-                ("board_adc_data", np.uint16, (header["num_board_adc_channels"], 128))
-            )
-
-        if header["num_board_dac_channels"] > 0:
-            dtype.append(
-                ("board_dac_data", np.uint16, (header["num_board_dac_channels"], 128))
-            )
-
-        if header["num_board_dig_in_channels"] > 0:
-            dtype.append(("board_dig_in_raw", np.uint16, 128))
-
-        if header["num_board_dig_out_channels"] > 0:
-            dtype.append(("board_dig_out_raw", np.uint16, 128))
+        dtype = get_data_dtype(header)
 
         # read the data using dtype into a numpy struct array
         logger.debug("Reading data from file...")
@@ -253,6 +222,73 @@ def read_data(
     return result
 
 
+def get_data_dtype(header):
+    """numpy structured dtype of a single RHS data block (128 samples)"""
+    dtype = [("t", np.dtype("<i"), 128)]
+    if header["num_amplifier_channels"] > 0:
+        dtype.append(
+            ("amplifier_data", np.uint16, (header["num_amplifier_channels"], 128))
+        )
+        if header["dc_amplifier_data_saved"]:
+            dtype.append(
+                (
+                    "dc_amplifier_data",
+                    np.uint16,
+                    (header["num_amplifier_channels"], 128),
+                )
+            )
+        dtype.append(
+            ("stim_data_raw", np.uint16, (header["num_amplifier_channels"], 128))
+        )
+
+    if header["num_board_adc_channels"] > 0:
+        dtype.append(
+            ("board_adc_data", np.uint16, (header["num_board_adc_channels"], 128))
+        )
+
+    if header["num_board_dac_channels"] > 0:
+        dtype.append(
+            ("board_dac_data", np.uint16, (header["num_board_dac_channels"], 128))
+        )
+
+    if header["num_board_dig_in_channels"] > 0:
+        dtype.append(("board_dig_in_raw", np.uint16, 128))
+
+    if header["num_board_dig_out_channels"] > 0:
+        dtype.append(("board_dig_out_raw", np.uint16, 128))
+    return dtype
+
+
+def map_data(filename):
+    """Memory map the data blocks of an RHS file without reading them
+
+    Returns
+    -------
+    header: dict
+    blocks: np.memmap
+        structured array with one record per data block of 128 samples
+    """
+    filename = Path(filename)
+    with open(filename, "rb") as f:
+        header = read_header(f)
+        offset = f.tell()
+    bytes_per_block = get_bytes_per_data_block(header)
+    bytes_remaining = os.path.getsize(filename) - offset
+    if bytes_remaining % bytes_per_block != 0:
+        raise Exception(
+            "Something is wrong with file size: should have a whole number of data blocks"
+        )
+    dtype = np.dtype(get_data_dtype(header))
+    blocks = np.memmap(
+        filename,
+        dtype=dtype,
+        mode="r",
+        offset=offset,
+        shape=(bytes_remaining // bytes_per_block,),
+    )
+    return header, blocks
+
+
 if __name__ == "__main__":
     a = read_data(sys.argv[1])
     # print(a)
@@ -1 +1,3 @@
-from .io import Nex, load, read_header
\ No newline at end of file
+from .io import Nex, load, read_header
+from .combine import combine, read_nex_headers
+from .stream import Nex5ContinuousWriter
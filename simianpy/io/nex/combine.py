@@ -0,0 +1,343 @@
+"""Merge nex files by copying variable data blocks without decoding them"""
+
+import json
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from ..raw import copy_bytes
+from .nexfile import NexFileVarType, Reader
+
+NEX_FILE_HEADER = "<i i 256s d i i i 260s"
+NEX_VAR_HEADER = "<i i 64s i i i i i i d d d d i i i d d 52s"
+NEX5_FILE_HEADER = "<i i 256s d q i Q q 56s"
+NEX5_VAR_HEADER = "<i i 64s Q Q i i d 32s d d Q d i i i i 60s"
+NEX_VAR_KEYS = [
+    "Type",
+    "Version",
+    "Name",
+    "DataOffset",
+    "Count",
+    "Wire",
+    "Unit",
+    "Gain",
+    "Filter",
+    "XPos",
+    "YPos",
+    "SamplingRate",
+    "ADtoMV",
+    "NPointsWave",
+    "NMarkers",
+    "MarkerLength",
+    "MVOffset",
+    "PreThrTime",
+    "Padding",
+]
+NEX5_VAR_KEYS = [
+    "Type",
+    "Version",
+    "Name",
+    "DataOffset",
+    "Count",
+    "TsDataType",
+    "ContDataType",
+    "SamplingRate",
+    "Units",
+    "ADtoMV",
+    "MVOffset",
+    "NPointsWave",
+    "PreThrTime",
+    "MarkerDataType",
+    "NMarkers",
+    "MarkerLength",
+    "ContFragIndexType",
+    "Padding",
+]
+MAX_INT32 = 2**31 - 1
+
+
+def read_nex_headers(filename):
+    """Read the file and variable headers of a nex/nex5 file, without any data
+
+    Returns
+    -------
+    file_data: dict
+        'FileHeader', 'Variables' (each with a 'Header') and, for nex5 files
+        with metadata, 'MetaData'
+    """
+    reader = Reader()
+    try:
+        file_data = reader.ReadHeader(str(filename))
+        meta_offset = file_data["FileHeader"].get("MetaOffset", 0)
+        if meta_offset > 0:
+            reader.theFile.seek(meta_offset)
+            try:
+                file_data["MetaData"] = json.loads(
+                    reader.theFile.read().decode("utf-8").strip("\x00").strip()
+                )
+            except ValueError:
+                pass
+    finally:
+        reader.theFile.close()
+    return file_data
+
+
+def _var_layout(header):
+    """Sections of a variable's data block: ('ts', count) or ('raw', nbytes)"""
+    value_bytes = 4 if header["ContDataType"] == 1 else 2
+    count = header["Count"]
+    var_type = header["Type"]
+    if var_type in (NexFileVarType.NEURON, NexFileVarType.EVENT):
+        return [("ts", count)]
+    elif var_type == NexFileVarType.INTERVAL:
+        return [("ts", count), ("ts", count)]
+    elif var_type == NexFileVarType.WAVEFORM:
+        return [("ts", count), ("raw", count * header["NPointsWave"] * value_bytes)]
+    elif var_type == NexFileVarType.POPULATION_VECTOR:
+        return [("raw", count * 8)]
+    elif var_type == NexFileVarType.CONTINUOUS:
+        index_bytes = 8 if header["ContFragIndexType"] == 1 else 4
+        return [
+            ("ts", count),
+            ("raw", count * index_bytes + header["NPointsWave"] * value_bytes),
+        ]
+    elif var_type == NexFileVarType.MARKER:
+        marker_bytes = header["MarkerLength"] if header["MarkerDataType"] == 0 else 4
+        return [
+            ("ts", count),
+            ("raw", header["NMarkers"] * (64 + count * marker_bytes)),
+        ]
+    raise ValueError(f"Unknown variable type: {var_type}")
+
+
+def _num_data_bytes(header):
+    ts_bytes = 8 if header["TsDataType"] == 1 else 4
+    return sum(
+        size * ts_bytes if kind == "ts" else size for kind, size in _var_layout(header)
+    )
+
+
+def combine(inputs, output, timestampFrequency=None, chunksize=1 << 24, logger=None):
+    """Combine the variables of several nex/nex5 files into one file
+
+    Only headers are parsed. Each variable's data block is copied byte for byte
+    into the output (waveform and continuous values are never rescaled);
+    timestamps are converted arithmetically, in chunks, only when the input's
+    timestamp frequency or timestamp width differs from the output's.
+
+    Parameters
+    ----------
+    inputs: list of str or Path
+    output: str or Path
+        '.nex5' or '.nex'. A '.nex' output requires 32-bit timestamps, 16-bit
+        continuous values and string markers (i.e. variables from '.nex' files)
+    timestampFrequency: float or None, optional, default: None
+        If None, the highest frequency of the inputs is used
+    chunksize: int, optional, default: 16 MiB
+        max number of bytes copied or timestamps converted at once
+    logger: logging.Logger, optional
+
+    Returns
+    -------
+    file_data: dict
+        The headers of the combined file
+    """
+    if logger is None:
+        from ...misc import getLogger
+
+        logger = getLogger(__name__)
+    output = Path(output)
+    if output.suffix not in (".nex", ".nex5"):
+        raise ValueError(f"output must be a '.nex' or '.nex5' file: {output}")
+    nex5 = output.suffix == ".nex5"
+
+    sources = [(Path(path), read_nex_headers(path)) for path in inputs]
+    if timestampFrequency is None:
+        timestampFrequency = max(data["FileHeader"]["Frequency"] for _, data in sources)
+
+    variables, names = [], set()
+    beg, end = np.inf, 0.0
+    for path, data in sources:
+        frequency = data["FileHeader"]["Frequency"]
+        ratio = timestampFrequency / frequency
+        if ratio != 1:
+            logger.info(
+                f"{path.name}: timestamps converted from {frequency} Hz to {timestampFrequency} Hz"
+            )
+        beg = min(beg, data["FileHeader"]["Beg"])
+        end = max(end, data["FileHeader"]["End"])
+        # header End (in s) bounds every timestamp of the file
+        end_ticks = data["FileHeader"]["End"] * timestampFrequency
+        metadata = data.get("MetaData", {}).get("variables", [])
+        for idx, var in enumerate(data["Variables"]):
+            header = dict(var["Header"])
+            if header["Name"] in names:
+                logger.warning(
+                    f"Duplicate variable name {header['Name']} in {path.name}"
+                )
+            names.add(header["Name"])
+            out_header = dict(header)
+            if header["TsDataType"] == 0 and end_ticks > MAX_INT32:
+                out_header["TsDataType"] = 1
+            if nex5:
+                out_header["Version"] = 500
+            else:
+                if (
+                    out_header["TsDataType"] != 0
+                    or header["ContDataType"] != 0
+                    or header["MarkerDataType"] != 0
+                    or header["ContFragIndexType"] != 0
+                ):
+                    raise ValueError(
+                        f"Variable {header['Name']} of {path.name} cannot be stored in a '.nex' file: use '.nex5'"
+                    )
+                out_header["Version"] = max(header["Version"], 102)
+                if idx < len(metadata):
+                    probe = metadata[idx].get("probe", {})
+                    out_header.setdefault("Wire", probe.get("wireNumber", 0))
+                    out_header.setdefault("Unit", metadata[idx].get("unitNumber", 0))
+                    out_header.setdefault("XPos", probe.get("position", {}).get("x", 0))
+                    out_header.setdefault("YPos", probe.get("position", {}).get("y", 0))
+            variables.append(
+                {
+                    "path": path,
+                    "header": header,
+                    "out_header": out_header,
+                    "ratio": ratio,
+                    "metadata": metadata[idx] if idx < len(metadata) else None,
+                }
+            )
+
+    n_vars = len(variables)
+    data_offset = (356 + n_vars * 244) if nex5 else (544 + n_vars * 208)
+    for var in variables:
+        var["out_header"]["DataOffset"] = data_offset
+        data_offset += _num_data_bytes(var["out_header"])
+    if not nex5 and data_offset > MAX_INT32:
+        raise ValueError("combined data exceeds the size of a '.nex' file: use '.nex5'")
+    beg = 0.0 if not np.isfinite(beg) else beg
+    beg_ticks = int(round(beg * timestampFrequency))
+    end_ticks = int(round(end * timestampFrequency))
+
+    logger.info(f"Writing {n_vars} variables to {output}")
+    with open(output, "wb") as out_file:
+        if nex5:
+            version = (
+                502 if any(v["out_header"]["TsDataType"] for v in variables) else 501
+            )
+            out_file.write(
+                struct.pack(
+                    NEX5_FILE_HEADER,
+                    894977358,
+                    version,
+                    b"",
+                    timestampFrequency,
+                    beg_ticks,
+                    n_vars,
+                    0,
+                    end_ticks,
+                    b"",
+                )
+            )
+            for var in variables:
+                out_file.write(
+                    struct.pack(
+                        NEX5_VAR_HEADER,
+                        *[
+                            _encode(var["out_header"].get(key, 0), key)
+                            for key in NEX5_VAR_KEYS
+                        ],
+                    )
+                )
+        else:
+            out_file.write(
+                struct.pack(
+                    NEX_FILE_HEADER,
+                    827868494,
+                    106,
+                    b"",
+                    timestampFrequency,
+                    beg_ticks,
+                    end_ticks,
+                    n_vars,
+                    b"",
+                )
+            )
+            for var in variables:
+                out_file.write(
+                    struct.pack(
+                        NEX_VAR_HEADER,
+                        *[
+                            _encode(var["out_header"].get(key, 0), key)
+                            for key in NEX_VAR_KEYS
+                        ],
+                    )
+                )
+
+        handles = {}
+        try:
+            for var in variables:
+                path = var["path"]
+                if path not in handles:
+                    handles[path] = open(path, "rb")
+                _copy_var(handles[path], out_file, var, chunksize)
+        finally:
+            for handle in handles.values():
+                handle.close()
+
+        if nex5:
+            meta_offset = out_file.tell()
+            metadata = {
+                "file": {"writerSoftware": {"name": "simianpy.io.nex.combine"}},
+                "variables": [
+                    var["metadata"] or {"name": var["out_header"]["Name"]}
+                    for var in variables
+                ],
+            }
+            out_file.write(json.dumps(metadata).encode("utf-8"))
+            out_file.seek(284)
+            out_file.write(struct.pack("<Q", meta_offset))
+
+    return {
+        "FileHeader": {
+            "Frequency": timestampFrequency,
+            "Beg": beg,
+            "End": end,
+            "NumVars": n_vars,
+        },
+        "Variables": [{"Header": var["out_header"]} for var in variables],
+    }
+
+
+def _encode(value, key):
+    if key in ("Name", "Units", "Padding"):
+        if not value:
+            return b""
+        return value.encode("utf-8") if isinstance(value, str) else value
+    return value
+
+
+def _copy_var(src, dst, var, chunksize):
+    header, out_header, ratio = var["header"], var["out_header"], var["ratio"]
+    in_dtype = np.dtype("<i8" if header["TsDataType"] == 1 else "<i4")
+    out_dtype = np.dtype("<i8" if out_header["TsDataType"] == 1 else "<i4")
+    offset = header["DataOffset"]
+    if dst.tell() != out_header["DataOffset"]:
+        raise RuntimeError(f"misaligned output for variable {header['Name']}")
+    for kind, size in _var_layout(header):
+        if kind == "raw":
+            copy_bytes(src, dst, offset, size, chunksize)
+            offset += size
+        elif ratio == 1 and in_dtype == out_dtype:
+            copy_bytes(src, dst, offset, size * in_dtype.itemsize, chunksize)
+            offset += size * in_dtype.itemsize
+        else:
+            step = max(1, chunksize // 8)
+            src.seek(offset)
+            for start in range(0, size, step):
+                ticks = np.fromfile(src, dtype=in_dtype, count=min(step, size - start))
+                if ratio != 1:
+                    ticks = np.round(ticks * ratio)
+                ticks.astype(out_dtype).tofile(dst)
+            offset += size * in_dtype.itemsize
@@ -4,6 +4,7 @@ import numpy as np
 import pandas as pd
 
 from simianpy.io.File import File
+from simianpy.io.recording import ChannelListRecording
 from simianpy.io.nex.nexfile import NexWriter, Reader
 
 
@@ -212,6 +213,52 @@ class Nex(File):
             }
         )
 
+    def get_recording(self, keys=None):
+        """Get continuous variables as a Recording
+
+        Parameters
+        ----------
+        keys: list of str or None, optional, default: None
+            names of continuous variables to include
+            if None, includes all continuous variables. All variables must share
+            a sampling rate and fragment layout
+
+        Returns
+        -------
+        recording: ChannelListRecording
+            Channels can be selected by variable name
+        """
+        variables = self._vararray[self.vartypes == "continuous"]
+        if keys is not None:
+            variables = {var["Header"]["Name"]: var for var in variables}
+            variables = [variables[key] for key in keys]
+        if len(variables) == 0:
+            raise ValueError("No continuous variables found")
+        sampling_rates = {var["Header"]["SamplingRate"] for var in variables}
+        if len(sampling_rates) != 1:
+            raise ValueError(
+                f"All variables must have the same sampling rate: {sampling_rates}"
+            )
+        sampling_rate = sampling_rates.pop()
+        var = variables[0]
+        if len(var["Timestamps"]) == 1:
+            time_base, t_start = None, float(var["Timestamps"][0])
+        else:
+            time_base = np.concatenate(
+                [
+                    timestamp + np.arange(count) / sampling_rate
+                    for timestamp, count in zip(var["Timestamps"], var["FragmentCounts"])
+                ]
+            )
+            t_start = float(time_base[0])
+        return ChannelListRecording(
+            [var["ContinuousValues"] for var in variables],
+            sampling_rate=sampling_rate,
+            time_base=time_base,
+            t_start=t_start,
+            channel_names=[var["Header"]["Name"] for var in variables],
+        )
+
     def get_spike_data(self):
         return pd.concat(
             [
@@ -45,6 +45,11 @@ except ImportError:
     warnings.warn('nexfile: unable to import numpy')
 
 
+# nex files store 32-bit 'l'/'L' values, but array.array's 'l'/'L' are 64-bit on most
+# 64-bit platforms: always use the 4 byte typecodes
+ARRAY_TYPECODES = {'l': 'i', 'L': 'I'}
+
+
 class NexFileVarType:
     """
     Constants for .nex and .nex5 variable types
@@ -269,7 +274,7 @@ class Reader(object):
             else:
                 return [x * coeff for x in vList]
         else:
-            values = array.array(valueType)
+            values = array.array(ARRAY_TYPECODES.get(valueType, valueType))
             values.fromfile(self.theFile, count)
         
         if coeff == 1.0:
@@ -873,7 +878,7 @@ class NexWriter(object):
             return self._VarWriteTimestampsNumpy(var, timestamps)
         if self._BytesInTimestamp(var) == 4:
             tsTicks = [int(round(x * self.tsFreq)) for x in timestamps]
-            values = array.array('l', tsTicks)
+            values = array.array(ARRAY_TYPECODES['l'], tsTicks)
             values.tofile(self.theFile)
         else:
             for x in timestamps:
@@ -922,7 +927,8 @@ class NexWriter(object):
             return
         elif varType == NexFileVarType.CONTINUOUS:
             self._VarWriteTimestamps(var, var['Timestamps'])
-            values = array.array('l', var['FragmentIndexes'])
+            indexType = 'q' if var['Header']['ContFragIndexType'] == 1 else ARRAY_TYPECODES['l']
+            values = array.array(indexType, [int(x) for x in var['FragmentIndexes']])
             values.tofile(self.theFile)
             if self.useNumpy:
                 self._VarWriteContinuousValuesNumpy(var)
@@ -949,7 +955,7 @@ class NexWriter(object):
                                 sv += '\x00'
                         self.theFile.write(sv.encode('utf-8'))
                 else:
-                    values = array.array('L', var['Markers'][i])
+                    values = array.array(ARRAY_TYPECODES['L'], var['Markers'][i])
                     values.tofile(self.theFile)
             return
 
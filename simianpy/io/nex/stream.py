@@ -0,0 +1,164 @@
+"""Streaming writer for nex5 files holding continuous variables"""
+
+import json
+import os
+import struct
+
+import numpy as np
+
+from .combine import NEX5_FILE_HEADER, NEX5_VAR_HEADER, MAX_INT32
+from .nexfile import NexFileVarType
+
+
+class Nex5ContinuousWriter:
+    """Write continuous variables of known length to a nex5 file block by block
+
+    Headers and offsets are computed up front from the number of samples, so
+    values can be written in any order, from any thread, directly at their
+    position in the file (os.pwrite). Unlike NexWriter, nothing is kept in
+    memory and no pass over the data is needed to compute scaling: values
+    are stored as float32, or as int16 with a fixed ADtoMV.
+
+    >>> with Nex5ContinuousWriter('lfp.nex5', 30000, names, n_samples, 1000) as writer:
+    ...     for start, block in blocks:
+    ...         for idx in range(len(names)):
+    ...             writer.write(idx, start, block[:, idx])
+
+    Parameters
+    ----------
+    filename: str or Path
+    timestampFrequency: float
+        In Hz
+    names: list of str
+        Name of each continuous variable
+    n_samples: int
+        Number of samples of every variable
+    sampling_rate: float
+        In Hz
+    t_start: float, optional, default: 0
+        Time (in s) of the first sample
+    ADtoMV: float or None, optional, default: None
+        If None, values are stored as float32. Otherwise values are stored as
+        int16 of value / ADtoMV (clipped)
+    """
+
+    def __init__(
+        self,
+        filename,
+        timestampFrequency,
+        names,
+        n_samples,
+        sampling_rate,
+        t_start=0.0,
+        ADtoMV=None,
+    ):
+        if sampling_rate <= 0 or sampling_rate > timestampFrequency:
+            raise ValueError("invalid sampling rate in continuous")
+        self.filename = filename
+        self.timestampFrequency = timestampFrequency
+        self.names = list(names)
+        self.n_samples = int(n_samples)
+        self.sampling_rate = sampling_rate
+        self.ADtoMV = ADtoMV
+        self.dtype = np.dtype("<f4" if ADtoMV is None else "<i2")
+
+        beg_ticks = int(round(t_start * timestampFrequency))
+        end_ticks = int(
+            round((t_start + (self.n_samples - 1) / sampling_rate) * timestampFrequency)
+        )
+        ts_as_64 = int(end_ticks > MAX_INT32)
+        ts_bytes = 8 if ts_as_64 else 4
+        n_vars = len(self.names)
+        data_offset = 356 + n_vars * 244
+        self._value_offsets = []
+        var_headers = []
+        for name in self.names:
+            var_headers.append(
+                struct.pack(
+                    NEX5_VAR_HEADER,
+                    NexFileVarType.CONTINUOUS,
+                    500,
+                    name.encode("utf-8"),
+                    data_offset,
+                    1,
+                    ts_as_64,
+                    int(ADtoMV is None),
+                    sampling_rate,
+                    b"",
+                    1.0 if ADtoMV is None else ADtoMV,
+                    0.0,
+                    self.n_samples,
+                    0.0,
+                    0,
+                    0,
+                    0,
+                    0,
+                    b"",
+                )
+            )
+            # one fragment: its timestamp and index precede the values
+            self._value_offsets.append(data_offset + ts_bytes + 4)
+            data_offset += ts_bytes + 4 + self.n_samples * self.dtype.itemsize
+        self._meta_offset = data_offset
+
+        self._file = open(filename, "wb")
+        self._file.write(
+            struct.pack(
+                NEX5_FILE_HEADER,
+                894977358,
+                502 if ts_as_64 else 501,
+                b"",
+                timestampFrequency,
+                beg_ticks,
+                n_vars,
+                self._meta_offset,
+                end_ticks,
+                b"",
+            )
+        )
+        for var_header in var_headers:
+            self._file.write(var_header)
+        for offset in self._value_offsets:
+            self._file.seek(offset - ts_bytes - 4)
+            self._file.write(
+                struct.pack("<q" if ts_as_64 else "<i", beg_ticks) + struct.pack("<i", 0)
+            )
+        self._file.truncate(self._meta_offset)
+        self._file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def encode(self, values):
+        """Convert values to the stored dtype"""
+        values = np.asarray(values)
+        if self.ADtoMV is None:
+            return values.astype(self.dtype, copy=False)
+        return np.clip(np.round(values / self.ADtoMV), -32768, 32767).astype(self.dtype)
+
+    def write(self, idx, start, values):
+        """Write values of variable idx starting at sample start (thread safe)"""
+        data = np.ascontiguousarray(self.encode(values))
+        if start + data.size > self.n_samples:
+            raise ValueError(
+                f"writing {data.size} samples at {start} exceeds n_samples={self.n_samples}"
+            )
+        os.pwrite(
+            self._file.fileno(),
+            data.tobytes(),
+            self._value_offsets[idx] + start * self.dtype.itemsize,
+        )
+
+    def close(self):
+        if self._file.closed:
+            return
+        metadata = {
+            "file": {"writerSoftware": {"name": "simianpy.io.nex.stream"}},
+            "variables": [{"name": name} for name in self.names],
+        }
+        self._file.seek(self._meta_offset)
+        self._file.write(json.dumps(metadata).encode("utf-8"))
+        self._file.close()
@@ -1,4 +1,4 @@
-"""OpenEphys ('.continuous', '.spikes', '.events') interface
+"""OpenEphys ('.continuous', '.spikes', '.events') and binary ('structure.oebin') interface
 
 Recommended use:
 >>> OE = simi.io.OpenEphys(...)
@@ -10,6 +10,18 @@ You may use the lower level interface:
 OR
 
 >>> spkdata = simi.io.openephys.openephys.loadSpikes(...)
+
+Raw int16 samples of '.continuous' files can be memory mapped as a Recording:
+>>> recording = simi.io.openephys.load_continuous_recording([...])
+
+Many sessions can be converted to nex in parallel, resuming from a manifest:
+>>> simi.io.openephys.batch_to_nex([...], recipe, output_dir=...)
+
+Recordings in the binary format are memory mapped:
+>>> OE = simi.io.OpenEphysBinary(...)
+>>> OE.open()
 """
 from .openephys import load
-from .io import OpenEphys
\ No newline at end of file
+from .io import OpenEphys, load_continuous_recording
+from .batch import ConversionManifest, batch_to_nex
+from .binary import OpenEphysBinary
\ No newline at end of file
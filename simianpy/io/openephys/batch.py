@@ -0,0 +1,222 @@
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from .io import OpenEphys
+
+
+class ConversionManifest:
+    """Resumable record of a batch conversion, stored as JSON
+
+    Each session is keyed by its resolved directory and has a 'status' of 'pending',
+    'running', 'done' or 'failed', along with its output path, timing and
+    the error of the last failed attempt. The file is rewritten atomically
+    after every update so an interrupted batch can be resumed.
+
+    Parameters
+    ----------
+    path: str or Path
+        Location of the manifest. Loaded if it exists
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        if self.path.is_file():
+            with open(self.path, "r") as f:
+                self.sessions = json.load(f)
+        else:
+            self.sessions = {}
+
+    @staticmethod
+    def _key(session):
+        # relative and absolute paths to a session share an entry
+        return str(Path(session).resolve())
+
+    def __getitem__(self, session):
+        return self.sessions[self._key(session)]
+
+    def __contains__(self, session):
+        return self._key(session) in self.sessions
+
+    def status(self, session):
+        return self.sessions.get(self._key(session), {}).get("status", "pending")
+
+    def attempts(self, session):
+        return self.sessions.get(self._key(session), {}).get("attempts", 0)
+
+    def update(self, session, **fields):
+        entry = self.sessions.setdefault(
+            self._key(session), {"status": "pending", "attempts": 0}
+        )
+        entry.update(fields)
+        self.save()
+
+    def save(self):
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.sessions, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def summary(self):
+        counts = {}
+        for entry in self.sessions.values():
+            counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        return counts
+
+
+def _limit_memory(max_memory):
+    """Cap the address space of a worker process (POSIX only)"""
+    if max_memory is None:
+        return
+    try:
+        import resource
+    except ImportError:
+        return
+    resource.setrlimit(resource.RLIMIT_AS, (int(max_memory), int(max_memory)))
+
+
+def _convert_session(session, recipe, output_path, timestampFrequency, loglevel):
+    """Worker: convert a single session, writing to a temporary file first"""
+    start_time = time.time()
+    output_path = Path(output_path)
+    tmp_path = output_path.with_name(
+        f".{output_path.stem}.partial{output_path.suffix}"
+    )
+    openephys = OpenEphys(
+        session,
+        time_units="s",
+        recipe=recipe,
+        logger_kwargs=dict(printLevel=loglevel, fileName=False),
+    )
+    try:
+        with openephys as file:
+            file.to_nex(tmp_path, timestampFrequency, overwrite=True)
+        os.replace(tmp_path, output_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return {"seconds": time.time() - start_time}
+
+
+def batch_to_nex(
+    sessions,
+    recipe,
+    output_dir=None,
+    manifest_path=None,
+    timestampFrequency=30000,
+    n_jobs=None,
+    max_memory=None,
+    retry_failed=True,
+    suffix=".nex5",
+    loglevel="WARN",
+    logger=None,
+):
+    """Convert many OpenEphys sessions to nex files in a process pool
+
+    Each session runs in a fresh worker process (one task per child) so
+    memory is returned to the system between sessions. Outputs are written
+    to a temporary file and renamed when complete, so a crash never leaves
+    a truncated nex file. Progress is recorded in a ConversionManifest:
+    re-running the same batch skips finished sessions.
+
+    Parameters
+    ----------
+    sessions: list of str or Path
+        Session directories
+    recipe: list
+        OpenEphys recipe shared by all sessions (see OpenEphys)
+    output_dir: str, Path or None, optional, default: None
+        If None, each output is written next to its session directory
+    manifest_path: str, Path or None, optional, default: None
+        Defaults to 'manifest.json' in output_dir (or the working directory)
+    timestampFrequency: int, optional, default: 30000
+    n_jobs: int or None, optional, default: None
+        Number of worker processes. If None, uses the number of CPUs
+    max_memory: int or None, optional, default: None
+        Address space limit in bytes of each worker. A session exceeding it
+        fails with MemoryError instead of taking down the machine
+    retry_failed: bool, optional, default: True
+        If False, sessions that failed in a previous run are skipped
+    suffix: str, optional, default: '.nex5'
+    loglevel: str, optional, default: 'WARN'
+        printLevel of the loggers in the workers
+    logger: logging.Logger, optional
+
+    Returns
+    -------
+    manifest: ConversionManifest
+    """
+    if logger is None:
+        from ...misc import getLogger
+
+        logger = getLogger(__name__)
+    if output_dir is not None:
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+    if manifest_path is None:
+        manifest_path = (
+            Path.cwd() if output_dir is None else output_dir
+        ) / "manifest.json"
+    manifest = ConversionManifest(manifest_path)
+
+    todo = []
+    for session in map(Path, sessions):
+        output_path = (session.parent if output_dir is None else output_dir) / (
+            session.name + suffix
+        )
+        status = manifest.status(session)
+        if status == "done" and output_path.is_file():
+            logger.info(f"Skipping finished session: {session}")
+            continue
+        if status == "failed" and not retry_failed:
+            logger.info(f"Skipping failed session: {session}")
+            continue
+        todo.append((session, output_path))
+    logger.info(f"Converting {len(todo)} of {len(sessions)} sessions")
+
+    with ProcessPoolExecutor(
+        n_jobs,
+        max_tasks_per_child=1,
+        initializer=_limit_memory,
+        initargs=(max_memory,),
+    ) as pool:
+        futures = {}
+        for session, output_path in todo:
+            attempts = manifest.attempts(session)
+            manifest.update(
+                session,
+                status="running",
+                output=str(output_path),
+                error=None,
+                attempts=attempts + 1,
+            )
+            future = pool.submit(
+                _convert_session,
+                str(session),
+                recipe,
+                str(output_path),
+                timestampFrequency,
+                loglevel,
+            )
+            futures[future] = session
+        for future in as_completed(futures):
+            session = futures[future]
+            try:
+                result = future.result()
+            except Exception as exc:
+                logger.error(f"Failed to convert {session}: {exc!r}")
+                manifest.update(
+                    session,
+                    status="failed",
+                    error="".join(
+                        traceback.format_exception_only(type(exc), exc)
+                    ).strip(),
+                )
+            else:
+                logger.info(f"Converted {session} in {result['seconds']:.1f} s")
+                manifest.update(session, status="done", **result)
+    logger.info(f"Batch conversion finished: {manifest.summary()}")
+    return manifest
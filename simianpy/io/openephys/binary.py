@@ -0,0 +1,320 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ..File import File
+from ..raw import load_raw
+from ..recording import ArrayRecording, Recording
+
+
+class OpenEphysBinaryStream(Recording):
+    """A single continuous stream of an OpenEphys binary recording
+
+    The raw int16 samples are memory mapped and never copied; scaling to
+    physical units (bitVolts) is only applied to the samples that are accessed.
+
+    Parameters
+    ----------
+    folder: Path
+        Directory containing 'continuous.dat' and its timestamp files
+    info: dict
+        The stream's entry in 'structure.oebin'
+    mmap_mode: str, optional, default: 'r'
+
+    Attributes
+    ----------
+    raw: np.memmap
+        (n_samples, n_channels) int16 samples as stored on disk
+    channel_names: list of str
+    bit_volts: np.ndarray
+    sampling_rate: float
+    sample_numbers: np.ndarray
+    timestamps: np.ndarray or OpenEphysBinaryTimes
+        Time (in s) of every sample, computed from the sample numbers only
+        where accessed in recordings without 'sample_numbers.npy'
+    """
+
+    def __init__(self, folder, info, mmap_mode="r"):
+        self.folder = Path(folder)
+        self.info = info
+        self.sampling_rate = float(info["sample_rate"])
+        self.channel_names = [channel["channel_name"] for channel in info["channels"]]
+        self.bit_volts = np.array(
+            [channel["bit_volts"] for channel in info["channels"]], dtype=np.float32
+        )
+        self.raw = load_raw(
+            self.folder / "continuous.dat",
+            (None, int(info["num_channels"])),
+            dtype="int16",
+            mode=mmap_mode,
+        )
+        if (self.folder / "sample_numbers.npy").is_file():
+            # GUI >= 0.6: sample numbers and synchronized timestamps (in s) are stored separately
+            self.sample_numbers = np.load(self.folder / "sample_numbers.npy", mmap_mode="r")
+            self.timestamps = np.load(self.folder / "timestamps.npy", mmap_mode="r")
+        else:
+            # GUI < 0.6: 'timestamps.npy' holds sample numbers
+            self.sample_numbers = np.load(self.folder / "timestamps.npy", mmap_mode="r")
+            self.timestamps = OpenEphysBinaryTimes(self.sample_numbers, self.sampling_rate)
+
+    def __len__(self):
+        return self.raw.shape[0]
+
+    def __getitem__(self, channel):
+        """Returns a scaled view of a single channel, selected by name or index"""
+        if isinstance(channel, str):
+            channel = self.channel_names.index(channel)
+        return OpenEphysBinaryChannel(self.raw[:, channel], self.bit_volts[channel])
+
+    @property
+    def n_samples(self):
+        return self.raw.shape[0]
+
+    @property
+    def n_channels(self):
+        return self.raw.shape[1]
+
+    @property
+    def time_base(self):
+        return self.timestamps
+
+    def get_traces(self, start=None, stop=None, channels=None, scaled=True):
+        """Read a block of samples
+
+        Parameters
+        ----------
+        start, stop: int or None
+            Sample indices delimiting the block
+        channels: list of int or str, optional, default: None
+            Subset of channels, by index or name. If None, all channels are returned
+        scaled: bool, optional, default: True
+            If True, returns float32 values multiplied by bitVolts,
+            otherwise the raw int16 samples
+
+        Returns
+        -------
+        traces: np.ndarray
+            (n_samples, n_channels)
+        """
+        if channels is None:
+            channel_idx = slice(None)
+        else:
+            channel_idx = [
+                self.channel_names.index(channel) if isinstance(channel, str) else channel
+                for channel in channels
+            ]
+        traces = self.raw[start:stop, channel_idx]
+        if scaled:
+            traces = np.multiply(traces, self.bit_volts[channel_idx], dtype=np.float32)
+        return traces
+
+    def get_raw_recording(self):
+        """The unscaled int16 samples as a Recording"""
+        return ArrayRecording(
+            self.raw,
+            self.sampling_rate,
+            time_base=self.timestamps,
+            channel_names=self.channel_names,
+        )
+
+
+class OpenEphysBinaryChannel:
+    """Lazily scaled view of a single channel of an OpenEphysBinaryStream"""
+
+    def __init__(self, raw, bit_volts):
+        self.raw = raw
+        self.bit_volts = bit_volts
+
+    def __len__(self):
+        return self.raw.shape[0]
+
+    @property
+    def shape(self):
+        return self.raw.shape
+
+    def __getitem__(self, key):
+        return np.multiply(self.raw[key], self.bit_volts, dtype=np.float32)
+
+    def __array__(self, dtype=None, copy=None):
+        return self[:] if dtype is None else self[:].astype(dtype)
+
+
+class OpenEphysBinaryTimes:
+    """Lazy view of the times (in s) of memory mapped sample numbers"""
+
+    def __init__(self, sample_numbers, sampling_rate):
+        self.sample_numbers = sample_numbers
+        self.sampling_rate = sampling_rate
+
+    def __len__(self):
+        return self.sample_numbers.shape[0]
+
+    @property
+    def shape(self):
+        return self.sample_numbers.shape
+
+    def __getitem__(self, key):
+        return self.sample_numbers[key] / self.sampling_rate
+
+    def __array__(self, dtype=None, copy=None):
+        return self[:] if dtype is None else self[:].astype(dtype)
+
+
+class OpenEphysBinary(File):
+    """Interface for OpenEphys binary format ('structure.oebin', 'continuous.dat')
+
+    Continuous data is memory mapped without copying. Each stream listed in
+    'structure.oebin' is available as an OpenEphysBinaryStream, and TTL events
+    are read from the 'events/' npy files.
+
+    >>> with simi.io.OpenEphysBinary('.../Record Node 101/experiment1/recording1') as oe:
+    ...     stream = oe.streams['ProbeA-AP']
+    ...     lfp = stream.get_traces(0, 30000, channels=['CH1', 'CH2'])
+    ...     ttl = oe.get_event_data()
+
+    Parameters
+    ----------
+    filename: str or Path
+        The recording directory containing 'structure.oebin'
+    mode: str, optional, default: 'r'
+        Must be one of ['r', 'r+']
+    logger: logging.Logger, optional
+        logger for this object - see simi.io.File for more info
+
+    Attributes
+    ----------
+    structure: dict
+        The parsed contents of 'structure.oebin'
+    streams: dict of OpenEphysBinaryStream
+    """
+
+    description = """ """
+    extension = [".oebin", ".dat"]
+    isdir = True
+    needs_recipe = False
+    default_mode = "r"
+    modes = ["r", "r+"]
+    supported_time_units = ["ms", "s"]
+
+    def open(self):
+        structure_path = self.filename / "structure.oebin"
+        if not structure_path.is_file():
+            raise FileNotFoundError(
+                f"File ({structure_path.name}) not found at {self.filename}"
+            )
+        with open(structure_path, "r") as f:
+            self.structure = json.load(f)
+
+        self.streams = {}
+        for info in self.structure.get("continuous", []):
+            name = self._stream_name(info)
+            self.logger.debug(f"Mapping continuous stream: {name}")
+            self.streams[name] = OpenEphysBinaryStream(
+                self.filename / "continuous" / info["folder_name"],
+                info,
+                mmap_mode=self.mode,
+            )
+
+    def close(self):
+        if hasattr(self, "streams"):
+            del self.streams
+
+    def get_recording(self, stream=None):
+        """Get a stream as a Recording (the first stream if None)"""
+        if stream is None:
+            stream = next(iter(self.streams))
+        return self.streams[stream]
+
+    @staticmethod
+    def _stream_name(info):
+        return info.get("stream_name", info["folder_name"].strip("/"))
+
+    def read_timestamps(self, timestamps):
+        if self.time_units == "ms":
+            return timestamps * 1e3
+        elif self.time_units == "s":
+            return timestamps
+
+    def get_continuous_data(self, stream, keys=None, start=None, stop=None):
+        """Get scaled continuous data from a stream as pandas dataframe
+
+        Parameters
+        ----------
+        stream: str
+            Name of the stream
+        keys: list of str or None, optional, default: None
+            subset of channels that will be retrieved
+            if None, returns all channels
+        start, stop: int or None
+            Sample indices delimiting the block to read
+
+        Returns
+        -------
+        continuous_data: pd.DataFrame
+        """
+        stream = self.streams[stream]
+        keys = stream.channel_names if keys is None else list(keys)
+        return pd.DataFrame(
+            stream.get_traces(start, stop, channels=keys),
+            columns=keys,
+            index=self.read_timestamps(np.asarray(stream.timestamps[start:stop])),
+        )
+
+    def get_event_data(self, stream=None):
+        """Get TTL line changes
+
+        Parameters
+        ----------
+        stream: str or None, optional, default: None
+            If provided, only TTL events from the event folder matching
+            this name are returned
+
+        Returns
+        -------
+        event_data: pd.DataFrame
+            Indexed by timestamp with columns
+            'stream', 'sample_number', 'line', 'state' and 'full_word'
+        """
+        event_data = []
+        for info in self.structure.get("events", []):
+            folder = self.filename / "events" / info["folder_name"]
+            name = self._stream_name(info)
+            if stream is not None and stream not in (name, info["folder_name"].strip("/")):
+                continue
+            if (folder / "states.npy").is_file():
+                states = np.load(folder / "states.npy", mmap_mode="r")
+                sample_numbers = np.load(folder / "sample_numbers.npy", mmap_mode="r")
+                timestamps = np.load(folder / "timestamps.npy", mmap_mode="r")
+            elif (folder / "channel_states.npy").is_file():
+                states = np.load(folder / "channel_states.npy", mmap_mode="r")
+                sample_numbers = np.load(folder / "timestamps.npy", mmap_mode="r")
+                timestamps = OpenEphysBinaryTimes(sample_numbers, float(info["sample_rate"]))
+            else:
+                # not a TTL event folder (e.g. text or binary messages)
+                continue
+            full_word_path = folder / "full_words.npy"
+            full_words = (
+                np.load(full_word_path, mmap_mode="r")
+                if full_word_path.is_file()
+                else np.zeros(states.size, dtype=np.uint64)
+            )
+            event_data.append(
+                pd.DataFrame(
+                    {
+                        "stream": name,
+                        "sample_number": sample_numbers,
+                        "line": np.abs(states),
+                        "state": (states > 0).astype(np.uint8),
+                        "full_word": full_words,
+                    },
+                    index=pd.Index(self.read_timestamps(np.asarray(timestamps)), name="timestamp"),
+                )
+            )
+        if not event_data:
+            return pd.DataFrame(
+                columns=["stream", "sample_number", "line", "state", "full_word"],
+                index=pd.Index([], name="timestamp"),
+            )
+        return pd.concat(event_data).sort_index(kind="stable")
@@ -7,7 +7,9 @@ import pandas as pd
 
 from ..File import File
 from ..nex import Nex
-from .openephys import load
+from ..recording import ChannelListRecording
+from ...signal.resample import resample
+from .openephys import ContinuousChannel, load, mapContinuous
 
 
 class OpenEphys(File):
@@ -155,6 +157,42 @@ class OpenEphys(File):
             continuous_data = continuous_data.asfreq(resample_freq)
         return continuous_data
 
+    def get_recording(self, keys=None):
+        """Get continuous data as a Recording
+
+        Parameters
+        ----------
+        keys: list of str or None, optional, default: None
+            subset of continuous data that will be included
+            if None, includes all data. All channels must share a sampling rate
+
+        Returns
+        -------
+        recording: ChannelListRecording
+            Channels can be selected by key
+        """
+        if keys is None:
+            keys = list(self._data["continuous"].keys())
+        headers = [json.loads(self._data["continuous"][key]["header"]) for key in keys]
+        sampling_rates = {int(header["sampleRate"]) for header in headers}
+        if len(sampling_rates) != 1:
+            raise ValueError(
+                f"All channels must have the same sampling rate: {sampling_rates}"
+            )
+        sampling_rate = sampling_rates.pop()
+        cnt_data = self._data["continuous"][keys[0]]
+        block_length = int(headers[0]["blockLength"])
+        time_base = (
+            np.expand_dims(cnt_data["timestamps"], axis=1)
+            + np.expand_dims(np.arange(block_length) / sampling_rate, axis=0)
+        ).flatten()
+        return ChannelListRecording(
+            [self._data["continuous"][key]["data"] for key in keys],
+            sampling_rate=sampling_rate,
+            time_base=time_base,
+            channel_names=keys,
+        )
+
     def _parse_spike_data(self, spk_data):
         header = json.loads(spk_data["header"])
         sample_in_microseconds = f"{1e6/float(header['sampleRate']):.3f}U"
@@ -237,6 +275,8 @@ class OpenEphys(File):
             "spikes": [],
             "events": [],
         }
+        # everything is prepared before the nex file is opened, so a failure
+        # never leaves a partially written file behind
         self.logger.info("Preparing data specified in recipe")
         for file in recipe:
             self.logger.debug(f"Parsing {file}")
@@ -263,26 +303,25 @@ class OpenEphys(File):
                         }
                     )
             elif file["type"] == "continuous":
-                continuous_data = self.get_continuous_data([file["name"]])[file["name"]]
                 resample_to = file.get("resample_to", sampling_rate)
                 if resample_to != sampling_rate:
-                    dt = 1 / resample_to
-                    timestamps = np.arange(
-                        continuous_data.index[0], continuous_data.index[-1] + dt / 2, dt
-                    )
-                    values = np.interp(
-                        timestamps, continuous_data.index.values, continuous_data.values
+                    # polyphase resampling with an anti-aliasing filter
+                    timestamps, values = resample(
+                        self.get_recording([file["name"]]), resample_to
                     )
-                    # continuous_data.reindex(timestamps).interpolate(
-                    #     method="nearest", inplace=True
-                    # )
+                    values = values[:, 0]
+                    timestampOfFirstDataPoint = timestamps[0]
                 else:
+                    continuous_data = self.get_continuous_data([file["name"]])[
+                        file["name"]
+                    ]
                     values = continuous_data.values
+                    timestampOfFirstDataPoint = continuous_data.index[0]
 
                 out_data["continuous"].append(
                     {
                         "name": file["name"],
-                        "timestampOfFirstDataPoint": continuous_data.index[0],
+                        "timestampOfFirstDataPoint": timestampOfFirstDataPoint,
                         "values": values,
                         "SamplingRate": resample_to,
                     }
@@ -332,7 +371,46 @@ class OpenEphys(File):
             for event_data in out_data["events"]:
                 nexfile.writer.AddMarker(**event_data)
             self.logger.info("Writing nex file to disk...")
-
         self.logger.info(f"\nSuccessfully wrote nexfile at path: {nexfile_path}")
         self.logger.info(f"Total time: {(time.time() - start_time):.3f} seconds\n\n")
         return nexfile
+
+
+def load_continuous_recording(filepaths, logger=None):
+    """Memory map a set of '.continuous' files as a Recording of raw int16 samples
+
+    Nothing is loaded up front: each channel is read record by record as
+    blocks of samples are requested. Values are not scaled by bitVolts.
+
+    Parameters
+    ----------
+    filepaths: list of str or Path
+        One file per channel, in the order of the recording's channels
+    logger: logging.Logger, optional
+
+    Returns
+    -------
+    recording: ChannelListRecording
+        Channels can be selected by file stem (e.g. '100_CH1')
+    """
+    filepaths = [Path(filepath) for filepath in filepaths]
+    headers, channels = [], []
+    for filepath in filepaths:
+        header, records = mapContinuous(filepath, logger)
+        headers.append(header)
+        channels.append(ContinuousChannel(records))
+    sampling_rates = {int(header["sampleRate"]) for header in headers}
+    if len(sampling_rates) != 1:
+        raise ValueError(
+            f"All channels must have the same sampling rate: {sampling_rates}"
+        )
+    sampling_rate = sampling_rates.pop()
+    t_start = 0.0
+    if channels and channels[0].records.shape[0] > 0:
+        t_start = int(channels[0].records["timestamps"][0]) / sampling_rate
+    return ChannelListRecording(
+        channels,
+        sampling_rate=sampling_rate,
+        t_start=t_start,
+        channel_names=[filepath.stem for filepath in filepaths],
+    )
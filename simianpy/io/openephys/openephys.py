@@ -105,6 +105,77 @@ def loadContinuous(filepath, logger=None):
     return data
 
 
+CONTINUOUS_DTYPE = np.dtype(
+    [
+        ("timestamps", np.dtype("<i8")),
+        ("N", np.dtype("<u2")),
+        ("recordingNumbers", np.dtype(">u2")),
+        ("data", np.dtype(">i2"), (SAMPLES_PER_RECORD,)),
+        ("marker", np.dtype("b"), (10,)),
+    ]
+)
+
+
+def mapContinuous(filepath, logger=None):
+    """Memory map the records of a '.continuous' file without reading them
+
+    Returns
+    -------
+    header: dict
+    records: np.memmap
+        structured array with one record of SAMPLES_PER_RECORD samples per entry
+    """
+    with open(filepath, "rb") as f:
+        header = readHeader(f, logger)
+        fileLength = os.fstat(f.fileno()).st_size - NUM_HEADER_BYTES
+    if fileLength % CONTINUOUS_DTYPE.itemsize != 0:
+        raise Exception(
+            "File size is not consistent with a continuous file: may be corrupt"
+        )
+    records = np.memmap(
+        filepath,
+        dtype=CONTINUOUS_DTYPE,
+        mode="r",
+        offset=NUM_HEADER_BYTES,
+        shape=(fileLength // CONTINUOUS_DTYPE.itemsize,),
+    )
+    return header, records
+
+
+class ContinuousChannel:
+    """Lazy 1-D view of the raw int16 samples of a memory mapped '.continuous' file
+
+    Only the records overlapping the requested samples are read and
+    byte-swapped; values are not scaled by bitVolts.
+    """
+
+    dtype = np.dtype("int16")
+
+    def __init__(self, records):
+        self.records = records
+
+    def __len__(self):
+        return self.records.shape[0] * SAMPLES_PER_RECORD
+
+    @property
+    def shape(self):
+        return (len(self),)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return np.asarray(self)[key]
+        start, stop, step = key.indices(len(self))
+        stop = max(start, stop)
+        first, last = start // SAMPLES_PER_RECORD, -(-stop // SAMPLES_PER_RECORD)
+        data = self.records["data"][first:last].reshape(-1)
+        offset = first * SAMPLES_PER_RECORD
+        return data[start - offset : stop - offset : step].astype(self.dtype)
+
+    def __array__(self, dtype=None, copy=None):
+        data = self[:]
+        return data if dtype is None else data.astype(dtype)
+
+
 def loadSpikes(filepath, logger=None):
     if logger is None:
         from ...misc import getLogger
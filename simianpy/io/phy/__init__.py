@@ -0,0 +1,8 @@
+"""Kilosort/Phy spike sorting output interface
+
+Recommended use:
+>>> phy = simi.io.Phy(...)
+>>> phy.open()
+>>> sts = phy.to_spiketrainset(event_timestamps, window=(-0.5, 1))
+"""
+from .io import Phy, read_params
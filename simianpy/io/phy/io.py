@@ -0,0 +1,233 @@
+import ast
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.typing import ArrayLike
+
+from ..File import File
+
+
+def read_params(filename):
+    """Parse a Kilosort/Phy 'params.py' file into a dict"""
+    params = {}
+    with open(filename, "r") as f:
+        for line in f:
+            if "=" not in line:
+                continue
+            key, value = line.split("=", 1)
+            try:
+                params[key.strip()] = ast.literal_eval(value.strip())
+            except (ValueError, SyntaxError):
+                params[key.strip()] = value.strip()
+    return params
+
+
+class Phy(File):
+    """Interface for Kilosort/Phy spike sorting output directories
+
+    Spike arrays are memory mapped; only the spikes of the selected clusters
+    are ever copied into memory. Templates and amplitudes are loaded on first access.
+
+    Parameters
+    ----------
+    filename: str or Path
+        The sorter output directory (containing 'spike_times.npy', 'params.py', ...)
+    sampling_rate: float, optional
+        Overrides the 'sample_rate' found in 'params.py'
+    chunksize: int, optional, default: 1e7
+        max number of spikes scanned at once when selecting clusters
+    mode: str, optional, default: 'r'
+        Must be one of ['r']
+    logger: logging.Logger, optional
+        logger for this object - see simi.io.File for more info
+
+    Attributes
+    ----------
+    params: dict
+    sampling_rate: float
+    spike_times: np.memmap
+        spike times in samples
+    spike_clusters: np.memmap
+    cluster_groups: pd.Series
+        label ('good', 'mua', 'noise', ...) of each cluster, indexed by cluster id
+    templates
+    spike_templates
+    amplitudes
+    """
+
+    description = """ """
+    extension = [".npy", ".tsv"]
+    isdir = True
+    needs_recipe = False
+    default_mode = "r"
+    modes = ["r"]
+
+    def __init__(self, filename, sampling_rate=None, chunksize=1e7, **params):
+        super().__init__(filename, **params)
+        self._sampling_rate = sampling_rate
+        self.chunksize = int(chunksize)
+
+    def open(self):
+        self._lazy = {}
+        params_path = self.filename / "params.py"
+        self.params = read_params(params_path) if params_path.is_file() else {}
+        if self._sampling_rate is not None:
+            self.sampling_rate = float(self._sampling_rate)
+        elif "sample_rate" in self.params:
+            self.sampling_rate = float(self.params["sample_rate"])
+        else:
+            raise ValueError(
+                f"sampling_rate must be provided if 'params.py' is missing from {self.filename}"
+            )
+
+        self.spike_times = self._load("spike_times.npy").reshape(-1)
+        clusters_path = self.filename / "spike_clusters.npy"
+        if clusters_path.is_file():
+            self.spike_clusters = self._load("spike_clusters.npy").reshape(-1)
+        else:
+            # before manual curation, clusters are the templates
+            self.spike_clusters = self.spike_templates
+        if self.spike_times.size != self.spike_clusters.size:
+            raise ValueError(
+                f"spike_times ({self.spike_times.size}) and spike_clusters ({self.spike_clusters.size}) have different lengths"
+            )
+        self.cluster_groups = self._read_cluster_groups()
+
+    def close(self):
+        for attr in ["spike_times", "spike_clusters", "_lazy"]:
+            if hasattr(self, attr):
+                delattr(self, attr)
+
+    def _load(self, name):
+        path = self.filename / name
+        if not path.is_file():
+            raise FileNotFoundError(f"File ({name}) not found at {self.filename}")
+        return np.load(path, mmap_mode="r")
+
+    def _load_lazy(self, name):
+        if name not in self._lazy:
+            self.logger.debug(f"Loading {name}")
+            self._lazy[name] = self._load(name)
+        return self._lazy[name]
+
+    @property
+    def templates(self):
+        """(n_templates, n_samples, n_channels) template waveforms"""
+        return self._load_lazy("templates.npy")
+
+    @property
+    def spike_templates(self):
+        """Template id of each spike"""
+        return self._load_lazy("spike_templates.npy").reshape(-1)
+
+    @property
+    def amplitudes(self):
+        """Template scaling amplitude of each spike"""
+        return self._load_lazy("amplitudes.npy").reshape(-1)
+
+    def _read_cluster_groups(self):
+        for name, column in [
+            ("cluster_group.tsv", "group"),
+            ("cluster_KSLabel.tsv", "KSLabel"),
+        ]:
+            path = self.filename / name
+            if path.is_file():
+                table = pd.read_csv(path, sep="\t", index_col="cluster_id")
+                return table[column].rename("group")
+        self.logger.warning(f"No cluster labels found at {self.filename}")
+        return pd.Series(dtype=object, name="group", index=pd.Index([], name="cluster_id"))
+
+    def get_clusters(self, groups: Optional[Sequence[str]] = ("good",)) -> np.ndarray:
+        """Get the ids of clusters with the given labels
+
+        Parameters
+        ----------
+        groups: list of str or None, optional, default: ('good',)
+            If None, every cluster with at least one spike is returned
+
+        Returns
+        -------
+        clusters: np.ndarray
+        """
+        if groups is None:
+            return np.unique(self.spike_clusters)
+        groups = [groups] if isinstance(groups, str) else list(groups)
+        return self.cluster_groups.index[self.cluster_groups.isin(groups)].to_numpy()
+
+    def get_spike_indices(self, clusters: ArrayLike) -> np.ndarray:
+        """Indices of the spikes belonging to `clusters`, scanned in chunks"""
+        clusters = np.asarray(clusters, dtype=np.int64)
+        max_cluster = int(max(clusters.max(initial=-1), 0))
+        lookup = np.zeros(max_cluster + 2, dtype=bool)
+        lookup[clusters[clusters >= 0]] = True
+        indices = []
+        for start in range(0, self.spike_clusters.size, self.chunksize):
+            chunk = np.asarray(self.spike_clusters[start : start + self.chunksize])
+            chunk = np.minimum(chunk, max_cluster + 1)
+            indices.append(np.flatnonzero(lookup[chunk]) + start)
+        if not indices:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(indices)
+
+    def get_spike_data(
+        self,
+        groups: Optional[Sequence[str]] = ("good",),
+        clusters: Optional[ArrayLike] = None,
+        timestamps: Optional[ArrayLike] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Get spike times (in seconds) and cluster ids of the selected clusters
+
+        Parameters
+        ----------
+        groups: list of str or None, optional, default: ('good',)
+            Cluster labels to keep, ignored if clusters is provided
+        clusters: array_like or None, optional, default: None
+            Cluster ids to keep
+        timestamps: array_like or None, optional, default: None
+            Time (in seconds) of each sample of the sorted recording,
+            e.g. to restore the clock of a file exported with Trodes.dump.
+            If None, spike times are sample / sampling_rate
+
+        Returns
+        -------
+        spike_timestamps, spike_labels: np.ndarray
+            Suitable for SpikeTrainSet.from_arrays
+        """
+        if clusters is None:
+            clusters = self.get_clusters(groups)
+        idx = self.get_spike_indices(clusters)
+        samples = self.spike_times[idx].astype(np.int64)
+        if timestamps is None:
+            spike_timestamps = samples / self.sampling_rate
+        else:
+            spike_timestamps = np.asarray(timestamps[samples], dtype=np.float64)
+        spike_labels = np.asarray(self.spike_clusters[idx])
+        return spike_timestamps, spike_labels
+
+    def to_spiketrainset(
+        self,
+        event_timestamps: ArrayLike,
+        window: Tuple[float, float],
+        groups: Optional[Sequence[str]] = ("good",),
+        clusters: Optional[ArrayLike] = None,
+        timestamps: Optional[ArrayLike] = None,
+        **kwargs,
+    ):
+        """Build a SpikeTrainSet from the selected clusters
+
+        Parameters are as for `get_spike_data`; event_timestamps, window and
+        any additional keyword arguments are passed to SpikeTrainSet.from_arrays
+        """
+        from simianpy.analysis.spiketrain import SpikeTrainSet
+
+        spike_timestamps, spike_labels = self.get_spike_data(
+            groups=groups, clusters=clusters, timestamps=timestamps
+        )
+        return SpikeTrainSet.from_arrays(
+            spike_timestamps,
+            event_timestamps,
+            window,
+            spike_labels=spike_labels,
+            **kwargs,
+        )
@@ -1 +1 @@
-from .raw import load_raw
\ No newline at end of file
+from .raw import copy_bytes, export_binary, load_raw, load_raw_recording
@@ -1,4 +1,7 @@
+import os
+import time
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import numpy as np
@@ -28,9 +31,11 @@ def load_raw(filename, shape, dtype="int16", mmap=True, mode="r"):
     if Counter(shape)[None] > 1:
         raise ValueError(f"Shape can only have 1 None: {shape}")
     shape = tuple(
-        dim
-        if dim is not None
-        else nitems // np.prod(list(filter(lambda dim: dim is not None, shape)))
+        (
+            dim
+            if dim is not None
+            else nitems // np.prod(list(filter(lambda dim: dim is not None, shape)))
+        )
         for dim in shape
     )
     if all(
@@ -49,3 +54,201 @@ def load_raw(filename, shape, dtype="int16", mmap=True, mode="r"):
         # data = np.fromfile(file=filename,dtype=dtype).reshape(shape)
 
     return data
+
+
+def load_raw_recording(
+    filename, n_channels, sampling_rate, dtype="int16", time_base=None, mode="r"
+):
+    """Memory map an interleaved (n_samples, n_channels) flat binary file as a Recording
+
+    Parameters
+    ----------
+    filename: str or Path
+    n_channels: int
+    sampling_rate: float
+    dtype: str, optional, default: 'int16'
+    time_base: array_like or None, optional, default: None
+        Time (in s) of each sample, e.g. the timestamps saved by Trodes.dump
+    mode: str, optional, default: 'r'
+
+    Returns
+    -------
+    recording: ArrayRecording
+    """
+    from simianpy.io.recording import ArrayRecording
+
+    data = load_raw(filename, (None, n_channels), dtype=dtype, mode=mode)
+    return ArrayRecording(data, sampling_rate, time_base=time_base)
+
+
+def copy_bytes(src, dst, offset, nbytes, chunksize=1 << 24):
+    """Copy nbytes starting at offset in src to the current position of dst
+
+    Uses os.copy_file_range where available so the data is copied in the kernel
+    without passing through user space; falls back to buffered reads.
+
+    Parameters
+    ----------
+    src, dst: file objects opened in binary mode
+    offset: int
+    nbytes: int
+    chunksize: int, optional, default: 16 MiB
+        max number of bytes copied per call
+    """
+    dst.flush()
+    out_offset = dst.tell()
+    done = 0
+    if hasattr(os, "copy_file_range"):
+        try:
+            while done < nbytes:
+                copied = os.copy_file_range(
+                    src.fileno(),
+                    dst.fileno(),
+                    min(chunksize, nbytes - done),
+                    offset + done,
+                    out_offset + done,
+                )
+                if copied == 0:
+                    raise EOFError(f"unexpected end of file while copying {src.name}")
+                done += copied
+        except OSError:
+            # e.g. copies across file systems on older kernels
+            pass
+        dst.seek(out_offset + done)
+    src.seek(offset + done)
+    while done < nbytes:
+        buffer = src.read(min(chunksize, nbytes - done))
+        if not buffer:
+            raise EOFError(f"unexpected end of file while copying {src.name}")
+        dst.write(buffer)
+        done += len(buffer)
+
+
+def export_binary(
+    recording,
+    filename,
+    channels=None,
+    chunksize=1e6,
+    n_jobs=None,
+    tile_channels=16,
+    scale=None,
+    pbar=False,
+    logger=None,
+):
+    """Write a Recording to an interleaved (n_samples, n_channels) int16 file
+
+    The output is the flat binary layout expected by spike sorters (Kilosort,
+    SpikeInterface 'binary' recordings). Blocks of `chunksize` samples are read
+    as tiles of `tile_channels` channels on a thread pool and transposed into a
+    preallocated block, while the previous block is written. Integer sources
+    (e.g. RHSRecording, load_continuous_recording, TrodesRec,
+    OpenEphysBinaryStream.get_raw_recording) are copied without conversion.
+
+    Parameters
+    ----------
+    recording: simianpy.io.Recording
+    filename: str or Path
+        Output file, overwritten if it exists
+    channels: list or None, optional, default: None
+        Channel map: channels (by index or name) in the order they are written.
+        If None, all channels are written in order
+    chunksize: int, optional, default: 1e6
+        Number of samples per block
+    n_jobs: int or None, optional, default: None
+        Number of threads reading tiles. If None, uses ThreadPoolExecutor's default
+    tile_channels: int, optional, default: 16
+        Number of channels read by each task
+    scale: float or None, optional, default: None
+        Required for floating point sources: values are multiplied by scale
+        and rounded to int16 (e.g. 1/0.195 to convert Intan microvolts back to bits)
+    pbar: bool, optional, default: False
+    logger: logging.Logger, optional
+
+    Returns
+    -------
+    stats: dict
+        'n_samples', 'n_channels', 'bytes', 'seconds' and 'MB/s'
+    """
+    if logger is None:
+        from simianpy.misc import getLogger
+
+        logger = getLogger(__name__)
+    chunksize = int(chunksize)
+    if channels is None:
+        channels = list(range(recording.n_channels))
+    else:
+        channels = list(channels)
+    n_channels = len(channels)
+    n_samples = recording.n_samples
+    tiles = [
+        (slice(idx, idx + tile_channels), channels[idx : idx + tile_channels])
+        for idx in range(0, n_channels, tile_channels)
+    ]
+
+    def _read_tile(out, start, stop, columns, tile):
+        traces = recording.get_traces(start, stop, tile)
+        if np.issubdtype(traces.dtype, np.integer):
+            if scale is not None:
+                traces = traces * scale
+            elif not np.can_cast(traces.dtype, np.int16):
+                info = np.iinfo(np.int16)
+                if traces.size and (traces.min() < info.min or traces.max() > info.max):
+                    raise ValueError(f"{traces.dtype} samples do not fit in int16")
+        elif scale is None:
+            raise ValueError(
+                f"recording returns {traces.dtype} samples: provide scale to convert them to int16"
+            )
+        else:
+            traces = traces * scale
+        if np.issubdtype(traces.dtype, np.floating):
+            traces = np.clip(np.rint(traces), -32768, 32767)
+        out[:, columns] = traces
+
+    def _read_block(pool, out, start):
+        stop = min(start + chunksize, n_samples)
+        block = out[: stop - start]
+        return block, [
+            pool.submit(_read_tile, block, start, stop, columns, tile)
+            for columns, tile in tiles
+        ]
+
+    starts = range(0, n_samples, chunksize)
+    if pbar:
+        from tqdm import tqdm
+
+        starts = tqdm(starts, desc="Exporting binary")
+    buffers = [
+        np.empty((min(chunksize, n_samples), n_channels), dtype=np.int16)
+        for _ in range(2)
+    ]
+    logger.info(f"Exporting {n_samples} samples x {n_channels} channels to {filename}")
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(n_jobs) as pool, open(filename, "wb") as f:
+        pending = None
+        for idx, start in enumerate(starts):
+            # read the next block while the current one is written
+            current = _read_block(pool, buffers[idx % 2], start)
+            if pending is not None:
+                _write_block(f, *pending)
+            pending = current
+        if pending is not None:
+            _write_block(f, *pending)
+    seconds = time.perf_counter() - t0
+    nbytes = n_samples * n_channels * np.dtype(np.int16).itemsize
+    stats = {
+        "n_samples": n_samples,
+        "n_channels": n_channels,
+        "bytes": nbytes,
+        "seconds": seconds,
+        "MB/s": nbytes / 1e6 / seconds if seconds > 0 else float("inf"),
+    }
+    logger.info(
+        f"Wrote {nbytes / 1e6:.1f} MB in {seconds:.1f} s ({stats['MB/s']:.1f} MB/s)"
+    )
+    return stats
+
+
+def _write_block(f, block, futures):
+    for future in futures:
+        future.result()
+    block.tofile(f)
@@ -0,0 +1,255 @@
+"""Chunked access to continuous multichannel data
+
+Every reader of continuous data exposes a `Recording`, either by implementing
+the interface directly or through its `get_recording` method, so that
+downstream processing (filtering, referencing, decimation, snippet extraction)
+can run on any source in bounded memory:
+
+>>> recording = reader.get_recording()
+>>> for chunk in recording.iter_chunks(size=30000, overlap=100):
+...     process(chunk.traces)
+"""
+from collections import namedtuple
+from typing import Optional, Sequence
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+
+class RecordingChunk(
+    namedtuple("RecordingChunk", ["start", "stop", "traces", "left", "right"])
+):
+    """A block of traces yielded by Recording.iter_chunks
+
+    Attributes
+    ----------
+    start, stop: int
+        Sample indices of the block, excluding overlap
+    traces: np.ndarray
+        (n_samples, n_channels) traces from start - left to stop + right
+    left, right: int
+        Number of overlapping samples included before start and after stop
+    """
+
+    __slots__ = ()
+
+    @property
+    def valid(self):
+        """traces from start to stop, with the overlap removed"""
+        return self.traces[self.left : self.traces.shape[0] - self.right]
+
+
+class Recording:
+    """Interface for chunked access to continuous data
+
+    Subclasses must provide `n_samples`, `n_channels`, `sampling_rate` and
+    `_get_traces`. `time_base` defaults to a uniform clock starting at `t_start`.
+
+    Attributes
+    ----------
+    n_samples: int
+    n_channels: int
+    sampling_rate: float
+        In Hz
+    time_base: np.ndarray
+        Time (in s) of every sample
+    """
+
+    t_start = 0.0
+    _time_base = None
+
+    @property
+    def time_base(self) -> np.ndarray:
+        if self._time_base is None:
+            return self._uniform_times(0, self.n_samples)
+        return self._time_base
+
+    def _uniform_times(self, start: int, stop: int) -> np.ndarray:
+        return self.t_start + np.arange(start, stop) / self.sampling_rate
+
+    def _get_traces(self, start: int, stop: int, channels) -> np.ndarray:
+        raise NotImplementedError
+
+    def get_traces(
+        self,
+        start: Optional[int] = None,
+        stop: Optional[int] = None,
+        channels: Optional[Sequence] = None,
+    ) -> np.ndarray:
+        """Read a block of samples
+
+        Parameters
+        ----------
+        start, stop: int or None
+            Sample indices delimiting the block
+        channels: list or None, optional, default: None
+            Subset of channels. If None, all channels are returned
+
+        Returns
+        -------
+        traces: np.ndarray
+            (n_samples, n_channels)
+        """
+        start, stop, _ = slice(start, stop).indices(self.n_samples)
+        stop = max(start, stop)
+        if channels is None:
+            channels = slice(None)
+        return self._get_traces(start, stop, channels)
+
+    def get_times(self, start: Optional[int] = None, stop: Optional[int] = None):
+        """Time (in s) of the samples from start to stop"""
+        if self._time_base is None and type(self).time_base is Recording.time_base:
+            # uniform clock: only compute the requested samples
+            start, stop, _ = slice(start, stop).indices(self.n_samples)
+            return self._uniform_times(start, max(start, stop))
+        return np.asarray(self.time_base[start:stop])
+
+    def iter_chunks(
+        self,
+        size: int,
+        overlap: int = 0,
+        channels: Optional[Sequence] = None,
+        start: Optional[int] = None,
+        stop: Optional[int] = None,
+    ):
+        """Iterate over the recording in blocks of `size` samples
+
+        Parameters
+        ----------
+        size: int
+            Number of samples per block (excluding overlap)
+        overlap: int, optional, default: 0
+            Number of samples of context read on either side of each block,
+            clipped at the edges of the recording
+        channels: list or None, optional, default: None
+            Subset of channels
+        start, stop: int or None
+            Restrict iteration to these samples
+
+        Yields
+        ------
+        chunk: RecordingChunk
+        """
+        size, overlap = int(size), int(overlap)
+        if size <= 0:
+            raise ValueError(f"size must be positive: {size}")
+        start, stop, _ = slice(start, stop).indices(self.n_samples)
+        for chunk_start in range(start, stop, size):
+            chunk_stop = min(chunk_start + size, stop)
+            left = min(overlap, chunk_start)
+            right = min(overlap, self.n_samples - chunk_stop)
+            traces = self.get_traces(chunk_start - left, chunk_stop + right, channels)
+            yield RecordingChunk(chunk_start, chunk_stop, traces, left, right)
+
+    def __repr__(self):
+        return (
+            f"{type(self).__name__}(n_samples={self.n_samples}, "
+            f"n_channels={self.n_channels}, sampling_rate={self.sampling_rate})"
+        )
+
+
+class ArrayRecording(Recording):
+    """Recording backed by a 2-D array, e.g. the memmap returned by `load_raw`
+
+    Parameters
+    ----------
+    data: array_like
+        (n_samples, n_channels) array, or (n_channels, n_samples) if channel_axis=0
+    sampling_rate: float
+    time_base: array_like or None, optional, default: None
+        Time (in s) of each sample. If None, a uniform clock starting at t_start is used
+    t_start: float, optional, default: 0
+    channel_axis: int, optional, default: 1
+    channel_names: list or None, optional, default: None
+        If provided, channels may be selected by name
+    """
+
+    def __init__(
+        self,
+        data: ArrayLike,
+        sampling_rate: float,
+        time_base: Optional[ArrayLike] = None,
+        t_start: float = 0.0,
+        channel_axis: int = 1,
+        channel_names: Optional[Sequence] = None,
+    ):
+        if np.ndim(data) != 2:
+            raise ValueError(f"data must be two-dimensional: {np.shape(data)}")
+        self.data = data if channel_axis == 1 else data.T
+        self._sampling_rate = float(sampling_rate)
+        self._time_base = time_base
+        self.t_start = t_start
+        self.channel_names = None if channel_names is None else list(channel_names)
+
+    @property
+    def n_samples(self):
+        return self.data.shape[0]
+
+    @property
+    def n_channels(self):
+        return self.data.shape[1]
+
+    @property
+    def sampling_rate(self):
+        return self._sampling_rate
+
+    def _channel_index(self, channels):
+        if isinstance(channels, slice) or self.channel_names is None:
+            return channels
+        return [
+            self.channel_names.index(channel) if channel in self.channel_names else channel
+            for channel in channels
+        ]
+
+    def _get_traces(self, start, stop, channels):
+        return np.asarray(self.data[start:stop, self._channel_index(channels)])
+
+
+class ChannelListRecording(ArrayRecording):
+    """Recording backed by a list of equally long 1-D per-channel arrays
+
+    Used by readers that store each channel separately (e.g. Trodes extracted
+    files, OpenEphys '.continuous' files, Nex continuous variables).
+    """
+
+    def __init__(
+        self,
+        channels: Sequence[ArrayLike],
+        sampling_rate: float,
+        time_base: Optional[ArrayLike] = None,
+        t_start: float = 0.0,
+        channel_names: Optional[Sequence] = None,
+    ):
+        lengths = {len(channel) for channel in channels}
+        if len(lengths) > 1:
+            raise ValueError(f"All channels must have the same length: {lengths}")
+        self.data = list(channels)
+        self._n_samples = lengths.pop() if lengths else 0
+        self._sampling_rate = float(sampling_rate)
+        self._time_base = time_base
+        self.t_start = t_start
+        self.channel_names = None if channel_names is None else list(channel_names)
+
+    @property
+    def n_samples(self):
+        return self._n_samples
+
+    @property
+    def n_channels(self):
+        return len(self.data)
+
+    def _get_traces(self, start, stop, channels):
+        channels = self._channel_index(channels)
+        if isinstance(channels, slice):
+            data = self.data[channels]
+        else:
+            data = [self.data[channel] for channel in channels]
+        traces = np.empty(
+            (stop - start, len(data)),
+            dtype=np.result_type(*[channel.dtype for channel in data])
+            if data
+            else np.float64,
+        )
+        for idx, channel in enumerate(data):
+            traces[:, idx] = channel[start:stop]
+        return traces
@@ -1,4 +1,5 @@
 from .io import Trodes
+from .rec import TrodesRec
 
 
 def infer_session_name(path):
@@ -4,6 +4,7 @@ import numpy as np
 from tqdm import tqdm
 
 from simianpy.io.File import File
+from simianpy.io.recording import ChannelListRecording
 from simianpy.io.trodes.readtrodes import readTrodesExtractedDataFile
 
 
@@ -56,8 +57,12 @@ class Trodes(File):
             datatype = info["type"]
             if datatype == "analog":
                 self.logger.info(f"Reading analog data: {name}")
-                timestamps, data = self._read_analog_data(name, info)
-                self._data[name] = {"timestamps": timestamps, "data": data}
+                timestamps, data, clockrate = self._read_analog_data(name, info)
+                self._data[name] = {
+                    "timestamps": timestamps,
+                    "data": data,
+                    "clockrate": clockrate,
+                }
             elif datatype == "DIO":
                 self.logger.info(f"Reading DIO data: {name}")
                 on, off = self._read_dio_data(name, info)
@@ -76,9 +81,11 @@ class Trodes(File):
             name=self.session_name
         )
         data = {}
-        timestamps = readTrodesExtractedDataFile(timestamp_file, mmap_mode=mmap_mode)[
-            1
-        ]["time"]
+        fieldsText, timestamps = readTrodesExtractedDataFile(
+            timestamp_file, mmap_mode=mmap_mode
+        )
+        timestamps = timestamps["time"]
+        clockrate = float(info.get("clockrate", fieldsText.get("clockrate", 30000)))
 
         channels = info["channels"]
 
@@ -107,7 +114,33 @@ class Trodes(File):
                 )
                 data[channel] = channeldata["voltage"].squeeze()
 
-        return timestamps, data
+        return timestamps, data, clockrate
+
+    def get_recording(self, name=None):
+        """Get analog data as a Recording
+
+        Parameters
+        ----------
+        name: str or None, optional, default: None
+            Name of the analog data in the recipe. If None, the first analog entry is used
+
+        Returns
+        -------
+        recording: ChannelListRecording
+            Channels are in recipe order and can be selected by channel number
+        """
+        if name is None:
+            name = next(
+                name for name, info in self.recipe.items() if info["type"] == "analog"
+            )
+        analog = self._data[name]
+        clockrate = analog["clockrate"]
+        return ChannelListRecording(
+            list(analog["data"].values()),
+            sampling_rate=clockrate,
+            time_base=analog["timestamps"] / clockrate,
+            channel_names=list(analog["data"].keys()),
+        )
 
     def _read_dio_data(self, name, info):
         mmap_mode = self.mode if self.mmap else "r"
@@ -0,0 +1,262 @@
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from simianpy.io.File import File
+from simianpy.io.recording import Recording
+
+
+def read_rec_header(filename):
+    """Read the XML configuration at the start of a Trodes '.rec' file
+
+    Returns
+    -------
+    config: xml.etree.ElementTree.Element
+        The root <Configuration> element
+    offset: int
+        Byte offset of the first packet
+    """
+    lines = []
+    with open(filename, "rb") as f:
+        while True:
+            line = f.readline()
+            if not line:
+                raise ValueError(f"No </Configuration> tag found in {filename}")
+            lines.append(line)
+            if b"</Configuration>" in line:
+                break
+        offset = f.tell()
+    return ET.fromstring(b"".join(lines)), offset
+
+
+class TrodesRecAnalog:
+    """Lazy view of the neural channels in a '.rec' packet stream
+
+    Indexing with ``[samples, channels]`` reads only the requested samples and
+    applies the channel order at access time.
+    """
+
+    def __init__(self, raw, order):
+        self.raw = raw
+        self.order = np.asarray(order, dtype=np.intp)
+
+    @property
+    def shape(self):
+        return self.raw.shape[0], self.order.size
+
+    def __len__(self):
+        return self.raw.shape[0]
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key, slice(None))
+        samples, channels = key
+        order = self.order[channels]
+        if np.ndim(order) == 0:
+            # a single channel is a strided view into the file
+            return self.raw[samples, order]
+        return self.raw[samples][..., order]
+
+    def __array__(self, dtype=None, copy=None):
+        data = self[:, :]
+        return data if dtype is None else data.astype(dtype)
+
+
+class TrodesRec(File, Recording):
+    """Interface for SpikeGadgets Trodes '.rec' files
+
+    Reads the packet stream of a raw recording directly, without running the
+    Trodes export tools. Packets are memory mapped and fields are exposed as
+    strided views so no data is read until it is accessed.
+
+    Parameters
+    ----------
+    filename: str or Path
+    channel_order: {'ntrode', 'hardware'} or list of int, optional, default: 'ntrode'
+        'ntrode' orders the neural channels as listed in the SpikeConfiguration
+        (the order used by the Trodes export tools), 'hardware' keeps the order
+        in which they are stored in each packet. A list of hardware channel
+        indices selects and orders channels explicitly.
+    chunksize: int, optional, default: 1e7
+        max number of packets scanned at once when extracting DIO state changes
+    mode: str, optional, default: 'r'
+        Must be one of ['r']
+    logger: logging.Logger, optional
+        logger for this object - see simi.io.File for more info
+
+    Attributes
+    ----------
+    config: xml.etree.ElementTree.Element
+    sampling_rate: float
+    packet_size: int
+    timestamps: np.ndarray
+        uint32 sample counter of each packet
+    analog: TrodesRecAnalog
+        (n_packets, n_channels) int16 neural data
+    auxiliary: dict of np.ndarray
+        analog channels of auxiliary devices (e.g. headstage sensors)
+    dio_channels: dict
+        digital channel id -> (byte, bit) within a packet
+    """
+
+    description = """ """
+    extension = [".rec"]
+    isdir = False
+    needs_recipe = False
+    default_mode = "r"
+    modes = ["r"]
+
+    def __init__(self, filename, channel_order="ntrode", chunksize=1e7, **params):
+        super().__init__(filename, **params)
+        self.channel_order = channel_order
+        self.chunksize = int(chunksize)
+
+    def open(self):
+        self.config, offset = read_rec_header(self.filename)
+        hconf = self.config.find("HardwareConfiguration")
+        if hconf is None:
+            raise ValueError(f"No HardwareConfiguration found in {self.filename}")
+        self.sampling_rate = float(hconf.attrib["samplingRate"])
+        n_channels = int(hconf.attrib["numChannels"])
+
+        # packet layout: sync byte, device bytes, timestamp, [system time], neural data
+        packet_size = 1
+        self.dio_channels = {}
+        auxiliary_channels = {}
+        for device in hconf.findall("Device"):
+            device_offset = packet_size
+            packet_size += int(device.attrib["numBytes"])
+            for channel in device.findall("Channel"):
+                byte = device_offset + int(channel.attrib["startByte"])
+                if channel.attrib.get("dataType") == "digital":
+                    self.dio_channels[channel.attrib["id"]] = (byte, int(channel.attrib["bit"]))
+                elif channel.attrib.get("dataType") == "analog":
+                    auxiliary_channels[channel.attrib["id"]] = byte
+        timestamp_offset = packet_size
+        packet_size += 4
+        if hconf.attrib.get("sysTimeIncluded", "0") == "1":
+            packet_size += 8
+        analog_offset = packet_size
+        packet_size += 2 * n_channels
+        self.packet_size = packet_size
+
+        n_packets = (self.filename.stat().st_size - offset) // packet_size
+        if n_packets * packet_size != self.filename.stat().st_size - offset:
+            self.logger.warning(
+                f"Ignoring incomplete packet at the end of {self.filename}"
+            )
+        self._packets = np.memmap(
+            self.filename,
+            dtype=np.uint8,
+            mode=self.mode,
+            offset=offset,
+            shape=(n_packets, packet_size),
+        )
+        self.timestamps = self._field(timestamp_offset, "<u4")
+        self.analog = TrodesRecAnalog(
+            self._field(analog_offset, "<i2", n_channels),
+            self._get_channel_order(n_channels),
+        )
+        self.auxiliary = {
+            name: self._field(byte, "<i2") for name, byte in auxiliary_channels.items()
+        }
+        self._dio = {}
+
+    def close(self):
+        for attr in ["_packets", "timestamps", "analog", "auxiliary", "_dio"]:
+            if hasattr(self, attr):
+                delattr(self, attr)
+
+    def _field(self, byte, dtype, n=None):
+        """Strided view of a field repeated in every packet"""
+        dtype = np.dtype(dtype)
+        n_packets = self._packets.shape[0]
+        if n is None:
+            shape, strides = (n_packets,), (self.packet_size,)
+        else:
+            shape, strides = (n_packets, n), (self.packet_size, dtype.itemsize)
+        return np.ndarray(
+            shape, dtype=dtype, buffer=self._packets, offset=byte, strides=strides
+        )
+
+    def _get_channel_order(self, n_channels):
+        if isinstance(self.channel_order, str):
+            if self.channel_order == "hardware":
+                return np.arange(n_channels)
+            elif self.channel_order == "ntrode":
+                sconf = self.config.find("SpikeConfiguration")
+                if sconf is None:
+                    return np.arange(n_channels)
+                return np.array(
+                    [
+                        int(channel.attrib["hwChan"])
+                        for ntrode in sconf.findall("SpikeNTrode")
+                        for channel in ntrode.findall("SpikeChannel")
+                    ]
+                )
+            else:
+                raise ValueError(
+                    f"provided channel_order {self.channel_order} is not supported"
+                )
+        return np.asarray(self.channel_order)
+
+    @property
+    def n_samples(self):
+        return self._packets.shape[0]
+
+    @property
+    def n_channels(self):
+        return self.analog.shape[1]
+
+    @property
+    def time_base(self):
+        return self.timestamps / self.sampling_rate
+
+    def get_times(self, start=None, stop=None):
+        return self.timestamps[start:stop] / self.sampling_rate
+
+    def _get_traces(self, start, stop, channels):
+        return self.analog[start:stop, channels]
+
+    def get_recording(self):
+        return self
+
+    @property
+    def channels(self):
+        """Hardware channel index of each column of `analog`"""
+        return self.analog.order
+
+    def get_dio_data(self, name):
+        """Get state changes of a digital channel
+
+        The initial state is reported at the first packet, as in the Trodes export tools.
+
+        Parameters
+        ----------
+        name: str
+            The digital channel id (e.g. 'Din1')
+
+        Returns
+        -------
+        on, off: np.ndarray
+            Timestamps (in samples) at which the channel went high or low
+        """
+        if name not in self._dio:
+            byte, bit = self.dio_channels[name]
+            on, off = [], []
+            previous = None
+            for start in range(0, self._packets.shape[0], self.chunksize):
+                chunk = slice(start, start + self.chunksize)
+                state = (self._packets[chunk, byte] >> bit) & 1
+                changes = np.flatnonzero(
+                    np.diff(state, prepend=1 - state[0] if previous is None else previous)
+                )
+                timestamps = self.timestamps[chunk][changes]
+                on.append(timestamps[state[changes] == 1])
+                off.append(timestamps[state[changes] == 0])
+                previous = state[-1]
+            self._dio[name] = (
+                np.concatenate(on) if on else np.empty(0, dtype=np.uint32),
+                np.concatenate(off) if off else np.empty(0, dtype=np.uint32),
+            )
+        return self._dio[name]
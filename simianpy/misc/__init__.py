@@ -3,6 +3,7 @@
 Contains
 --------
     getLogger -- function that returns a logger object
+    ragged_arange -- vectorized concatenation of many np.arange ranges
 
 Modules
 -------
@@ -12,4 +13,5 @@ from .binary_digitize import binary_digitize
 from .cupy import get_xp
 from .cut import cut
 from .logging import add_logging, getLogger
-from .parse_timeslice import TimeSlice, parse_timeslice
\ No newline at end of file
+from .parse_timeslice import TimeSlice, parse_timeslice
+from .ragged import iter_ragged_arange, ragged_arange
\ No newline at end of file
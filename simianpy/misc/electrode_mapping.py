@@ -134,45 +134,9 @@ class Layer:
 
         return Layer(self.name + f"_flip{axis}", new_channels)
 
-# # brm = Layer.from_json(rmapping_path/"heckles_channels.json")
-# # brc = Layer.from_json(rmapping_path/"blackrock_connector.json")
-# # oe = Layer.from_json(rmapping_path/"oe_connector_CBA.json")
-# # # new = oe.chain_by_loc(brc).chain_by_name(brm)
-# # new = oe.connect(brc, brm)
-# # new.show()
-
-# from pathlib import Path
-
-# mapping_path = Path("D:/OneDrive/Research/Code/simianpy/test/mappings")
-
-from simianpy.misc.electrode_mapping import Layer
-from pathlib import Path
-mapping_path = Path('test/mappings')
-dina_brm = Layer.from_raw("dina_channels", mapping_path/"dina.txt")
-dina_brm = dina_brm.rotate(-1)
-brc = Layer.from_json(mapping_path/"blackrock_connector.json")
-sg = Layer.from_raw("spikegadgets", mapping_path/"spikegadgets_connector.txt")
-dina_mapping = sg.connect(brc, dina_brm)
-dina_mapping.show()
-dina_mapping.to_csv(mapping_path/"dina_mapping.csv")
-
-heckles_brm = Layer.from_raw("heckles_channels", mapping_path/"heckles.txt")
-heckles_mapping = sg.connect(brc, heckles_brm)
-heckles_mapping.show()
-heckles_mapping.to_csv(mapping_path/"heckles_mapping.csv")
-
-
-
-
-# # heckles_brm = Layer.from_json(mapping_path/"heckles_channels.json")
-
-# sg_rot = Layer.from_raw("spikegadgets", mapping_path/"spikegadgets_connector_rotated.txt")
-# heckles_mapping = sg_rot.connect(brc, heckles_brm)
-# heckles_mapping.show()
-# heckles_mapping.to_csv(mapping_path/"heckles_mapping.csv")
-
-
-
-# dina_mapping = sg_rot.connect(brc, dina_brm)
-# dina_mapping.show()
-# dina_mapping.to_csv(mapping_path/"dina_mapping.csv")
+    def groups(self, axis=1):
+        """Channel names grouped by row (axis=0) or column (axis=1) of the layout, e.g. per shank"""
+        groups = {}
+        for ch in self.channels:
+            groups.setdefault(ch['loc'][axis], []).append(ch['name'])
+        return dict(sorted(groups.items()))
@@ -0,0 +1,80 @@
+import numpy as np
+
+MAX_INT32 = np.iinfo(np.int32).max
+
+
+def index_dtype(n):
+    """Smallest of int32/int64 able to index n items"""
+    return np.int32 if n <= MAX_INT32 else np.int64
+
+
+def ragged_arange(starts, stops, dtype=None):
+    """Concatenation of np.arange(start, stop) for every start, stop pair
+
+    Equivalent to np.concatenate([np.arange(l, r) for l, r in zip(starts, stops)])
+    without a python loop: the output is filled with ones, the first element of
+    each range is replaced by its jump from the end of the previous range, and
+    a cumulative sum restores the ranges.
+
+    Parameters
+    ----------
+    starts, stops : array_like of int
+        Bounds of each range. Empty ranges (stop <= start) are skipped
+    dtype : np.dtype or None
+        If None, int32 if every index fits in it, int64 otherwise
+
+    Returns
+    -------
+    idx : np.ndarray
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    stops = np.asarray(stops, dtype=np.int64)
+    lengths = np.maximum(stops - starts, 0)
+    nonempty = lengths > 0
+    starts, stops, lengths = starts[nonempty], stops[nonempty], lengths[nonempty]
+    if dtype is None:
+        dtype = index_dtype(stops.max() if stops.size else 0)
+    idx = np.ones(lengths.sum(), dtype=dtype)
+    if idx.size == 0:
+        return idx
+    idx[0] = starts[0]
+    idx[np.cumsum(lengths[:-1])] = starts[1:] - stops[:-1] + 1
+    return np.cumsum(idx, dtype=dtype, out=idx)
+
+
+def iter_ragged_arange(starts, stops, max_size=1 << 24, dtype=None):
+    """ragged_arange in pieces of at most max_size indices
+
+    Ranges are never split, so a piece exceeds max_size only when a single
+    range does.
+
+    Parameters
+    ----------
+    starts, stops : array_like of int
+    max_size : int, optional
+        Memory budget, in number of indices per piece, by default 2**24
+    dtype : np.dtype or None
+        see ragged_arange
+
+    Yields
+    ------
+    ranges : slice
+        Ranges (into starts, stops) covered by this piece
+    positions : slice
+        Position of this piece in the full ragged_arange output
+    idx : np.ndarray
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    stops = np.asarray(stops, dtype=np.int64)
+    ends = np.cumsum(np.maximum(stops - starts, 0))
+    if dtype is None:
+        dtype = index_dtype(stops.max() if stops.size else 0)
+    first, position = 0, 0
+    while first < ends.size:
+        last = max(first + 1, np.searchsorted(ends, position + max_size, side="right"))
+        yield (
+            slice(first, last),
+            slice(position, int(ends[last - 1])),
+            ragged_arange(starts[first:last], stops[first:last], dtype=dtype),
+        )
+        first, position = last, int(ends[last - 1])
@@ -4,6 +4,7 @@ from simianpy.scripts.intan import Intan
 from simianpy.scripts.trodes import Trodes
 from simianpy.scripts.util import util
 from simianpy.scripts.spiketrainset import SpikeTrain
+from simianpy.scripts.export import export_binary
 
 import click
 
@@ -17,5 +18,6 @@ simi.add_command(OpenEphys)
 simi.add_command(Trodes)
 simi.add_command(util)
 simi.add_command(SpikeTrain)
+simi.add_command(export_binary)
 if __name__ == '__main__':
     simi()
\ No newline at end of file
@@ -0,0 +1 @@
+from .export_binary import export_binary
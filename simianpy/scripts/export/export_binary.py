@@ -0,0 +1,166 @@
+import re
+from contextlib import ExitStack
+from pathlib import Path
+
+import click
+
+FORMATS = ["rhs", "continuous", "openephys-binary", "trodes-rec", "raw"]
+
+
+def infer_format(path):
+    path = Path(path)
+    if path.is_dir():
+        if (path / "structure.oebin").is_file():
+            return "openephys-binary"
+        if any(path.glob("*.continuous")):
+            return "continuous"
+    elif path.suffix == ".rhs":
+        return "rhs"
+    elif path.suffix == ".rec":
+        return "trodes-rec"
+    elif path.suffix in (".dat", ".bin"):
+        return "raw"
+    raise click.BadParameter(f"cannot infer format of {path}: use --format")
+
+
+def read_channel_map(channel_map):
+    """Channel map from a file (one channel per line) or a comma separated list"""
+    if Path(channel_map).is_file():
+        with open(channel_map, "r") as f:
+            channels = [line.strip() for line in f if line.strip()]
+    else:
+        channels = [channel.strip() for channel in channel_map.split(",")]
+    return [
+        int(channel) if channel.lstrip("-").isdigit() else channel
+        for channel in channels
+    ]
+
+
+def _channel_number(path):
+    numbers = re.findall(r"\d+", path.stem)
+    return int(numbers[-1]) if numbers else -1
+
+
+@click.command("export-binary")
+@click.argument("path", type=click.Path(exists=True))
+@click.option(
+    "--format",
+    "fmt",
+    type=click.Choice(FORMATS),
+    default=None,
+    help="source format. inferred from PATH if not provided",
+)
+@click.option(
+    "-o",
+    "--output-path",
+    type=click.Path(),
+    default=None,
+    help="defaults to PATH with a '.dat' suffix",
+)
+@click.option("-f", "--force", is_flag=True, default=False)
+@click.option(
+    "-m",
+    "--channel-map",
+    default=None,
+    help="file with one channel per line, or comma separated channels \
+(indices or names), in output order",
+)
+@click.option("-c", "--chunksize", default=1e6, help="number of samples per block")
+@click.option(
+    "-j", "--n-jobs", type=int, default=None, help="number of threads reading channels"
+)
+@click.option(
+    "--stream", default=None, help="openephys-binary: name of the stream to export"
+)
+@click.option(
+    "--pattern",
+    default="*CH*.continuous",
+    help="continuous: glob selecting channel files",
+)
+@click.option(
+    "--n-channels", type=int, default=None, help="raw: number of interleaved channels"
+)
+@click.option("--dtype", default="int16", help="raw: sample dtype")
+@click.option("-v", "--verbose", count=True)
+def export_binary(
+    path,
+    fmt,
+    output_path,
+    force,
+    channel_map,
+    chunksize,
+    n_jobs,
+    stream,
+    pattern,
+    n_channels,
+    dtype,
+    verbose,
+):
+    """Write continuous data to an interleaved int16 file for spike sorting
+
+    Raw integer samples are copied without scaling.
+    """
+    from simianpy.io import TrodesRec, export_binary, load_raw_recording
+    from simianpy.io.intan import RHSRecording
+    from simianpy.io.openephys import OpenEphysBinary, load_continuous_recording
+    from simianpy.misc import getLogger
+
+    path = Path(path)
+    fmt = infer_format(path) if fmt is None else fmt
+    if output_path is None:
+        output_path = (path / path.name if path.is_dir() else path).with_suffix(".dat")
+    else:
+        output_path = Path(output_path)
+    if output_path.is_file() and not force:
+        raise FileExistsError(
+            f"output file already exists: {output_path}. Use force parameter to overwrite."
+        )
+    if verbose > 1:
+        loglevel = "DEBUG"
+    elif verbose > 0:
+        loglevel = "INFO"
+    else:
+        loglevel = "WARN"
+    logger = getLogger("simi.export_binary", printLevel=loglevel, fileName=False)
+    channels = None if channel_map is None else read_channel_map(channel_map)
+
+    with ExitStack() as stack:
+        if fmt == "rhs":
+            recording = RHSRecording(path)
+        elif fmt == "continuous":
+            filepaths = sorted(path.glob(pattern), key=_channel_number)
+            if not filepaths:
+                raise FileNotFoundError(f"No files matching {pattern} in {path}")
+            recording = load_continuous_recording(filepaths, logger=logger)
+        elif fmt == "openephys-binary":
+            oe = stack.enter_context(
+                OpenEphysBinary(
+                    path, logger_kwargs=dict(printLevel=loglevel, fileName=False)
+                )
+            )
+            recording = oe.get_recording(stream).get_raw_recording()
+        elif fmt == "trodes-rec":
+            recording = stack.enter_context(
+                TrodesRec(path, logger_kwargs=dict(printLevel=loglevel, fileName=False))
+            )
+        elif fmt == "raw":
+            if n_channels is None:
+                raise click.BadParameter("--n-channels is required for raw files")
+            recording = load_raw_recording(
+                path, n_channels, sampling_rate=1, dtype=dtype
+            )
+        click.echo(f"Exporting {recording} to {output_path}")
+        stats = export_binary(
+            recording,
+            output_path,
+            channels=channels,
+            chunksize=chunksize,
+            n_jobs=n_jobs,
+            pbar=True,
+            logger=logger,
+        )
+    click.echo(
+        f"Wrote {stats['bytes'] / 1e6:.1f} MB "
+        f"({stats['n_samples']} samples x {stats['n_channels']} channels) "
+        f"in {stats['seconds']:.1f} s: {stats['MB/s']:.1f} MB/s"
+    )
@@ -1,3 +1,4 @@
+from glob import glob
 from pathlib import Path
 
 import click
@@ -31,14 +32,31 @@ import simianpy as simi
     help="Overwrite files if necessary",
     is_flag=True,
 )
-def Combine(whatif, force, inputs, output):
+@click.option(
+    "--decode",
+    "decode",
+    default=False,
+    help="Read and re-encode every variable instead of copying data blocks",
+    is_flag=True,
+)
+@click.option(
+    "--frequency",
+    "frequency",
+    default=None,
+    type=float,
+    help="Timestamp frequency of the output. Default=highest input frequency",
+)
+def Combine(whatif, force, inputs, output, decode, frequency):
     """ Combines multiples nex files into one
 
+    By default only headers are read and each variable's data is copied
+    into the output as is, so memory use does not depend on file sizes.
+
     INPUTS, nex files to be combined
     """
     nex_files = []
     for filepath in inputs:
-        nex_files.extend(Path().glob(filepath))
+        nex_files.extend(map(Path, sorted(glob(filepath))))
     output = Path(output)
 
     if output.is_file() and not force:
@@ -53,14 +71,20 @@ def Combine(whatif, force, inputs, output):
         print("\t", output)
         click.confirm("Do you want to proceed?", abort=True)
 
+    if not decode:
+        print(f"Writing to {output}...")
+        simi.io.nex.combine(nex_files, output, timestampFrequency=frequency)
+        print("Done!")
+        return
+
     variable_data = []
     timestampFrequencies = []
     for nex_file in tqdm(nex_files, "Reading files"):
-        with simi.io.Nex(nex_file) as in_file:
+        with simi.io.Nex(nex_file, mode="r") as in_file:
             timestampFrequencies.append(in_file.data["FileHeader"]["Frequency"])
             variable_data.extend(in_file.data["Variables"])
 
-    max_timestampFrequency = max(timestampFrequencies)
+    max_timestampFrequency = frequency or max(timestampFrequencies)
     if any(frequency != max_timestampFrequency for frequency in timestampFrequencies):
         pass  # should we raise error here or just a warning?
 
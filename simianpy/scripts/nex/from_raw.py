@@ -1,8 +1,8 @@
+from ast import literal_eval
 from pathlib import Path
 
 import click
 import numpy as np
-from tqdm import tqdm
 
 import simianpy as simi
 
@@ -14,7 +14,7 @@ import simianpy as simi
     "--shape",
     "shape",
     default=None,
-    help="ex: (1000, 128) provide shape as tuple for non-npy files",
+    help="ex: (1000, 128) provide shape as tuple for non-npy files. Use None for the unknown dim",
 )
 @click.option(
     "-t",
@@ -24,12 +24,15 @@ import simianpy as simi
     is_flag=True,
     help="if data shape (N_CHANNEL, N_SAMPLE)",
 )
+@click.option(
+    "--dtype", "dtype", default="int16", help="dtype of non-npy files. Default=int16"
+)
 @click.option(
     "-o",
     "--output",
     "output",
     default="out.nex5",
-    help="Output filepath. Default=out.nex",
+    help="Output filepath. Must be '.nex5'. Default=out.nex5",
 )
 @click.option(
     "-f",
@@ -48,25 +51,107 @@ import simianpy as simi
     help="Channel list file. Text file with N_CHANNEL lines",
 )
 @click.option(
-    "-m", "--memmap", "memmap", default=False, is_flag=True, help="Use memory mapping"
+    "-m/-M",
+    "--memmap/--no-memmap",
+    "memmap",
+    default=True,
+    help="Memory map the input (default) or read it into memory first",
+)
+@click.option(
+    "-b",
+    "--band",
+    "band",
+    nargs=2,
+    type=float,
+    default=None,
+    help="Band-pass cutoffs LOW HIGH in Hz. Use 0 for LOW for a low-pass filter",
+)
+@click.option("--filter-order", "filter_order", default=3, type=int)
+@click.option(
+    "-r",
+    "--resample-to",
+    "resample_to",
+    default=None,
+    type=float,
+    help="Output sampling rate in Hz, ex: 1000 for LFP",
+)
+@click.option(
+    "--scale",
+    "scale",
+    default=1.0,
+    type=float,
+    help="Multiply samples by scale, ex: 0.000195 for Intan bits to mV",
 )
-def from_raw(rawpath, shape, transpose, output, force, sampling_freq, channels, memmap):
+@click.option(
+    "--ad-to-mv",
+    "ADtoMV",
+    default=None,
+    type=float,
+    help="Store values as int16 with this resolution instead of float32",
+)
+@click.option(
+    "--chunksize", "chunksize", default=1e6, type=float, help="Samples per block"
+)
+@click.option(
+    "-j", "--n-jobs", "n_jobs", default=None, type=int, help="Number of threads"
+)
+def from_raw(
+    rawpath,
+    shape,
+    transpose,
+    dtype,
+    output,
+    force,
+    sampling_freq,
+    channels,
+    memmap,
+    band,
+    filter_order,
+    resample_to,
+    scale,
+    ADtoMV,
+    chunksize,
+    n_jobs,
+):
+    """Write a .npy or flat binary file of continuous data to a nex5 file
+
+    Data are read in blocks of CHUNKSIZE samples, optionally band-pass filtered
+    and resampled, and written by several threads straight into the output.
+    """
     rawpath, output = Path(rawpath), Path(output)
     if output.is_file() and not force:
         raise FileExistsError("File already exists at" + output.as_posix())
+    if output.suffix != ".nex5":
+        raise click.BadParameter("output must be a '.nex5' file", param_hint="-o")
     if rawpath.suffix == ".npy":
         raw = np.load(rawpath, mmap_mode="r" if memmap else None)
+    elif shape is None:
+        raise click.BadParameter("shape is required for non-npy files", param_hint="-s")
     else:
-        raise NotImplementedError("Only .npy files are supported at the moment")
-    if not transpose:
-        raw = raw.T
-    n_channels = raw.shape[0]
+        raw = simi.io.load_raw(rawpath, literal_eval(shape), dtype=dtype)
+        if not memmap:
+            raw = np.array(raw)
+    recording = simi.io.ArrayRecording(
+        raw, sampling_freq, channel_axis=0 if transpose else 1
+    )
     if channels is None:
-        channel_names = [f"AD{i}" for i in range(n_channels)]
+        channel_names = None
     else:
         channel_names = open(channels, "r").read().splitlines()
-    with simi.io.Nex(output, mode="w", timestampFrequency=sampling_freq) as nex:
-        for name, row in tqdm(zip(channel_names, raw), total=n_channels):
-            nex.writer.AddContVarWithSingleFragment(name, 0, sampling_freq, row)
-        print("Writing...")
+    if band is not None:
+        band = tuple(cutoff if cutoff > 0 else None for cutoff in band)
+    simi.io.recording_to_nex(
+        recording,
+        output,
+        channel_names=channel_names,
+        band=band,
+        filter_order=filter_order,
+        resample_to=resample_to,
+        scale=scale,
+        ADtoMV=ADtoMV,
+        timestampFrequency=sampling_freq,
+        chunksize=chunksize,
+        n_jobs=n_jobs,
+        pbar=True,
+    )
     print("Done!")
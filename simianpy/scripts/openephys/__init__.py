@@ -1,5 +1,6 @@
 import click
 
+from .batch_to_nex import batch_to_nex
 from .to_nex import to_nex
 
 
@@ -8,4 +9,5 @@ def OpenEphys():
     pass
 
 
-OpenEphys.add_command(to_nex)
\ No newline at end of file
+OpenEphys.add_command(to_nex)
+OpenEphys.add_command(batch_to_nex)
\ No newline at end of file
@@ -0,0 +1,89 @@
+import json
+from pathlib import Path
+
+import click
+import yaml
+
+
+def parse_memory(memory):
+    """Parse a memory size such as '8G' or '512M' into bytes"""
+    if memory is None:
+        return None
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+    memory = memory.strip().upper().rstrip("B")
+    if memory and memory[-1] in units:
+        return int(float(memory[:-1]) * units[memory[-1]])
+    return int(memory)
+
+
+@click.command()
+@click.argument("session_paths", nargs=-1, required=True, type=click.Path(exists=True))
+@click.option("-r", "--recipe-path", required=True, type=click.Path(exists=True))
+@click.option(
+    "-o",
+    "--output-dir",
+    type=click.Path(),
+    default=None,
+    help="defaults to writing each nex file next to its session directory",
+)
+@click.option(
+    "-m",
+    "--manifest-path",
+    type=click.Path(),
+    default=None,
+    help="JSON manifest used to resume. defaults to OUTPUT_DIR/manifest.json",
+)
+@click.option("-j", "--n-jobs", type=int, default=None, help="number of processes")
+@click.option(
+    "--max-memory",
+    default=None,
+    help="memory cap per worker process, e.g. '8G'",
+)
+@click.option(
+    "--retry-failed/--skip-failed",
+    default=True,
+    help="whether to retry sessions that failed in a previous run",
+)
+@click.option("--sampling-rate", type=float, default=30000)
+@click.option("-v", "--verbose", count=True)
+def batch_to_nex(
+    session_paths,
+    recipe_path,
+    output_dir,
+    manifest_path,
+    n_jobs,
+    max_memory,
+    retry_failed,
+    sampling_rate,
+    verbose,
+):
+    """Convert many OpenEphys sessions to nex5 files in parallel"""
+    from simianpy.io.openephys import batch_to_nex
+    from simianpy.misc import getLogger
+
+    recipe_path = Path(recipe_path)
+    with open(recipe_path, "r") as f:
+        recipe = (json.load if recipe_path.suffix == ".json" else yaml.safe_load)(f)
+    if verbose > 1:
+        loglevel = "DEBUG"
+    elif verbose > 0:
+        loglevel = "INFO"
+    else:
+        loglevel = "WARN"
+    logger = getLogger("simi.batch_to_nex", printLevel="INFO", fileName=False)
+    manifest = batch_to_nex(
+        session_paths,
+        recipe,
+        output_dir=output_dir,
+        manifest_path=manifest_path,
+        timestampFrequency=sampling_rate,
+        n_jobs=n_jobs,
+        max_memory=parse_memory(max_memory),
+        retry_failed=retry_failed,
+        loglevel=loglevel,
+        logger=logger,
+    )
+    for session in map(Path, session_paths):
+        if session in manifest and manifest[session]["status"] == "failed":
+            click.echo(f"FAILED {session}: {manifest[session]['error']}")
+    click.echo(f"Manifest: {manifest.path} {manifest.summary()}")
@@ -1,9 +1,23 @@
-import shutil
 from pathlib import Path
 
 import click
 import numpy as np
-from tqdm import tqdm
+
+
+def load_groups(path):
+    """Channel groups from a Layer json file (grouped by column) or a text
+    file with one comma-separated group of channel indices per line"""
+    path = Path(path)
+    if path.suffix == ".json":
+        from simianpy.misc.electrode_mapping import Layer
+
+        return Layer.from_json(path)
+    with open(path, "r") as f:
+        return [
+            [int(channel) for channel in line.split(",") if channel.strip()]
+            for line in f.read().splitlines()
+            if line.strip() and not line.startswith("#")
+        ]
 
 
 @click.command()
@@ -11,28 +25,73 @@ from tqdm import tqdm
 @click.option(
     "-c",
     "--chunksize",
-    default=1e7,
+    default=1e6,
     help="max number of samples loaded \
-into memory at once. tweak to improve performance. set to -1 to do entire file at once",
+into memory at once per thread. tweak to improve performance. set to -1 to do entire file at once",
+)
+@click.option(
+    "--copy",
+    default=False,
+    is_flag=True,
+    help="writes the referenced data to PATH.cmr.npy instead of modifying PATH",
 )
+@click.option("-o", "--output", default=None, help="Output file (.npy or raw binary)")
 @click.option(
-    "--copy", default=False, is_flag=True, help="copies file before applying filter"
+    "--operator",
+    default="median",
+    type=click.Choice(["median", "approx_median", "mean"]),
+    help="median (CMR), approx_median (faster, lower median) or mean (CAR)",
 )
-def cmr(path, chunksize, copy):
-    """Apply common median reference to an npy file"""
+@click.option(
+    "-g",
+    "--groups",
+    default=None,
+    help="Channel groups referenced separately: Layer .json file or text file with one comma-separated group per line",
+)
+@click.option("-j", "--n-jobs", "n_jobs", default=None, type=int)
+@click.option(
+    "--n-channels",
+    "n_channels",
+    default=None,
+    type=int,
+    help="Number of interleaved channels of non-npy files",
+)
+@click.option("--dtype", default="int16", help="dtype of non-npy files")
+@click.option("-sf", "--sampling-frequency", "sampling_freq", default=3e4)
+def cmr(
+    path,
+    chunksize,
+    copy,
+    output,
+    operator,
+    groups,
+    n_jobs,
+    n_channels,
+    dtype,
+    sampling_freq,
+):
+    """Apply common median (or average) reference to an npy or raw binary file"""
+    from simianpy.io import ArrayRecording, load_raw
+    from simianpy.signal import common_reference
+
     path = Path(path)
-    if copy:
-        filt_path = shutil.copy(path, path.parent / f"{path.stem}.cmr.npy")
-    else:
-        filt_path = path
-    data = np.load(filt_path, mmap_mode="r+")
-    if chunksize < 0:
-        data -= np.median(data, axis=0, keepdims=True)
+    if output is None and copy:
+        output = path.parent / f"{path.stem}.cmr.npy"
+    mode = "r" if output is not None else "r+"
+    if path.suffix == ".npy":
+        data = np.load(path, mmap_mode=mode)
+    elif n_channels is None:
+        raise click.BadParameter(
+            "required for non-npy files", param_hint="--n-channels"
+        )
     else:
-        for idx in tqdm(
-            np.arange(0, data.shape[0], chunksize), desc="Applying median correction"
-        ):
-            chunkslice = slice(int(idx), int(idx + chunksize))
-            data[chunkslice, :] -= np.median(
-                data[chunkslice, :], axis=1, keepdims=True
-            ).astype(int)
+        data = load_raw(path, (None, n_channels), dtype=dtype, mode=mode)
+    common_reference(
+        ArrayRecording(data, sampling_freq),
+        output=output,
+        operator=operator,
+        groups=None if groups is None else load_groups(groups),
+        chunksize=chunksize,
+        n_jobs=n_jobs,
+        pbar=True,
+    )
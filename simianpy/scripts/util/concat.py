@@ -1,4 +1,4 @@
-import shutil
+import time
 from pathlib import Path
 
 import click
@@ -21,12 +21,18 @@ def get_header(files, axis):
     dict
         datatype descr, fortran order and shape, for concatenated file
     """
-    dtypes, shapes, forders = [], [], []
-    for file in files:
-        f = np.load(file, "r")
-        dtypes.append(f.dtype)
-        shapes.append(f.shape)
-        forders.append(f.flags["F_CONTIGUOUS"])
+    return _get_header([np.load(file, "r") for file in files], axis)
+
+
+def _get_header(arrays, axis):
+    dtypes = [array.dtype for array in arrays]
+    shapes = [array.shape for array in arrays]
+    # arrays contiguous in both orders (e.g. a single row) fit either order
+    forders = [
+        _is_fortran(array)
+        for array in arrays
+        if not (array.flags["C_CONTIGUOUS"] and array.flags["F_CONTIGUOUS"])
+    ]
 
     if all(dtype == dtypes[0] for dtype in dtypes):
         dtype = dtypes[0]
@@ -34,7 +40,7 @@ def get_header(files, axis):
         raise ValueError("All files must have the same dtype")
 
     if all(forder == forders[0] for forder in forders):
-        forder = forders[0]
+        forder = forders[0] if forders else False
     else:
         raise ValueError("All files must have the same fortran order")
 
@@ -64,13 +70,101 @@ def get_header(files, axis):
     return header
 
 
+def _is_fortran(array):
+    return array.flags["F_CONTIGUOUS"] and not array.flags["C_CONTIGUOUS"]
+
+
+def _memory_order(array, axis, fortran):
+    """View of array with its axes in memory order (C contiguous if the
+    concatenation is C ordered) and the matching axis"""
+    if fortran:
+        return array.T, array.ndim - 1 - axis
+    return array, axis
+
+
+def concatenate_files(inputs, output, axis=0, chunksize=1 << 28):
+    """Concatenate memory mapped arrays into output
+
+    Along the slowest-varying axis every input is a single contiguous block
+    of bytes, copied in the kernel with copy_bytes (os.copy_file_range).
+    Along any other axis the inputs are interleaved in the output, so they
+    are copied through memory in tiles of about `chunksize` bytes.
+
+    Parameters
+    ----------
+    inputs: list of np.memmap
+        Arrays mapped from the input files ('offset' gives the data position)
+    output: np.memmap
+        Preallocated output, e.g. from np.lib.format.open_memmap
+    axis: int, optional, default: 0
+    chunksize: int, optional, default: 256 MiB
+
+    Returns
+    -------
+    nbytes: int
+        Number of bytes copied
+    """
+    from simianpy.io.raw import copy_bytes
+
+    fortran = _is_fortran(output)
+    out, out_axis = _memory_order(output, axis, fortran)
+    nbytes = 0
+    if out_axis == 0:
+        output.flush()
+        with open(output.filename, "r+b") as outputfile:
+            outputfile.seek(output.offset)
+            for array in inputs:
+                with open(array.filename, "rb") as inputfile:
+                    copy_bytes(
+                        inputfile, outputfile, array.offset, array.nbytes, chunksize
+                    )
+                nbytes += array.nbytes
+        return nbytes
+
+    position = 0
+    for array in inputs:
+        array, _ = _memory_order(array, axis, fortran)
+        # number of leading (outer) indices copied per tile
+        row_bytes = max(1, array[:1].nbytes)
+        step = max(1, chunksize // row_bytes)
+        target = [slice(None)] * out.ndim
+        target[out_axis] = slice(position, position + array.shape[out_axis])
+        for start in range(0, array.shape[0], step):
+            target[0] = slice(start, start + step)
+            out[tuple(target)] = array[start : start + step]
+        position += array.shape[out_axis]
+        nbytes += array.nbytes
+    output.flush()
+    return nbytes
+
+
 @click.command("concat")
 @click.argument("files", nargs=-1)
 @click.option("-o", "--output", default="concat.bin")
 @click.option("-f", "--force", is_flag=True, default=False)
 @click.option("-t", "--type", default="raw", type=click.Choice(["raw", "npy"]))
 @click.option("-a", "--axis", default=0, type=int)
-def concat(files, output, force, type, axis):
+@click.option(
+    "--n-channels",
+    "n_channels",
+    multiple=True,
+    type=int,
+    help="Interleaved channels of raw files: once, or once per file. Required for raw files with axis != 0",
+)
+@click.option("--dtype", default="int16", help="dtype of raw files")
+@click.option(
+    "-c",
+    "--chunksize",
+    default=1 << 28,
+    type=int,
+    help="max number of bytes copied at once",
+)
+def concat(files, output, force, type, axis, n_channels, dtype, chunksize):
+    """Concatenate raw or npy files without decoding them
+
+    Along the first axis (the last for fortran ordered npy files) data are
+    copied in the kernel; along other axes they are streamed in tiles.
+    """
     output = Path(output)
     files = [Path(file) for file in files]
     if any(not file.is_file() for file in files):
@@ -83,13 +177,51 @@ def concat(files, output, force, type, axis):
         print("\t", idx + 1, file.name)
     print("Into", "\n\t", output.name)
 
-    with open(output, "wb") as outputfile:
-        if type == "npy":
-            fmt.write_array_header_2_0(outputfile, get_header(files, axis))
-        for file in files:
-            with open(file, "rb") as inputfile:
-                if type == "npy":
-                    inputfile.seek(128)
-                shutil.copyfileobj(inputfile, outputfile)
+    if type == "npy":
+        inputs = [np.load(file, mmap_mode="r") for file in files]
+    elif n_channels:
+        from simianpy.io import load_raw
+
+        if len(n_channels) == 1:
+            n_channels = n_channels * len(files)
+        elif len(n_channels) != len(files):
+            raise click.BadParameter(
+                "give one value, or one per file", param_hint="--n-channels"
+            )
+        inputs = [
+            load_raw(file, (None, n_channels_), dtype=dtype)
+            for file, n_channels_ in zip(files, n_channels)
+        ]
+    elif axis == 0:
+        inputs = [np.memmap(file, dtype="uint8", mode="r") for file in files]
+    else:
+        raise click.BadParameter(
+            "required to concatenate raw files along axis != 0",
+            param_hint="--n-channels",
+        )
+    header = _get_header(inputs, axis)
+
+    t0 = time.perf_counter()
+    if type == "npy":
+        out = fmt.open_memmap(
+            output,
+            mode="w+",
+            dtype=fmt.descr_to_dtype(header["descr"]),
+            shape=header["shape"],
+            fortran_order=header["fortran_order"],
+        )
+    else:
+        out = np.memmap(
+            output,
+            mode="w+",
+            dtype=fmt.descr_to_dtype(header["descr"]),
+            shape=header["shape"],
+        )
+    nbytes = concatenate_files(inputs, out, axis, chunksize)
+    del out
+    seconds = time.perf_counter() - t0
 
-    print("Concatenation complete")
+    print(
+        f"Concatenation complete: {nbytes / 1e6:.1f} MB in {seconds:.1f} s "
+        f"({nbytes / 1e6 / max(seconds, 1e-9):.1f} MB/s)"
+    )
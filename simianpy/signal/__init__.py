@@ -5,14 +5,20 @@ Contains
     Filter - helper class for designing frequency filter
     FFT - helper class for performing a FFT on time series data 
     Smooth - helper class for designing a smoothing function
+    Resampler - streaming polyphase resampler
+    common_reference - parallel chunked common median/average referencing
 
 Modules
 -------
     filter
     fft
     smooth
+    resample
+    reference
 """
 from .convolve import Convolve
 from .fft import FFT
 from .filter import Filter
+from .reference import approx_median, common_reference
+from .resample import Resampler, resample, resample_recording
 from .sosfilter import sosFilter
@@ -0,0 +1,183 @@
+"""Common median/average referencing of multichannel recordings"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+
+def approx_median(x, axis=-1):
+    """Median along axis using a single partition
+
+    For an even number of values the lower of the two middle values is
+    returned instead of their mean. The partition runs in the dtype of x
+    (no conversion to float64), which makes it several times faster than
+    np.median on int16 data.
+
+    Parameters
+    ----------
+    x: np.ndarray
+    axis: int, optional, default: -1
+
+    Returns
+    -------
+    median: np.ndarray
+        x with axis reduced, same dtype as x
+    """
+    x = np.asarray(x)
+    kth = (x.shape[axis] - 1) // 2
+    return np.take(np.partition(x, kth, axis=axis), kth, axis=axis)
+
+
+REFERENCE_OPERATORS = {
+    "median": lambda x: np.median(x, axis=1),
+    "approx_median": lambda x: approx_median(x, axis=1),
+    "mean": lambda x: np.mean(x, axis=1),
+}
+
+
+def _resolve_channels(recording, channels):
+    """Column index of each channel
+
+    Channels are looked up in recording.channel_names when the recording has
+    names (an integer is then a name, e.g. a 1-based hardware channel, never a
+    position), and are taken as column indices only when it has none.
+    """
+    names = getattr(recording, "channel_names", None)
+    if names is None:
+        return [int(channel) for channel in channels]
+    missing = [channel for channel in channels if channel not in names]
+    if missing:
+        raise KeyError(f"Channels not found in recording.channel_names: {missing}")
+    return [names.index(channel) for channel in channels]
+
+
+def common_reference(
+    recording,
+    output=None,
+    operator="median",
+    groups=None,
+    chunksize=1e6,
+    n_jobs=None,
+    pbar=False,
+    logger=None,
+):
+    """Subtract the median (CMR) or mean (CAR) across channels from every sample
+
+    Chunks of `chunksize` samples are referenced independently on a thread
+    pool and written straight to their place in the output, so memory use is
+    bounded by n_jobs chunks. Each group of channels (e.g. each shank) is
+    referenced to its own median/mean; channels in no group are copied as is.
+    Integer data are rounded back to their dtype.
+
+    Parameters
+    ----------
+    recording: simianpy.io.Recording
+        If output is None, must be an ArrayRecording over a writable array
+        (e.g. np.load(path, mmap_mode='r+')), which is modified in place
+    output: str, Path or None, optional, default: None
+        '.npy' file, or flat binary file of interleaved samples. If None,
+        the recording is referenced in place
+    operator: str, optional, default: 'median'
+        'median', 'approx_median' (see approx_median) or 'mean'
+    groups: list of lists, Layer or None, optional, default: None
+        Channels referenced together, by name if the recording has
+        channel_names (KeyError for unknown names), else by column index. A
+        simianpy.misc.electrode_mapping.Layer is grouped by column (see
+        Layer.groups). If None, all channels form a single group
+    chunksize: int, optional, default: 1e6
+        Number of samples per chunk. If negative, the whole recording at once
+    n_jobs: int or None, optional, default: None
+        Number of threads. If None, uses ThreadPoolExecutor's default
+    pbar: bool, optional, default: False
+    logger: logging.Logger, optional
+
+    Returns
+    -------
+    stats: dict
+        'n_samples', 'n_channels', 'seconds' and 'realtime' (recording
+        duration over processing time)
+    """
+    if logger is None:
+        from simianpy.misc import getLogger
+
+        logger = getLogger(__name__)
+    if operator not in REFERENCE_OPERATORS:
+        raise ValueError(
+            f"operator must be one of {list(REFERENCE_OPERATORS)}: {operator}"
+        )
+    reduce = REFERENCE_OPERATORS[operator]
+    n_samples, n_channels = recording.n_samples, recording.n_channels
+    chunksize = n_samples if chunksize < 0 else int(chunksize)
+
+    if groups is None:
+        groups = [np.arange(n_channels)]
+    else:
+        if hasattr(groups, "groups"):
+            groups = list(groups.groups().values())
+        groups = [np.array(_resolve_channels(recording, group), dtype=int) for group in groups]
+    grouped = np.concatenate(groups) if groups else np.array([], dtype=int)
+    if np.unique(grouped).size != grouped.size:
+        raise ValueError("A channel belongs to more than one group")
+
+    dtype = recording.get_traces(0, 1).dtype
+    if output is None:
+        out = getattr(recording, "data", None)
+        if not isinstance(out, np.ndarray) or not out.flags.writeable:
+            raise ValueError(
+                "In place referencing requires an ArrayRecording over a writable array"
+            )
+    elif Path(output).suffix == ".npy":
+        out = np.lib.format.open_memmap(
+            output, mode="w+", dtype=dtype, shape=(n_samples, n_channels)
+        )
+    else:
+        out = np.memmap(output, mode="w+", dtype=dtype, shape=(n_samples, n_channels))
+
+    def _reference(start):
+        stop = min(start + chunksize, n_samples)
+        traces = recording.get_traces(start, stop)
+        referenced = traces if output is None else traces.copy()
+        for group in groups:
+            data = traces[:, group]
+            reference = reduce(data)[:, np.newaxis]
+            if np.issubdtype(dtype, np.integer):
+                info = np.iinfo(dtype)
+                data = np.clip(
+                    np.rint(data - reference.astype(np.float32)), info.min, info.max
+                )
+            else:
+                data = data - reference
+            referenced[:, group] = data
+        out[start:stop] = referenced
+
+    logger.info(
+        f"Applying {operator} reference to {n_channels} channels in {len(groups)} group(s)"
+    )
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(n_jobs) as pool:
+        done = pool.map(_reference, range(0, n_samples, chunksize))
+        if pbar:
+            from tqdm import tqdm
+
+            done = tqdm(
+                done,
+                total=-(-n_samples // chunksize),
+                desc=f"Applying {operator} reference",
+            )
+        for _ in done:
+            pass
+    if isinstance(out, np.memmap):
+        out.flush()
+    seconds = time.perf_counter() - t0
+    duration = n_samples / recording.sampling_rate
+    stats = {
+        "n_samples": n_samples,
+        "n_channels": n_channels,
+        "seconds": seconds,
+        "realtime": duration / seconds if seconds > 0 else float("inf"),
+    }
+    logger.info(
+        f"Referenced {duration:.1f} s in {seconds:.1f} s ({stats['realtime']:.1f}x realtime)"
+    )
+    return stats
@@ -0,0 +1,224 @@
+from fractions import Fraction
+from math import ceil, gcd
+
+import numpy as np
+import scipy.signal
+
+
+class Resampler:
+    """Streaming polyphase resampler by a rational factor up/down
+
+    Uses the same anti-aliasing FIR filter as scipy.signal.resample_poly and
+    produces the same output when fed a signal in arbitrary blocks: the input
+    samples still needed by the filter are carried over between calls.
+    All channels of a block are filtered at once.
+
+    Parameters
+    ----------
+    up, down: int
+        Upsampling and downsampling factors
+    window: str, tuple or array_like, optional, default: ('kaiser', 5.0)
+        Window used to design the FIR filter, or the filter coefficients themselves
+    dtype: np.dtype, optional, default: np.float32
+        dtype of the output
+
+    Examples
+    --------
+    resampler = Resampler(1, 30)
+    for chunk in recording.iter_chunks(size=300000):
+        lfp = resampler(chunk.traces)
+    lfp = resampler(np.empty((0, recording.n_channels)), final=True)
+    """
+
+    def __init__(self, up, down, window=("kaiser", 5.0), dtype=np.float32):
+        g = gcd(int(up), int(down))
+        self.up, self.down = int(up) // g, int(down) // g
+        if self.up == self.down:
+            # same rate: pass-through (firwin needs a cutoff below 1)
+            h = np.ones(1)
+            half_len = 0
+        elif isinstance(window, (str, tuple)):
+            max_rate = max(self.up, self.down)
+            half_len = 10 * max_rate
+            h = scipy.signal.firwin(2 * half_len + 1, 1.0 / max_rate, window=window)
+        else:
+            h = np.asarray(window, dtype=float)
+            half_len = (h.size - 1) // 2
+        self.filter = h * self.up
+        self.half_len = half_len
+        self.dtype = dtype
+        # first input sample of the block passed to upfirdn must satisfy
+        # n * up = half_len (mod down) for its outputs to land on the output grid
+        self._phase = (half_len * pow(self.up, -1, self.down)) % self.down if self.down > 1 else 0
+        self.reset()
+
+    @classmethod
+    def from_rates(cls, sampling_rate, new_sampling_rate, max_denominator=1000, **kwargs):
+        """Create a Resampler converting sampling_rate to new_sampling_rate (in Hz)"""
+        ratio = Fraction(new_sampling_rate / sampling_rate).limit_denominator(max_denominator)
+        return cls(ratio.numerator, ratio.denominator, **kwargs)
+
+    def __str__(self):
+        return f"Resampler - up: {self.up}; down: {self.down}; taps: {self.filter.size}"
+
+    def reset(self):
+        """Forget any carried state to start a new signal"""
+        self._buffer = None
+        self._buffer_start = 0
+        self._n_in = 0
+        self._n_out = 0
+
+    def n_out(self, n_in):
+        """Number of output samples for a signal of n_in samples"""
+        return ceil(n_in * self.up / self.down)
+
+    def input_index(self, output_index):
+        """Fractional input sample index corresponding to an output sample index"""
+        return np.asarray(output_index) * self.down / self.up
+
+    def _first_input(self, m):
+        """First input sample needed to compute output sample m"""
+        return -(-(m * self.down + self.half_len - (self.filter.size - 1)) // self.up)
+
+    def __call__(self, x, final=False):
+        """Resample the next block of a signal
+
+        Parameters
+        ----------
+        x: array_like
+            (n_samples,) or (n_samples, n_channels) block following the previous one
+        final: bool, optional, default: False
+            If True, the signal ends with this block and the remaining output
+            (computed assuming zeros after the end, as resample_poly does) is flushed
+
+        Returns
+        -------
+        y: np.ndarray
+            Output samples that are fully determined by the input seen so far
+        """
+        x = np.asarray(x)
+        if self._buffer is None:
+            self._buffer = x[:0]
+        self._buffer = np.concatenate([self._buffer, x], axis=0)
+        self._n_in += x.shape[0]
+
+        m0 = self._n_out
+        if final:
+            m1 = self.n_out(self._n_in)
+        else:
+            m1 = max(m0, -(-(self._n_in * self.up - self.half_len) // self.down))
+        if m1 <= m0:
+            return np.empty((0,) + x.shape[1:], dtype=self.dtype)
+
+        n_lo = self._first_input(m0)
+        n_start = n_lo - ((n_lo - self._phase) % self.down)
+        n_stop = (
+            (m1 - 1) * self.down + self.half_len
+        ) // self.up + 1  # one past the last input needed
+        block = self._get_input(n_start, n_stop)
+        y = scipy.signal.upfirdn(self.filter, block, self.up, self.down, axis=0)
+        offset = m0 + (self.half_len - n_start * self.up) // self.down
+        y = y[offset : offset + (m1 - m0)].astype(self.dtype, copy=False)
+
+        self._n_out = m1
+        # drop input samples that are no longer needed
+        keep_from = max(min(self._first_input(m1), self._n_in), self._buffer_start)
+        self._buffer = self._buffer[keep_from - self._buffer_start :]
+        self._buffer_start = keep_from
+        if final:
+            self.reset()
+        return y
+
+    def _get_input(self, start, stop):
+        """Input samples start:stop, zero padded outside of the signal"""
+        shape = (stop - start,) + self._buffer.shape[1:]
+        if start >= self._buffer_start and stop <= self._n_in:
+            return self._buffer[start - self._buffer_start : stop - self._buffer_start]
+        block = np.zeros(shape, dtype=self._buffer.dtype)
+        lo, hi = max(start, self._buffer_start), min(stop, self._n_in)
+        if hi > lo:
+            block[lo - start : hi - start] = self._buffer[
+                lo - self._buffer_start : hi - self._buffer_start
+            ]
+        return block
+
+
+def resample_recording(
+    recording, sampling_rate, chunksize=1e6, channels=None, dtype=np.float32, **kwargs
+):
+    """Resample a Recording block by block
+
+    Parameters
+    ----------
+    recording: simianpy.io.Recording
+    sampling_rate: float
+        New sampling rate in Hz
+    chunksize: int, optional, default: 1e6
+        Number of input samples read per block
+    channels: list or None, optional, default: None
+        Subset of channels
+    dtype: np.dtype, optional, default: np.float32
+    **kwargs
+        passed to Resampler
+
+    Yields
+    ------
+    times: np.ndarray
+        Time (in s) of each output sample, interpolated from the recording's time base
+    traces: np.ndarray
+        (n_samples, n_channels) resampled traces
+    """
+    resampler = Resampler.from_rates(recording.sampling_rate, sampling_rate, dtype=dtype, **kwargs)
+    n_in = recording.n_samples
+    m0 = 0
+    for chunk in recording.iter_chunks(chunksize, channels=channels):
+        traces = resampler(chunk.traces, final=chunk.stop == n_in)
+        if traces.shape[0] == 0:
+            continue
+        m1 = m0 + traces.shape[0]
+        yield _interpolate_times(recording, resampler.input_index(np.arange(m0, m1))), traces
+        m0 = m1
+
+
+def resample(recording, sampling_rate, chunksize=1e6, channels=None, dtype=np.float32, **kwargs):
+    """Resample a whole Recording into preallocated arrays
+
+    See resample_recording for parameters
+
+    Returns
+    -------
+    times: np.ndarray
+    traces: np.ndarray
+    """
+    resampler = Resampler.from_rates(recording.sampling_rate, sampling_rate, **kwargs)
+    n_out = resampler.n_out(recording.n_samples)
+    n_channels = recording.n_channels if channels is None else len(channels)
+    times = np.empty(n_out, dtype=np.float64)
+    traces = np.empty((n_out, n_channels), dtype=dtype)
+    m0 = 0
+    for block_times, block in resample_recording(
+        recording, sampling_rate, chunksize=chunksize, channels=channels, dtype=dtype, **kwargs
+    ):
+        m1 = m0 + block.shape[0]
+        times[m0:m1] = block_times
+        traces[m0:m1] = block
+        m0 = m1
+    return times, traces
+
+
+def _interpolate_times(recording, index):
+    """Time at fractional sample indices, read from only the samples needed"""
+    if index.size == 0:
+        return np.empty(0)
+    lo = int(np.floor(index[0]))
+    hi = min(int(np.floor(index[-1])) + 2, recording.n_samples)
+    lo = min(lo, hi - 1)
+    times = recording.get_times(lo, hi)
+    idx = np.minimum(index - lo, times.size - 1)
+    if times.size == 1:
+        return np.full(index.size, times[0]) + (index - lo) / recording.sampling_rate
+    # extrapolate past the last sample with the nominal sampling rate
+    result = np.interp(idx, np.arange(times.size), times)
+    beyond = index - lo > times.size - 1
+    result[beyond] = times[-1] + (index[beyond] - lo - (times.size - 1)) / recording.sampling_rate
+    return result
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from simianpy.analysis.spiketrain import SpikeTrainSet
+from simianpy.analysis.spiketrain.bursting import detect_bursts, poisson_surprise_burst_detection
+
+
+def _bursty_train(rng, n_spikes):
+    spikes = np.cumsum(rng.exponential(0.1, n_spikes))
+    centers = rng.choice(spikes, max(1, n_spikes // 40))
+    bursts = centers[:, np.newaxis] + np.cumsum(rng.exponential(0.003, (centers.size, 6)), axis=1)
+    return np.sort(np.r_[spikes, bursts.ravel()])
+
+
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+def test_block_burst_detection_is_identical_to_loop():
+    rng = np.random.default_rng(0)
+    n_bursts = 0
+    for trial in range(40):
+        spike_train = _bursty_train(rng, int(rng.integers(2, 400)))
+        if trial % 5 == 0:
+            spike_train[3:5] = spike_train[3]
+        kwargs = dict(minimum_burst_spikes=int(rng.integers(2, 6)), criterion=float(rng.choice([0.01, 0.05, 0.5])))
+        expected = poisson_surprise_burst_detection(spike_train, method="loop", **kwargs)
+        assert poisson_surprise_burst_detection(spike_train, **kwargs) == expected
+        n_bursts += len(expected)
+    assert n_bursts > 0
+
+
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+def test_detect_bursts_table():
+    rng = np.random.default_rng(1)
+    spikes = _bursty_train(rng, 4000)
+    units = rng.integers(0, 3, spikes.size)
+    events = np.sort(rng.uniform(1, spikes[-1] - 2, 30))
+    sts = SpikeTrainSet.from_arrays(spikes, events, (-0.5, 1.0), units)
+
+    bursts = detect_bursts(sts, n_jobs=1)
+    assert list(bursts.columns) == ["unitid", "trialid", "onset", "offset", "surprise"]
+    for (unit, trial), table in bursts.groupby(["unitid", "trialid"]):
+        in_train = (sts.unitids == unit) & (sts.trialids == trial)
+        expected = poisson_surprise_burst_detection(sts.spike_times[in_train], sts.window)
+        np.testing.assert_array_equal(table["onset"], [burst["onset"] for burst in expected])
+        np.testing.assert_array_equal(table["surprise"], [burst["surprise"] for burst in expected])
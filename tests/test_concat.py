@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+import pytest
+from click.testing import CliRunner
+
+from simianpy.scripts.util.concat import concat
+
+
+def _save(path, array, version):
+    with open(path, "wb") as f:
+        np.lib.format.write_array(f, array, version=version)
+
+
+@pytest.mark.parametrize("version", [(1, 0), (2, 0), (3, 0)])
+@pytest.mark.parametrize("order", ["C", "F"])
+@pytest.mark.parametrize("axis", [0, 1])
+def test_concat_npy_matches_np_concatenate(tmp_path, monkeypatch, version, order, axis):
+    rng = np.random.default_rng(0)
+    shapes = [(50, 7), (30, 7), (1, 7)] if axis == 0 else [(50, 7), (50, 3), (50, 1)]
+    arrays = [np.asarray(rng.integers(-1000, 1000, shape, dtype=np.int16), order=order) for shape in shapes]
+    files = [tmp_path / f"{idx}.npy" for idx in range(len(arrays))]
+    for file, array in zip(files, arrays):
+        _save(file, array, version)
+
+    # along the slowest-varying axis in memory the copy is done in the kernel
+    calls = []
+    if hasattr(os, "copy_file_range"):
+        copy_file_range = os.copy_file_range
+
+        def counting_copy_file_range(*args):
+            calls.append(args)
+            return copy_file_range(*args)
+
+        monkeypatch.setattr(os, "copy_file_range", counting_copy_file_range)
+
+    result = CliRunner().invoke(
+        concat,
+        [*map(str, files), "-o", str(tmp_path / "out.npy"), "-t", "npy", "-a", str(axis), "-c", "64"],
+    )
+    assert result.exit_code == 0, result.output
+
+    expected = np.concatenate(arrays, axis=axis)
+    output = np.load(tmp_path / "out.npy")
+    np.testing.assert_array_equal(output, expected)
+    assert output.flags["F_CONTIGUOUS"] == (order == "F")
+    if hasattr(os, "copy_file_range"):
+        kernel_copy = (order == "C") == (axis == 0)
+        assert bool(calls) == kernel_copy
+        if kernel_copy:
+            # in blocks of at most chunksize bytes
+            assert max(call[2] for call in calls) == 64
+            assert sum(call[2] for call in calls) == expected.nbytes
+
+
+@pytest.mark.parametrize("axis", [0, 1])
+def test_concat_raw_matches_np_concatenate(tmp_path, axis):
+    rng = np.random.default_rng(1)
+    arrays = [rng.integers(-1000, 1000, (100, 4), dtype=np.int16) for _ in range(2)]
+    if axis == 1:
+        arrays[1] = arrays[1][:, :3].copy()
+    files = [tmp_path / f"{idx}.bin" for idx in range(len(arrays))]
+    for file, array in zip(files, arrays):
+        array.tofile(file)
+    n_channels = [option for array in arrays for option in ("--n-channels", str(array.shape[1]))]
+
+    result = CliRunner().invoke(
+        concat, [*map(str, files), "-o", str(tmp_path / "out.bin"), "-a", str(axis), "-c", "100", *n_channels]
+    )
+    assert result.exit_code == 0, result.output
+
+    expected = np.concatenate(arrays, axis=axis)
+    np.testing.assert_array_equal(
+        np.fromfile(tmp_path / "out.bin", dtype=np.int16).reshape(expected.shape), expected
+    )
@@ -0,0 +1,79 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from simianpy.analysis.gaze import GazeData
+
+
+@pytest.mark.parametrize(
+    "module", ["simianpy.analysis.gaze", "simianpy.analysis.gaze.gazedata", "simianpy.analysis.gaze.trialgazedata"]
+)
+def test_gaze_modules_import_on_their_own(module):
+    # a fresh interpreter, so that no other module has already imported the package
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(Path(__file__).parents[1]), env.get("PYTHONPATH")]))
+    subprocess.run([sys.executable, "-c", f"import {module}"], env=env, check=True)
+
+
+def _trials(n_trials=4, n_samples=30000):
+    """Trials as yielded by mlread.load, long enough for the buffers to grow"""
+    rng = np.random.default_rng(0)
+    for idx in range(n_trials):
+        yield {
+            "trialid": idx + 1,
+            "start_time": 100000.0 * idx,
+            "eye": rng.standard_normal((2, n_samples + idx)),
+            "markers": np.array([9, 20, 40, 20, 18]),
+            "timestamps": np.array([0.0, 50.5, 300.0, 400.0, n_samples - 1.0]),
+        }
+
+
+@pytest.fixture
+def stub_load(monkeypatch):
+    import simianpy.io.monkeylogic.mlread as mlread
+
+    calls = []
+
+    def load(filepath, **kwargs):
+        calls.append((filepath, kwargs))
+        return _trials()
+
+    monkeypatch.setattr(mlread, "load", load)
+    return calls
+
+
+def test_from_monkeylogic_start_time(stub_load):
+    gaze = GazeData.from_monkeylogic("session.bhv2", pbar=False)
+
+    assert stub_load == [(Path("session.bhv2"), {"include_user_vars": False, "pbar": False})]
+    trials = list(_trials())
+    assert gaze.data.dtype == np.float32 and gaze.data.time.dtype == np.float64
+    assert gaze.data.shape == (sum(trial["eye"].shape[1] for trial in trials), 2)
+    np.testing.assert_array_equal(gaze.data.dimension, ["eyeh", "eyev"])
+    for trial in trials:
+        in_trial = gaze.data.trialid.values == trial["trialid"]
+        n_samples = trial["eye"].shape[1]
+        np.testing.assert_allclose(
+            gaze.data.time.values[in_trial], (trial["start_time"] + np.arange(n_samples)) / 1000
+        )
+        np.testing.assert_array_equal(gaze.data.values[in_trial], trial["eye"].T.astype(np.float32))
+
+
+def test_from_monkeylogic_align_event_and_filter(stub_load):
+    gaze = GazeData.from_monkeylogic("session.bhv2", align_event=20, trial_filter=lambda trial: trial["trialid"] % 2 == 0)
+
+    assert stub_load[0][1]["pbar"] is True
+    trials = [trial for trial in _trials() if trial["trialid"] % 2 == 0]
+    np.testing.assert_array_equal(np.unique(gaze.data.trialid), [2, 4])
+    assert gaze.data.shape[0] == sum(trial["eye"].shape[1] for trial in trials)
+    for trial in trials:
+        in_trial = gaze.data.trialid.values == trial["trialid"]
+        # relative to the first occurrence of the marker
+        np.testing.assert_allclose(
+            gaze.data.time.values[in_trial], (np.arange(trial["eye"].shape[1]) - 50.5) / 1000
+        )
+        np.testing.assert_array_equal(gaze.data.values[in_trial], trial["eye"].T.astype(np.float32))
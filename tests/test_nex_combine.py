@@ -0,0 +1,40 @@
+import numpy as np
+
+from simianpy.io.nex import combine
+from simianpy.io.nex.nexfile import NexWriter, Reader
+
+
+def _write(path, frequency, offset):
+    writer = NexWriter(frequency, useNumpy=True)
+    writer.AddNeuron("neuron", np.array([0.1, 0.5, 1.0]) + offset, wire=1, unit=2)
+    writer.AddContVarWithSingleFragment(
+        "lfp", 0.5 + offset, 1000.0, np.sin(np.arange(500) / 10.0)
+    )
+    writer.AddMarker("marker", np.array([0.3, 0.4]) + offset, np.array(["f"]), [[1, 2]])
+    writer.WriteNex5File(path)
+
+
+def test_combine_copies_variables_and_converts_timestamps(tmp_path):
+    _write(tmp_path / "a.nex5", 40000, 0)
+    _write(tmp_path / "b.nex5", 20000, 2)
+
+    combine([tmp_path / "a.nex5", tmp_path / "b.nex5"], tmp_path / "out.nex5")
+
+    reader = Reader(useNumpy=True)
+    inputs = [
+        var
+        for name in ["a.nex5", "b.nex5"]
+        for var in Reader(useNumpy=True).ReadNexFile(str(tmp_path / name))["Variables"]
+    ]
+    output = reader.ReadNexFile(str(tmp_path / "out.nex5"))
+    assert output["FileHeader"]["Frequency"] == 40000
+    assert len(output["Variables"]) == len(inputs)
+    for expected, actual in zip(inputs, output["Variables"]):
+        np.testing.assert_allclose(actual["Timestamps"], expected["Timestamps"])
+        if "ContinuousValues" in expected:
+            # values are copied as stored, without rescaling
+            np.testing.assert_array_equal(
+                actual["ContinuousValues"], expected["ContinuousValues"]
+            )
+        if "Markers" in expected:
+            assert actual["Markers"] == expected["Markers"]
@@ -0,0 +1,204 @@
+import json
+import logging
+
+import numpy as np
+import pytest
+
+from simianpy.io import OpenEphysBinary
+from simianpy.io.nex.nexfile import Reader
+from simianpy.io.openephys.batch import ConversionManifest, batch_to_nex
+from simianpy.io.openephys.openephys import CONTINUOUS_DTYPE, NUM_HEADER_BYTES, SAMPLES_PER_RECORD
+
+
+def _write_binary_recording(path, n_samples=1000, n_channels=3, sampling_rate=1000.0, legacy=False):
+    """Synthetic recording: one continuous stream, TTL events in the current
+    (states.npy) and legacy (channel_states.npy) layouts, and a message folder"""
+    rng = np.random.default_rng(0)
+    raw = rng.integers(-1000, 1000, (n_samples, n_channels), dtype=np.int16)
+    bit_volts = [0.195, 0.5, 2.0][:n_channels]
+    structure = {
+        "continuous": [
+            {
+                "folder_name": "Acq-100.ProbeA/",
+                "stream_name": "ProbeA",
+                "sample_rate": sampling_rate,
+                "num_channels": n_channels,
+                "channels": [
+                    {"channel_name": f"CH{idx + 1}", "bit_volts": bit_volts[idx]}
+                    for idx in range(n_channels)
+                ],
+            }
+        ],
+        "events": [
+            {"folder_name": "Acq-100.ProbeA/TTL/", "stream_name": "ProbeA", "sample_rate": sampling_rate},
+            {"folder_name": "Legacy-101/TTL_1/", "sample_rate": sampling_rate},
+            {"folder_name": "MessageCenter/", "stream_name": "MessageCenter", "sample_rate": sampling_rate},
+        ],
+    }
+    (path / "structure.oebin").write_text(json.dumps(structure))
+
+    continuous = path / "continuous" / "Acq-100.ProbeA"
+    continuous.mkdir(parents=True)
+    raw.tofile(continuous / "continuous.dat")
+    sample_numbers = np.arange(n_samples, dtype=np.int64) + 5000
+    if legacy:
+        # GUI < 0.6: timestamps.npy holds the sample numbers
+        np.save(continuous / "timestamps.npy", sample_numbers)
+    else:
+        np.save(continuous / "sample_numbers.npy", sample_numbers)
+        np.save(continuous / "timestamps.npy", sample_numbers / sampling_rate)
+
+    ttl = path / "events" / "Acq-100.ProbeA" / "TTL"
+    ttl.mkdir(parents=True)
+    np.save(ttl / "states.npy", np.array([1, -1, 2, -2], dtype=np.int16))
+    np.save(ttl / "sample_numbers.npy", np.array([5100, 5200, 5150, 5300], dtype=np.int64))
+    np.save(ttl / "timestamps.npy", np.array([5100, 5200, 5150, 5300]) / sampling_rate)
+    np.save(ttl / "full_words.npy", np.array([1, 0, 2, 0], dtype=np.uint64))
+
+    legacy = path / "events" / "Legacy-101" / "TTL_1"
+    legacy.mkdir(parents=True)
+    np.save(legacy / "channel_states.npy", np.array([3, -3], dtype=np.int16))
+    np.save(legacy / "timestamps.npy", np.array([5120, 5250], dtype=np.int64))
+
+    (path / "events" / "MessageCenter").mkdir(parents=True)
+    return raw, np.array(bit_volts, dtype=np.float32), sample_numbers / sampling_rate
+
+
+def test_binary_stream_scales_only_accessed_samples(tmp_path):
+    raw, bit_volts, timestamps = _write_binary_recording(tmp_path)
+
+    with OpenEphysBinary(tmp_path) as oe:
+        stream = oe.streams["ProbeA"]
+        assert stream.n_samples == 1000 and stream.n_channels == 3
+        assert isinstance(stream.raw, np.memmap)
+        np.testing.assert_array_equal(stream.raw, raw)
+
+        scaled = stream.get_traces(100, 200, channels=["CH3", 0])
+        assert scaled.dtype == np.float32
+        np.testing.assert_allclose(scaled, raw[100:200, [2, 0]] * bit_volts[[2, 0]], rtol=1e-6)
+        np.testing.assert_array_equal(stream.get_traces(100, 200, scaled=False), raw[100:200])
+        np.testing.assert_allclose(stream["CH2"][10:20], raw[10:20, 1] * bit_volts[1], rtol=1e-6)
+        np.testing.assert_array_equal(stream.get_times(10, 20), timestamps[10:20])
+
+        recording = oe.get_recording()
+        chunks = list(recording.iter_chunks(size=300, overlap=5))
+        assert [(chunk.start, chunk.stop) for chunk in chunks] == [(0, 300), (300, 600), (600, 900), (900, 1000)]
+        np.testing.assert_allclose(
+            np.concatenate([chunk.valid for chunk in chunks]), raw * bit_volts, rtol=1e-6
+        )
+        np.testing.assert_array_equal(stream.get_raw_recording().get_traces(0, 10), raw[:10])
+
+        continuous = oe.get_continuous_data("ProbeA", keys=["CH1"], start=0, stop=5)
+        np.testing.assert_array_equal(continuous.index, timestamps[:5])
+        np.testing.assert_allclose(continuous["CH1"], raw[:5, 0] * bit_volts[0], rtol=1e-6)
+
+
+def test_binary_stream_legacy_times_are_computed_where_accessed(tmp_path):
+    raw, bit_volts, timestamps = _write_binary_recording(tmp_path, legacy=True)
+
+    with OpenEphysBinary(tmp_path) as oe:
+        stream = oe.streams["ProbeA"]
+        assert isinstance(stream.sample_numbers, np.memmap)
+        assert not isinstance(stream.timestamps, np.ndarray)
+        np.testing.assert_array_equal(stream.get_times(10, 20), timestamps[10:20])
+        np.testing.assert_array_equal(stream.get_raw_recording().get_times(990, None), timestamps[990:])
+        np.testing.assert_array_equal(np.asarray(stream.time_base), timestamps)
+        continuous = oe.get_continuous_data("ProbeA", start=3, stop=6)
+        np.testing.assert_array_equal(continuous.index, timestamps[3:6])
+
+
+def test_binary_event_table(tmp_path):
+    _write_binary_recording(tmp_path)
+
+    with OpenEphysBinary(tmp_path, time_units="ms") as oe:
+        events = oe.get_event_data()
+        assert list(events.columns) == ["stream", "sample_number", "line", "state", "full_word"]
+        # both TTL folders merged in time order; the message folder is skipped
+        np.testing.assert_allclose(events.index, [5100, 5120, 5150, 5200, 5250, 5300])
+        assert list(events["stream"]) == ["ProbeA", "Legacy-101/TTL_1", "ProbeA", "ProbeA", "Legacy-101/TTL_1", "ProbeA"]
+        assert list(events["line"]) == [1, 3, 2, 1, 3, 2]
+        assert list(events["state"]) == [1, 1, 1, 0, 0, 0]
+        assert list(events["full_word"]) == [1, 0, 2, 0, 0, 0]
+
+        probe = oe.get_event_data("ProbeA")
+        assert list(probe["sample_number"]) == [5100, 5150, 5200, 5300]
+        assert oe.get_event_data("nothing").empty
+
+
+def _write_continuous(path, samples, sampling_rate=1000, bit_volts=0.5):
+    """Legacy '.continuous' file: a 1024 byte text header and records of 1024 samples"""
+    header = (
+        f"header.format = 'Open Ephys Data Format';\nheader.version = 0.4;\n"
+        f"header.date_created = '01-Jan-2020 120000';\nheader.sampleRate = {sampling_rate};\n"
+        f"header.blockLength = {SAMPLES_PER_RECORD};\nheader.bitVolts = {bit_volts};\n"
+    ).encode()
+    records = np.zeros(len(samples) // SAMPLES_PER_RECORD, dtype=CONTINUOUS_DTYPE)
+    records["timestamps"] = np.arange(records.size) * SAMPLES_PER_RECORD
+    records["N"] = SAMPLES_PER_RECORD
+    records["data"] = samples.reshape(records.size, SAMPLES_PER_RECORD)
+    records["marker"] = np.arange(10)
+    with open(path, "wb") as f:
+        f.write(header.ljust(NUM_HEADER_BYTES))
+        f.write(records.tobytes())
+
+
+def test_batch_to_nex_resumes_from_manifest(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    sessions = {}
+    for name in ["session1", "session2"]:
+        (tmp_path / name).mkdir()
+        sessions[name] = rng.integers(-1000, 1000, 2 * SAMPLES_PER_RECORD).astype(np.int16)
+        _write_continuous(tmp_path / name / "100_CH1.continuous", sessions[name])
+    # the recipe's file is missing from this session
+    (tmp_path / "broken").mkdir()
+    recipe = [{"file": "100_CH1.continuous", "type": "continuous", "name": "CH1"}]
+    paths = [tmp_path / name for name in ["session1", "broken", "session2"]]
+    output_dir = tmp_path / "nex"
+    logger = logging.getLogger(__name__)
+
+    manifest = batch_to_nex(paths, recipe, output_dir=output_dir, timestampFrequency=1000, n_jobs=2, logger=logger)
+
+    assert manifest.summary() == {"done": 2, "failed": 1}
+    assert manifest.path == output_dir / "manifest.json"
+    failed = manifest[tmp_path / "broken"]
+    assert failed["status"] == "failed" and failed["attempts"] == 1
+    assert failed["error"].startswith("FileNotFoundError")
+    for name, samples in sessions.items():
+        entry = manifest[tmp_path / name]
+        assert entry["status"] == "done" and entry["output"] == str(output_dir / f"{name}.nex5")
+        (variable,) = Reader(useNumpy=True).ReadNexFile(entry["output"])["Variables"]
+        assert variable["Header"]["Name"] == "CH1"
+        np.testing.assert_allclose(variable["ContinuousValues"], samples * 0.5, atol=1e-2)
+    assert sorted(path.name for path in output_dir.iterdir()) == ["manifest.json", "session1.nex5", "session2.nex5"]
+
+    # finished sessions are skipped, the failed one is retried
+    mtimes = {name: (output_dir / f"{name}.nex5").stat().st_mtime_ns for name in sessions}
+    manifest = batch_to_nex(paths, recipe, output_dir=output_dir, timestampFrequency=1000, n_jobs=2, logger=logger)
+    assert manifest[tmp_path / "broken"]["attempts"] == 2
+    for name in sessions:
+        assert manifest[tmp_path / name]["attempts"] == 1
+        assert (output_dir / f"{name}.nex5").stat().st_mtime_ns == mtimes[name]
+
+    # unless failures are not retried; the manifest is read back from disk and
+    # sessions given by relative paths match their entries
+    monkeypatch.chdir(tmp_path)
+    relative = [path.relative_to(tmp_path) for path in paths]
+    batch_to_nex(relative, recipe, output_dir="nex", timestampFrequency=1000, retry_failed=False, logger=logger)
+    manifest = ConversionManifest(output_dir / "manifest.json")
+    assert len(manifest.sessions) == 3 and "broken" in manifest
+    assert manifest[tmp_path / "broken"]["attempts"] == 2
+    assert manifest.summary() == {"done": 2, "failed": 1}
+
+
+def test_to_nex_failure_leaves_no_file(tmp_path):
+    from simianpy.io import OpenEphys
+
+    (tmp_path / "session").mkdir()
+    _write_continuous(tmp_path / "session" / "100_CH1.continuous", np.zeros(SAMPLES_PER_RECORD, dtype=np.int16))
+    recipe = [{"file": "100_CH1.continuous", "type": "continuous", "name": "CH1"}]
+
+    with OpenEphys(tmp_path / "session", recipe=recipe, logger=logging.getLogger(__name__)) as oe:
+        with pytest.raises(KeyError):
+            # the second variable was never loaded
+            oe.to_nex(tmp_path / "out.nex5", 1000, recipe=recipe + [{"type": "events", "name": "TTL/ttl"}])
+    assert not (tmp_path / "out.nex5").exists()
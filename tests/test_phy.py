@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from simianpy.io import Phy
+
+
+def _write_phy(path, n_spikes=1000):
+    """Synthetic sorter output: uint64 (n, 1) spike times as written by
+    Kilosort, curated clusters and their labels"""
+    rng = np.random.default_rng(0)
+    spike_times = np.sort(rng.integers(0, 300000, n_spikes)).astype(np.uint64)
+    spike_clusters = rng.choice([0, 2, 3, 7, 12], n_spikes).astype(np.int32)
+    np.save(path / "spike_times.npy", spike_times[:, np.newaxis])
+    np.save(path / "spike_clusters.npy", spike_clusters)
+    (path / "cluster_group.tsv").write_text(
+        "cluster_id\tgroup\n0\tgood\n2\tmua\n3\tnoise\n7\tgood\n12\tmua\n"
+    )
+    (path / "params.py").write_text(
+        "dat_path = 'continuous.dat'\nn_channels_dat = 32\ndtype = 'int16'\n"
+        "offset = 0\nsample_rate = 30000.\nhp_filtered = False\n"
+    )
+    return spike_times, spike_clusters
+
+
+@pytest.mark.parametrize("chunksize", [1, 97, 1000, 5000])
+def test_spike_indices_across_chunks(tmp_path, chunksize):
+    _, spike_clusters = _write_phy(tmp_path)
+
+    with Phy(tmp_path, chunksize=chunksize) as phy:
+        assert phy.params["n_channels_dat"] == 32 and phy.params["dat_path"] == "continuous.dat"
+        for clusters in [[7], [0, 12], [3, 99], [-1], []]:
+            np.testing.assert_array_equal(
+                phy.get_spike_indices(clusters), np.flatnonzero(np.isin(spike_clusters, clusters))
+            )
+
+
+def test_spike_data_filters_groups(tmp_path):
+    spike_times, spike_clusters = _write_phy(tmp_path)
+
+    with Phy(tmp_path, chunksize=100) as phy:
+        assert phy.sampling_rate == 30000.0
+        np.testing.assert_array_equal(phy.get_clusters(), [0, 7])
+        np.testing.assert_array_equal(phy.get_clusters(["mua", "noise"]), [2, 3, 12])
+        np.testing.assert_array_equal(phy.get_clusters(None), [0, 2, 3, 7, 12])
+
+        times, labels = phy.get_spike_data()
+        good = np.isin(spike_clusters, [0, 7])
+        np.testing.assert_array_equal(labels, spike_clusters[good])
+        np.testing.assert_allclose(times, spike_times[good] / 30000.0)
+
+        times, labels = phy.get_spike_data(groups="mua", clusters=[3])
+        np.testing.assert_array_equal(labels, spike_clusters[spike_clusters == 3])
+
+        clock = 10 + np.arange(300000) / 30000.0
+        times, _ = phy.get_spike_data(timestamps=clock)
+        np.testing.assert_allclose(times, 10 + spike_times[good] / 30000.0)
+
+    with Phy(tmp_path, sampling_rate=20000) as phy:
+        times, _ = phy.get_spike_data(clusters=[2])
+        np.testing.assert_allclose(times, spike_times[spike_clusters == 2] / 20000.0)
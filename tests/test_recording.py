@@ -0,0 +1,183 @@
+import numpy as np
+
+import pytest
+
+from simianpy.io import (
+    ArrayRecording,
+    ChannelListRecording,
+    export_binary,
+    load_raw,
+    load_raw_recording,
+    recording_to_nex,
+)
+from simianpy.io.nex.nexfile import Reader
+
+
+def test_iter_chunks_covers_recording_with_overlap():
+    data = np.arange(1000 * 4, dtype=np.int16).reshape(1000, 4)
+    recording = ArrayRecording(data, sampling_rate=1000.0)
+
+    chunks = list(recording.iter_chunks(size=300, overlap=10))
+
+    assert [(chunk.start, chunk.stop) for chunk in chunks] == [
+        (0, 300),
+        (300, 600),
+        (600, 900),
+        (900, 1000),
+    ]
+    assert chunks[0].left == 0 and chunks[0].right == 10
+    assert chunks[-1].left == 10 and chunks[-1].right == 0
+    np.testing.assert_array_equal(
+        np.concatenate([chunk.valid for chunk in chunks]), data
+    )
+
+
+def test_channel_list_matches_array_recording():
+    rng = np.random.default_rng(0)
+    data = rng.standard_normal((500, 3))
+    array_recording = ArrayRecording(data, 30000.0, channel_names=["a", "b", "c"])
+    list_recording = ChannelListRecording(
+        list(data.T), 30000.0, channel_names=["a", "b", "c"]
+    )
+
+    for recording in [array_recording, list_recording]:
+        assert recording.n_samples == 500
+        assert recording.n_channels == 3
+        np.testing.assert_array_equal(
+            recording.get_traces(10, 20, channels=["c", "a"]), data[10:20, [2, 0]]
+        )
+        np.testing.assert_allclose(recording.get_times(0, 3), [0, 1 / 30000, 2 / 30000])
+
+
+def test_load_raw_recording(tmp_path):
+    data = np.arange(200 * 8, dtype=np.int16).reshape(200, 8)
+    path = tmp_path / "data.dat"
+    data.tofile(path)
+
+    recording = load_raw_recording(path, n_channels=8, sampling_rate=1000.0)
+
+    assert recording.n_samples == 200
+    np.testing.assert_array_equal(recording.get_traces(5, 7, [1, 3]), data[5:7, [1, 3]])
+
+
+def test_export_binary_applies_channel_map(tmp_path):
+    data = np.arange(1000 * 5, dtype=np.int16).reshape(1000, 5)
+    recording = ChannelListRecording(list(data.T), 1000.0)
+    path = tmp_path / "export.dat"
+
+    stats = export_binary(
+        recording, path, channels=[4, 0, 2], chunksize=300, tile_channels=2
+    )
+
+    assert stats["bytes"] == 1000 * 3 * 2
+    np.testing.assert_array_equal(load_raw(path, (None, 3)), data[:, [4, 0, 2]])
+    with pytest.raises(ValueError):
+        export_binary(ArrayRecording(data * 0.5, 1000.0), tmp_path / "float.dat")
+
+
+def test_recording_to_nex_matches_whole_signal_decimation(tmp_path):
+    import scipy.signal
+
+    rng = np.random.default_rng(0)
+    data = (rng.standard_normal((60000, 5)) * 100).astype(np.int16)
+    recording = ArrayRecording(data, sampling_rate=30000.0)
+
+    recording_to_nex(
+        recording, tmp_path / "lfp.nex5", resample_to=1000, chunksize=7000, n_jobs=2
+    )
+
+    variables = Reader(useNumpy=True).ReadNexFile(str(tmp_path / "lfp.nex5"))["Variables"]
+    expected = scipy.signal.resample_poly(data.astype(float), 1, 30, axis=0)
+    assert len(variables) == 5
+    for idx, var in enumerate(variables):
+        assert var["Header"]["SamplingRate"] == 1000
+        np.testing.assert_allclose(
+            var["ContinuousValues"], expected[:, idx], rtol=1e-4, atol=1e-2
+        )
+
+
+@pytest.mark.parametrize("resample_to", [None, 1000])
+def test_recording_to_nex_band_pass_matches_whole_signal(tmp_path, resample_to):
+    import scipy.signal
+
+    rng = np.random.default_rng(1)
+    data = rng.standard_normal((30000, 3)).astype(np.float32)
+    recording = ArrayRecording(data, sampling_rate=30000.0, t_start=2.0)
+
+    recording_to_nex(
+        recording,
+        tmp_path / "filtered.nex5",
+        channel_names=["a", "b", "c"],
+        channels=[2, 0, 1],
+        band=(100, 3000),
+        resample_to=resample_to,
+        scale=2.0,
+        chunksize=7000,
+        n_jobs=2,
+    )
+
+    sos = scipy.signal.butter(3, [100, 3000], btype="bandpass", fs=30000.0, output="sos")
+    expected = scipy.signal.sosfiltfilt(sos, 2.0 * data[:, [2, 0, 1]].astype(float), axis=0)
+    if resample_to is not None:
+        expected = scipy.signal.resample_poly(expected, 1, 30, axis=0)
+    fileData = Reader(useNumpy=True).ReadNexFile(str(tmp_path / "filtered.nex5"))
+    assert fileData["FileHeader"]["Frequency"] == 30000
+    variables = fileData["Variables"]
+    assert [var["Header"]["Name"] for var in variables] == ["a", "b", "c"]
+    # away from the edges of the recording, blocks filtered with enough
+    # context match the whole signal filtered at once
+    inner = slice(expected.shape[0] // 10, -expected.shape[0] // 10)
+    for idx, var in enumerate(variables):
+        assert var["Header"]["SamplingRate"] == (resample_to or 30000)
+        np.testing.assert_allclose(var["Timestamps"], [2.0])
+        assert var["ContinuousValues"].size == expected.shape[0]
+        np.testing.assert_allclose(var["ContinuousValues"][inner], expected[inner, idx], atol=1e-3)
+
+
+def test_nex5_continuous_writer_round_trip(tmp_path):
+    from simianpy.io.nex.stream import Nex5ContinuousWriter
+
+    rng = np.random.default_rng(2)
+    values = rng.standard_normal((1000, 2)) * 3
+    names = ["lfp1", "lfp2"]
+    for ADtoMV, atol in [(None, 1e-6), (0.01, 0.005)]:
+        path = tmp_path / f"{ADtoMV}.nex5"
+        with Nex5ContinuousWriter(path, 30000, names, 1000, 1000.0, t_start=1.5, ADtoMV=ADtoMV) as writer:
+            # blocks in any order
+            for start in [600, 0, 300]:
+                for idx in range(2):
+                    writer.write(idx, start, values[start : start + 300 + 100 * (start == 600), idx])
+            with pytest.raises(ValueError):
+                writer.write(0, 900, values[:200, 0])
+
+        fileData = Reader(useNumpy=True).ReadNexFile(str(path))
+        for idx, var in enumerate(fileData["Variables"]):
+            assert var["Header"]["Name"] == names[idx]
+            assert var["Header"]["SamplingRate"] == 1000
+            np.testing.assert_allclose(var["Timestamps"], [1.5])
+            np.testing.assert_allclose(var["ContinuousValues"], values[:, idx], atol=atol)
+
+
+@pytest.mark.parametrize("memmap", ["--memmap", "--no-memmap"])
+def test_from_raw_script(tmp_path, memmap):
+    from click.testing import CliRunner
+
+    from simianpy.scripts.nex.from_raw import from_raw
+
+    data = np.random.default_rng(3).integers(-1000, 1000, (4, 3000), dtype=np.int16)
+    data.tofile(tmp_path / "raw.dat")
+    (tmp_path / "channels.txt").write_text("w\nx\ny\nz\n")
+
+    result = CliRunner().invoke(
+        from_raw,
+        [
+            str(tmp_path / "raw.dat"), "-s", "(4, None)", "-t", "-o", str(tmp_path / "out.nex5"),
+            "-sf", "3000", "-c", str(tmp_path / "channels.txt"), "--scale", "0.5", memmap,
+        ],
+    )
+    assert result.exit_code == 0, result.output
+
+    variables = Reader(useNumpy=True).ReadNexFile(str(tmp_path / "out.nex5"))["Variables"]
+    assert [var["Header"]["Name"] for var in variables] == ["w", "x", "y", "z"]
+    for idx, var in enumerate(variables):
+        np.testing.assert_allclose(var["ContinuousValues"], data[idx] * 0.5)
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from simianpy.io import ArrayRecording
+from simianpy.signal import approx_median, common_reference
+
+
+def test_common_reference_per_group(tmp_path):
+    rng = np.random.default_rng(0)
+    data = (rng.standard_normal((5000, 8)) * 100).astype(np.int16)
+    groups = [[0, 1, 2, 3], [4, 5, 6]]
+
+    common_reference(
+        ArrayRecording(data, 1000.0),
+        tmp_path / "cmr.npy",
+        groups=groups,
+        chunksize=700,
+        n_jobs=3,
+    )
+
+    referenced = np.load(tmp_path / "cmr.npy")
+    assert referenced.dtype == np.int16
+    for group in groups:
+        median = np.median(data[:, group], axis=1, keepdims=True)
+        np.testing.assert_array_equal(
+            referenced[:, group], np.rint(data[:, group] - median)
+        )
+    # channels outside any group are left untouched
+    np.testing.assert_array_equal(referenced[:, 7], data[:, 7])
+
+
+def test_approx_median_is_lower_median():
+    x = np.array([[4, 1, 3, 2], [5, 9, 7, 1]], dtype=np.int16)
+    np.testing.assert_array_equal(approx_median(x, axis=1), [2, 5])
+
+
+def test_load_groups_from_layer_json(tmp_path):
+    from simianpy.misc.electrode_mapping import Layer
+    from simianpy.scripts.util.cmr import load_groups
+
+    # two shanks (columns) of three channels
+    channels = [
+        {"name": name, "loc": [row, col]}
+        for col, names in enumerate([[4, 0, 2], [1, 5, 3]])
+        for row, name in enumerate(names)
+    ]
+    Layer("probe", channels).to_json(tmp_path / "probe.json")
+
+    layer = load_groups(tmp_path / "probe.json")
+    assert layer.groups() == {0: [4, 0, 2], 1: [1, 5, 3]}
+
+    data = (np.arange(600).reshape(100, 6) % 7).astype(np.int16)
+    common_reference(ArrayRecording(data, 1000.0), tmp_path / "cmr.npy", groups=layer)
+    referenced = np.load(tmp_path / "cmr.npy")
+    for group in ([4, 0, 2], [1, 5, 3]):
+        median = np.median(data[:, group], axis=1, keepdims=True)
+        np.testing.assert_array_equal(referenced[:, group], np.rint(data[:, group] - median))
+
+
+def test_layer_names_resolve_through_channel_names(tmp_path):
+    from simianpy.misc.electrode_mapping import Layer
+
+    # 1-based hardware channel numbers, stored in a shuffled column order
+    names = [3, 1, 4, 2, 6, 5]
+    layer = Layer(
+        "probe",
+        [
+            {"name": name, "loc": [row, col]}
+            for col, shank in enumerate([[1, 2, 3], [4, 5, 6]])
+            for row, name in enumerate(shank)
+        ],
+    )
+    data = (np.random.default_rng(3).standard_normal((200, 6)) * 100).astype(np.int16)
+
+    common_reference(
+        ArrayRecording(data, 1000.0, channel_names=names), tmp_path / "cmr.npy", groups=layer
+    )
+    referenced = np.load(tmp_path / "cmr.npy")
+    for shank in ([1, 2, 3], [4, 5, 6]):
+        columns = [names.index(name) for name in shank]
+        median = np.median(data[:, columns], axis=1, keepdims=True)
+        np.testing.assert_array_equal(referenced[:, columns], np.rint(data[:, columns] - median))
+
+    # a name the recording does not have is an error, not a column index
+    with pytest.raises(KeyError):
+        common_reference(
+            ArrayRecording(data, 1000.0, channel_names=names),
+            tmp_path / "cmr.npy",
+            groups=[[0, 1, 2]],
+        )
+
+
+def test_groups_are_positions_without_channel_names(tmp_path):
+    data = (np.random.default_rng(4).standard_normal((200, 4)) * 100).astype(np.int16)
+
+    common_reference(ArrayRecording(data, 1000.0), tmp_path / "cmr.npy", groups=[[1, 3]])
+    referenced = np.load(tmp_path / "cmr.npy")
+    median = np.median(data[:, [1, 3]], axis=1, keepdims=True)
+    np.testing.assert_array_equal(referenced[:, [1, 3]], np.rint(data[:, [1, 3]] - median))
+    np.testing.assert_array_equal(referenced[:, [0, 2]], data[:, [0, 2]])
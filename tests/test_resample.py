@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+import scipy.signal
+
+from simianpy.io import ArrayRecording
+from simianpy.signal.resample import Resampler, resample
+
+
+@pytest.mark.parametrize(
+    "up, down, block_sizes",
+    [(1, 30, [1000, 3, 5000]), (2, 3, [10, 50, 1]), (3, 1, [7]), (5, 7, [1]), (1, 1, [10, 50, 1]), (4, 4, [7])],
+)
+def test_streaming_matches_resample_poly(up, down, block_sizes):
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal((3001, 3))
+    expected = scipy.signal.resample_poly(x, up, down, axis=0)
+
+    resampler = Resampler(up, down, dtype=np.float64)
+    output, start, i = [], 0, 0
+    while start < x.shape[0]:
+        stop = start + block_sizes[i % len(block_sizes)]
+        output.append(resampler(x[start:stop], final=stop >= x.shape[0]))
+        start, i = stop, i + 1
+
+    np.testing.assert_allclose(np.concatenate(output), expected, atol=1e-12)
+
+
+def test_resample_recording_timestamps():
+    x = np.random.default_rng(1).standard_normal((90000, 2))
+    recording = ArrayRecording(x, sampling_rate=30000.0, t_start=5.0)
+
+    times, traces = resample(recording, 1000.0, chunksize=7777)
+
+    assert traces.shape == (3000, 2)
+    np.testing.assert_allclose(times, 5.0 + np.arange(3000) / 1000)
+    np.testing.assert_allclose(
+        traces, scipy.signal.resample_poly(x, 1, 30, axis=0), atol=1e-5
+    )
+
+
+def test_resample_to_the_same_rate_passes_through():
+    x = np.random.default_rng(2).standard_normal((5000, 2))
+    recording = ArrayRecording(x, sampling_rate=30000.0, t_start=1.0)
+
+    times, traces = resample(recording, 30000.0, chunksize=777, dtype=np.float64)
+
+    np.testing.assert_array_equal(traces, x)
+    np.testing.assert_allclose(times, recording.get_times())
+
+
+def test_chunked_resample_does_not_scale_with_recording_length():
+    from itertools import islice
+
+    from simianpy.signal.resample import resample_recording
+
+    # 10**10 samples without memory: reading the times of a chunk must not
+    # build the time base of the whole recording
+    data = np.broadcast_to(np.zeros((1, 1), dtype=np.float32), (10**10, 1))
+    recording = ArrayRecording(data, sampling_rate=30000.0, t_start=2.0)
+
+    np.testing.assert_allclose(recording.get_times(10**9, 10**9 + 3), 2.0 + (10**9 + np.arange(3)) / 30000)
+    blocks = list(islice(resample_recording(recording, 1000.0, chunksize=30000), 3))
+    times = np.concatenate([block_times for block_times, _ in blocks])
+    np.testing.assert_allclose(times, 2.0 + np.arange(times.size) / 1000)
@@ -0,0 +1,425 @@
+import numpy as np
+import pytest
+
+from simianpy.analysis.spiketrain import SpikeTrainSet
+from simianpy.misc import ragged_arange
+
+
+def _spikes_and_events(seed=0):
+    rng = np.random.default_rng(seed)
+    spikes = rng.uniform(0, 100, 5000)
+    units = rng.integers(0, 4, spikes.size)
+    events = np.sort(rng.uniform(1, 99, (40, 3)), axis=1)
+    return spikes, units, events
+
+
+def test_ragged_arange_matches_concatenated_aranges():
+    starts = np.array([3, 10, 10, 0, 7])
+    stops = np.array([6, 10, 12, 2, 5])
+    expected = np.concatenate([np.arange(l, r) for l, r in zip(starts, stops)])
+    idx = ragged_arange(starts, stops)
+    assert idx.dtype == np.int32
+    np.testing.assert_array_equal(idx, expected)
+
+
+def test_from_arrays_is_independent_of_chunking():
+    spikes, units, events = _spikes_and_events()
+    window = (-0.5, 1.0)
+    full = SpikeTrainSet.from_arrays(spikes, events, window, units)
+    chunked = SpikeTrainSet.from_arrays(
+        spikes, events, window, units, max_chunk_spikes=50
+    )
+    for attr in ["trialids", "unitids", "spike_times", "epochids"]:
+        np.testing.assert_array_equal(getattr(full, attr), getattr(chunked, attr))
+
+    trial, epoch = 7, 1
+    t = events[trial, epoch]
+    expected = np.sort(spikes[(spikes >= t - 0.5) & (spikes <= t + 1.0)] - t)
+    mask = (full.trialids == trial) & (full.epochids == epoch)
+    np.testing.assert_allclose(np.sort(full.spike_times[mask]), expected)
+
+
+def test_to_psth_matches_histogramdd():
+    spikes, units, events = _spikes_and_events()
+    sts = SpikeTrainSet.from_arrays(spikes, events, (-0.5, 1.0), units)
+    time_bins = np.arange(-0.5, 1.01, 0.05)
+
+    psth = sts.to_psth(time_bins=time_bins)
+
+    _, trial_codes = np.unique(sts.trialids, return_inverse=True)
+    _, unit_codes = np.unique(sts.unitids, return_inverse=True)
+    _, epoch_codes = np.unique(sts.epochids, return_inverse=True)
+    expected, _ = np.histogramdd(
+        np.array([trial_codes, unit_codes, epoch_codes, sts.spike_times]).T,
+        bins=[
+            np.arange(psth.sizes["trialid"] + 1),
+            np.arange(psth.sizes["unitid"] + 1),
+            np.arange(psth.sizes["epoch"] + 1),
+            time_bins,
+        ],
+    )
+    assert psth.dtype == np.int32
+    np.testing.assert_array_equal(psth.values, expected)
+
+    subset = sts.to_psth(time_bins=time_bins, units=[1, 2], dtype=np.uint16)
+    np.testing.assert_array_equal(subset.values, psth.sel(unitid=[1, 2]).values)
+
+
+def test_bincount_nd_in_slices():
+    from simianpy.analysis.spiketrain.histogram import bincount_nd
+
+    rng = np.random.default_rng(1)
+    codes = [rng.integers(0, 5, 1000), rng.integers(-1, 7, 1000)]
+    expected = bincount_nd(codes, (5, 7))
+    np.testing.assert_array_equal(bincount_nd(codes, (5, 7), max_cells=4), expected)
+    assert expected.sum() == (codes[1] >= 0).sum()
+
+
+def test_sparse_psth_matches_dense():
+    import pandas as pd
+
+    spikes, units, events = _spikes_and_events()
+    metadata = pd.DataFrame(
+        {"condition": np.tile(["a", "b"], events.shape[0] // 2)},
+        index=np.arange(events.shape[0]),
+    )
+    sts = SpikeTrainSet.from_arrays(
+        spikes, events, (-0.5, 1.0), units, trial_metadata=metadata
+    )
+    dense = sts.to_psth(time_step=0.01)
+    sparse = sts.to_psth(time_step=0.01, sparse=True)
+
+    np.testing.assert_array_equal(sparse.to_dataarray().values, dense.values)
+    np.testing.assert_array_equal(
+        sparse.sel(unitid=[2, 0], trialid=[5, 1]).to_dataarray().values,
+        dense.sel(unitid=[2, 0], trialid=[5, 1]).values,
+    )
+    np.testing.assert_allclose(
+        sparse.groupby_mean("condition").to_dataarray().values,
+        dense.groupby("condition").mean().values,
+    )
+
+
+def test_convolve_time_matches_np_convolve():
+    from simianpy.analysis.spiketrain.spiketrainset import convolve_time
+
+    rng = np.random.default_rng(2)
+    x = rng.poisson(0.1, (3, 4, 200))
+    kernel = np.exp(-np.arange(20) / 5.0)
+    kernel /= kernel.sum()
+
+    out = convolve_time(x, kernel, max_block_bytes=800 * 4)
+
+    expected = np.apply_along_axis(np.convolve, -1, x, kernel, mode="same")
+    assert out.dtype == np.float32
+    np.testing.assert_allclose(out, expected, atol=1e-6)
+
+
+def test_event_sdf_matches_binned_sdf_for_spikes_on_bin_centers():
+    spikes, units, events = _spikes_and_events()
+    sts = SpikeTrainSet.from_arrays(spikes, events, (-0.5, 1.0), units)
+    # spikes on bin centers are binned without loss
+    sts.spike_times = np.round(sts.spike_times, 3)
+
+    for window in ["psp", ("gaussian", 0.05)]:
+        np.testing.assert_allclose(
+            sts.to_sdf(window, method="events").values,
+            sts.to_sdf(window).values,
+            atol=1e-6,
+        )
+
+
+def test_indexed_select_matches_masks(tmp_path):
+    spikes, units, events = _spikes_and_events()
+    sts = SpikeTrainSet.from_arrays(spikes, events, (-0.5, 1.0), units)
+    indexed = SpikeTrainSet.from_arrays(spikes, events, (-0.5, 1.0), units).build_index()
+
+    def as_set(s):
+        return sorted(zip(s.unitids.tolist(), s.trialids.tolist(), s.spike_times.tolist()))
+
+    unit_ids = np.unique(sts.unitids)
+    trial_ids = np.unique(sts.trialids)
+    for kwargs in [
+        dict(units=unit_ids[1]),
+        dict(units=unit_ids[:2]),
+        dict(units=unit_ids[[0, 2]], trials=trial_ids[::3]),
+        dict(trials=trial_ids[1::2], time=(0.0, 0.5)),
+    ]:
+        assert as_set(indexed.select(**kwargs)) == as_set(sts.select(**kwargs))
+
+    # a single unit is a view of the sorted arrays
+    assert np.shares_memory(indexed.select(units=unit_ids[1]).spike_times, indexed.spike_times)
+    rows = list(indexed.iter_trials())
+    assert sum(len(times) for _, _, times in rows) == len(sts.spike_times)
+    assert [unit for unit, _ in indexed.iter_units()] == unit_ids.tolist()
+
+    path = tmp_path / "sts.zip"
+    indexed.save(path)
+    loaded = SpikeTrainSet.load(path)
+    np.testing.assert_array_equal(loaded.index.row_ptr, indexed.index.row_ptr)
+    np.testing.assert_array_equal(loaded.index.units, indexed.index.units)
+
+
+def test_load_memmaps_aligned_arrays_and_selected_units(tmp_path):
+    spikes, units, events = _spikes_and_events()
+    sts = SpikeTrainSet.from_arrays(spikes, events, (-0.5, 1.0), units).build_index()
+    path = tmp_path / "sts.zip"
+    sts.save(path, metadata_format="csv")
+
+    mapped = SpikeTrainSet.load(path, mmap=True)
+    assert isinstance(mapped.spike_times, np.memmap)
+    assert mapped.spike_times.offset % 4096 == 0
+    np.testing.assert_array_equal(mapped.spike_times, sts.spike_times)
+    np.testing.assert_array_equal(mapped.epochids, sts.epochids)
+
+    unit_ids = np.unique(sts.unitids)
+    for subset in [unit_ids[1], unit_ids[[0, 2]]]:
+        loaded = SpikeTrainSet.load(path, units=subset)
+        expected = sts.select(units=subset)
+        assert not isinstance(loaded.spike_times, np.memmap)
+        np.testing.assert_array_equal(loaded.spike_times, expected.spike_times)
+        np.testing.assert_array_equal(loaded.unitids, expected.unitids)
+        np.testing.assert_array_equal(loaded.index.row_ptr, expected.index.row_ptr)
+
+
+def test_save_parquet_metadata_keeps_dtypes(tmp_path):
+    import pandas as pd
+
+    pytest.importorskip("pyarrow")
+    spikes, units, events = _spikes_and_events()
+    n_trials = len(events)
+    metadata = pd.DataFrame(
+        {
+            "condition": pd.Categorical(np.array(["left", "right"])[np.arange(n_trials) % 2]),
+            "correct": np.arange(n_trials) % 3 > 0,
+            "rt": np.where(np.arange(n_trials) % 5 == 0, np.nan, 0.25),
+            "block": np.arange(n_trials, dtype=np.int16) // 10,
+            "label": [f"trial{idx}" for idx in range(n_trials)],
+            "start": pd.Timestamp("2024-01-01") + pd.to_timedelta(np.arange(n_trials), unit="s"),
+        },
+        index=pd.Index(np.arange(n_trials), name="trialid"),
+    )
+    sts = SpikeTrainSet.from_arrays(spikes, events, (-0.5, 1.0), units, np.arange(n_trials), trial_metadata=metadata)
+
+    sts.save(tmp_path / "default.zip")
+    sts.save(tmp_path / "parquet.zip", metadata_format="parquet")
+    for name in ["default.zip", "parquet.zip"]:
+        loaded = SpikeTrainSet.load(tmp_path / name)
+        pd.testing.assert_frame_equal(loaded.trial_metadata, sts.trial_metadata)
+        np.testing.assert_array_equal(loaded.spike_times, sts.spike_times)
+
+
+def test_concat_relabels_and_append_trials_grows_in_place():
+    spikes, units, events = _spikes_and_events()
+    a = SpikeTrainSet.from_arrays(spikes, events[:20], (-0.5, 1.0), units)
+    b = SpikeTrainSet.from_arrays(spikes, events[20:], (-0.5, 1.0), units)
+
+    merged, unit_table = SpikeTrainSet.concat([a, b], relabel="session", keys=["a", "b"], return_units=True)
+    assert merged.n_trials == a.n_trials + b.n_trials
+    assert merged.n_units == a.n_units + b.n_units
+    assert merged.epoch_names == a.epoch_names
+    assert merged.trial_metadata["session"].tolist() == ["a"] * a.n_trials + ["b"] * b.n_trials
+    assert unit_table["session_unitid"].tolist() == np.unique(a.unitids).tolist() + np.unique(b.unitids).tolist()
+    np.testing.assert_array_equal(merged.spike_times[: len(a.spike_times)], a.spike_times)
+
+    full = SpikeTrainSet.from_arrays(spikes, events, (-0.5, 1.0), units)
+    grown = SpikeTrainSet.from_arrays(spikes, events[:1], (-0.5, 1.0), units)
+    for trial in np.unique(full.trialids)[1:]:
+        in_trial = full.trialids == trial
+        grown.append_trials(
+            full.trialids[in_trial], full.unitids[in_trial], full.spike_times[in_trial], full.epochids[in_trial]
+        )
+    assert grown.n_trials == full.n_trials
+    assert sorted(zip(grown.trialids.tolist(), grown.unitids.tolist(), grown.spike_times.tolist())) == sorted(
+        zip(full.trialids.tolist(), full.unitids.tolist(), full.spike_times.tolist())
+    )
+    assert grown.spike_times.base is grown._buffers["spike_times"]
+
+
+def test_firing_rates_in_many_windows_match_single_windows():
+    spikes, units, events = _spikes_and_events()
+    sts = SpikeTrainSet.from_arrays(spikes, events, (-0.5, 1.0), units)
+    # a spike on a window edge is counted by both windows sharing it
+    sts.spike_times[:10] = 0.25
+
+    windows = [(-0.5, 0.25), (0.25, 1.0), (0.0, 0.5), (-0.1, 0.9)]
+    rates = sts.get_firing_rates(windows=windows)
+    assert rates.dims == ("trialid", "unitid", "epoch", "window")
+    for i, window in enumerate(windows):
+        expected = sts.to_psth(time_bins=window) / (window[1] - window[0])
+        np.testing.assert_allclose(rates.isel(window=i).values, expected.values[..., 0])
+
+    sliding = sts.get_firing_rates(width=0.5, step=0.25)
+    np.testing.assert_allclose(sliding.window_start, [-0.5, -0.25, 0.0, 0.25, 0.5])
+
+
+def test_condition_psth_matches_groupby_mean():
+    import pandas as pd
+
+    spikes, units, events = _spikes_and_events()
+    n_trials = len(events)
+    metadata = pd.DataFrame(
+        {
+            "a": np.arange(n_trials) % 3,
+            "b": (np.arange(n_trials) // 3) % 2,
+            "c": np.where(np.arange(n_trials) % 7 == 0, np.nan, np.arange(n_trials) % 2),
+        }
+    )
+    sts = SpikeTrainSet.from_arrays(spikes, events, (-0.5, 1.0), units, np.arange(n_trials), trial_metadata=metadata)
+    psth = sts.to_psth(time_step=0.1)
+
+    for by in ["a", "c", ["a", "b"]]:
+        expected = psth.groupby(by).mean()
+        result = sts.condition_psth(by, time_step=0.1, sem=True)
+        assert result["mean"].dims == expected.dims
+        np.testing.assert_allclose(result["mean"].values, expected.values, atol=1e-12)
+        sem = psth.groupby(by).std() / np.sqrt(psth.groupby(by).count())
+        np.testing.assert_allclose(result["sem"].values, sem.values, atol=1e-12)
+
+    np.testing.assert_allclose(sts.condition_psth(time_step=0.1).values, psth.mean("trialid").values, atol=1e-12)
+
+
+def test_plotting_data_codes_trials_once_per_trial():
+    import pandas as pd
+
+    pytest.importorskip("matplotlib")
+    spikes, units, events = _spikes_and_events()
+    n_trials = len(events)
+    metadata = pd.DataFrame(
+        {"a": np.arange(n_trials) % 3, "b": np.where(np.arange(n_trials) % 7 == 0, np.nan, 1.0)}
+    )
+    sts = SpikeTrainSet.from_arrays(spikes, events, (-0.5, 1.0), units, np.arange(n_trials), trial_metadata=metadata)
+
+    output, psth, palette = sts.get_plotting_data(group=["a", "b"])
+    colors = output.attrs["colors"]
+    assert colors.shape == (len(sts.spike_times), 4) and colors.dtype == np.float32
+    groups = metadata.loc[sts.trialids]
+    missing = groups["b"].isna().values
+    np.testing.assert_array_equal(output["groupids"].values[missing], -1)
+    np.testing.assert_array_equal(output["groupids"].values[~missing], groups["a"].values[~missing])
+    np.testing.assert_array_equal(colors[missing], [[0, 0, 0, 1]] * missing.sum())
+    assert len(palette) == 3
+
+
+def test_isi_statistics_match_single_train_functions():
+    import scipy.stats
+
+    from simianpy.analysis.spiketrain import CV, ISI, LV
+
+    spikes, units, events = _spikes_and_events()
+    sts = SpikeTrainSet.from_arrays(spikes, events, (-0.5, 1.0), units)
+    per_trial = sts.isi_statistics(by="trial")
+    per_unit = sts.isi_statistics(by="unit")
+
+    for unit in np.unique(sts.unitids):
+        pooled = []
+        for trial in np.unique(sts.trialids):
+            in_train = (sts.unitids == unit) & (sts.trialids == trial) & (sts.epochids == 0)
+            isi = ISI(np.sort(sts.spike_times[in_train]))
+            pooled.append(isi)
+            if isi.size > 2:
+                result = per_trial.sel(unitid=unit, trialid=trial, epoch="0")
+                np.testing.assert_allclose(float(result.cv), CV(isi))
+                np.testing.assert_allclose(float(result.lv), LV(isi))
+        pooled = np.concatenate(pooled)
+        result = per_unit.sel(unitid=unit, epoch="0")
+        assert int(result.n_isi) == pooled.size
+        shape, _, scale = scipy.stats.gamma.fit(pooled, floc=0)
+        np.testing.assert_allclose([float(result.gamma_shape), float(result.gamma_scale)], [shape, scale], rtol=1e-4)
+
+
+@pytest.mark.parametrize("units", [[], [99], [1, 99], [3, 0, 3]])
+def test_indexed_select_and_load_ignore_missing_units(tmp_path, units):
+    spikes, unitids, events = _spikes_and_events()
+    sts = SpikeTrainSet.from_arrays(spikes, events, (-0.5, 1.0), unitids)
+    indexed = SpikeTrainSet.from_arrays(spikes, events, (-0.5, 1.0), unitids).build_index()
+    indexed.save(tmp_path / "indexed.zip")
+    sts.save(tmp_path / "plain.zip")
+
+    def as_set(s):
+        return sorted(zip(s.unitids.tolist(), s.trialids.tolist(), s.spike_times.tolist()))
+
+    expected = as_set(sts.select(units=units))
+    assert len(expected) == np.isin(sts.unitids, units).sum()
+    assert as_set(indexed.select(units=units)) == expected
+    assert as_set(indexed.select(units=units, trials=[0, 1, 2])) == as_set(sts.select(units=units, trials=[0, 1, 2]))
+    assert as_set(SpikeTrainSet.load(tmp_path / "indexed.zip", units=units)) == expected
+    assert as_set(SpikeTrainSet.load(tmp_path / "plain.zip", units=units)) == expected
+
+
+@pytest.mark.parametrize("epochs", [[], ["missing"]])
+def test_no_known_epochs_give_an_empty_epoch_axis(epochs):
+    import pandas as pd
+
+    spikes, units, events = _spikes_and_events()
+    metadata = pd.DataFrame({"a": np.arange(len(events)) % 3})
+    sts = SpikeTrainSet.from_arrays(spikes, events, (-0.5, 1.0), units, np.arange(len(events)), trial_metadata=metadata)
+
+    results = [
+        sts.to_psth(time_step=0.1, epochs=epochs),
+        sts.to_sdf(epochs=epochs),
+        sts.get_firing_rates(epochs=epochs),
+        sts.condition_psth("a", time_step=0.1, epochs=epochs),
+        sts.isi_statistics(epochs=epochs),
+    ]
+    for result in results:
+        assert result.sizes["epoch"] == 0
+    # unknown epochs are ignored alongside known ones
+    np.testing.assert_array_equal(
+        sts.to_psth(time_step=0.1, epochs=["1"] + epochs).values,
+        sts.to_psth(time_step=0.1, epochs=["1"]).values,
+    )
+
+
+def test_trials_without_selected_spikes_are_zero_rows():
+    # trial 2 only has spikes of unit 1 in epoch '1'
+    sts = SpikeTrainSet(
+        trialids=np.array([0, 0, 1, 1, 2]),
+        unitids=np.array([0, 1, 0, 0, 1]),
+        spike_times=np.array([0.1, 0.2, 0.3, 0.4, 0.5]),
+        window=(0.0, 1.0),
+        epochids=np.array([0, 0, 0, 1, 1]),
+        epoch_names=["0", "1"],
+    )
+
+    for psth in [sts.to_psth(time_step=0.5, epochs=["0"]), sts.to_psth(time_step=0.5, units=[0])]:
+        np.testing.assert_array_equal(psth.trialid, [0, 1, 2])
+        np.testing.assert_array_equal(psth.unitid, [0, 1] if psth.sizes["unitid"] == 2 else [0])
+        np.testing.assert_array_equal(psth.sel(trialid=2).values, 0)
+    np.testing.assert_array_equal(sts.to_psth(time_step=0.5, epochs=["0"]).epoch, ["0"])
+    # a unit without spikes in the selected epochs is kept, as are all named epochs
+    psth = sts.to_psth(time_step=0.5, trials=[1])
+    np.testing.assert_array_equal(psth.unitid, [0, 1])
+    np.testing.assert_array_equal(psth.epoch, ["0", "1"])
+    assert int(psth.sum()) == 2
+
+    rates = sts.get_firing_rates(epochs=["0"])
+    np.testing.assert_array_equal(rates.trialid, [0, 1, 2])
+    mean = sts.to_psth(time_step=0.5, units=[0]).sum("time").mean("trialid")
+    np.testing.assert_allclose(mean.values.ravel(), [2 / 3, 1 / 3])
+    np.testing.assert_array_equal(sts.isi_statistics(by="trial", units=[0]).trialid, [0, 1, 2])
+
+
+def test_condition_psth_counts_trials_without_selected_spikes():
+    import pandas as pd
+
+    # condition 'a' has 3 trials but only one spike of unit 0
+    sts = SpikeTrainSet(
+        trialids=np.array([0, 1, 1, 2, 3, 4]),
+        unitids=np.array([0, 1, 1, 1, 0, 0]),
+        spike_times=np.array([0.1, 0.2, 0.3, 0.6, 0.7, 0.8]),
+        window=(0.0, 1.0),
+        trial_metadata=pd.DataFrame({"c": ["a", "a", "a", "b", "b"]}),
+        epochids=np.array([0, 0, 1, 1, 0, 1]),
+        epoch_names=["0", "1"],
+    )
+
+    for subset in [dict(units=[0]), dict(epochs=["1"]), dict(units=[0], epochs=["0"]), dict(trials=[0, 1, 3])]:
+        result = sts.condition_psth("c", time_step=0.5, sem=True, **subset)
+        psth = sts.to_psth(time_step=0.5, **subset)
+        np.testing.assert_array_equal(result["n_trials"], [(psth.c == "a").sum(), (psth.c == "b").sum()])
+        np.testing.assert_allclose(result["mean"].values, psth.groupby("c").mean().values, atol=1e-12)
+        sem = psth.groupby("c").std() / np.sqrt(psth.groupby("c").count())
+        np.testing.assert_allclose(result["sem"].values, sem.values, atol=1e-12)
+    result = sts.condition_psth("c", time_step=0.5, units=[0])
+    np.testing.assert_allclose(result.sel(c="a").sum().item(), 1 / 3)
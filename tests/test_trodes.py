@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from simianpy.io import TrodesRec
+
+HEADER = """<?xml version="1.0"?>
+<Configuration>
+ <HardwareConfiguration samplingRate="1000" numChannels="4" sysTimeIncluded="{sys_time}">
+  <Device name="MCU_IO" numBytes="2">
+   <Channel id="Din1" dataType="digital" startByte="1" bit="0"/>
+   <Channel id="Din3" dataType="digital" startByte="1" bit="2"/>
+  </Device>
+  <Device name="headstageSensor" numBytes="2">
+   <Channel id="Accel" dataType="analog" startByte="0"/>
+  </Device>
+ </HardwareConfiguration>
+ <SpikeConfiguration>
+  <SpikeNTrode id="1">
+   <SpikeChannel hwChan="2"/>
+   <SpikeChannel hwChan="0"/>
+  </SpikeNTrode>
+  <SpikeNTrode id="2">
+   <SpikeChannel hwChan="3"/>
+   <SpikeChannel hwChan="1"/>
+  </SpikeNTrode>
+ </SpikeConfiguration>
+</Configuration>
+"""
+
+
+def _write_rec(path, sys_time, n_packets=40):
+    """Synthetic '.rec' file: XML header followed by packets of
+    sync byte, 2 DIO bytes, 2 auxiliary bytes, timestamp, [system time], 4 channels"""
+    fields = [("sync", "u1"), ("dio", "u1", 2), ("accel", "<i2"), ("timestamp", "<u4")]
+    if sys_time:
+        fields.append(("system_time", "<i8"))
+    fields.append(("analog", "<i2", 4))
+    packets = np.zeros(n_packets, dtype=np.dtype(fields))
+    packets["sync"] = 0x55
+    packets["timestamp"] = 1000 + 2 * np.arange(n_packets)
+    packets["accel"] = -np.arange(n_packets)
+    if sys_time:
+        packets["system_time"] = -1
+    packets["analog"] = np.arange(n_packets * 4).reshape(n_packets, 4) - 50
+    # Din1 high from packet 9 to 20: the changes fall on either side of a
+    # chunk boundary (10) and exactly on the next one (20)
+    din1 = np.zeros(n_packets, dtype=np.uint8)
+    din1[9:20] = 1
+    # Din3 starts high and goes low at 30; bit 1 is unrelated noise
+    din3 = (np.arange(n_packets) < 30).astype(np.uint8)
+    packets["dio"][:, 1] = din1 | (din3 << 2) | ((np.arange(n_packets) % 2) << 1).astype(np.uint8)
+    packets["dio"][:, 0] = 0xFF
+    with open(path, "wb") as f:
+        f.write(HEADER.format(sys_time=int(sys_time)).encode())
+        f.write(packets.tobytes())
+    return packets
+
+
+@pytest.mark.parametrize("sys_time", [False, True])
+def test_rec_packet_fields(tmp_path, sys_time):
+    packets = _write_rec(tmp_path / "session.rec", sys_time)
+
+    with TrodesRec(tmp_path / "session.rec") as rec:
+        assert rec.packet_size == packets.dtype.itemsize
+        assert rec.n_samples == packets.size and rec.n_channels == 4
+        assert rec.sampling_rate == 1000.0
+        np.testing.assert_array_equal(rec.timestamps, packets["timestamp"])
+        np.testing.assert_array_equal(rec.auxiliary["Accel"], packets["accel"])
+        np.testing.assert_array_equal(rec.get_times(5, 8), packets["timestamp"][5:8] / 1000.0)
+
+        # channels ordered by ntrode, i.e. by hwChan
+        np.testing.assert_array_equal(rec.channels, [2, 0, 3, 1])
+        np.testing.assert_array_equal(rec.analog[:, :], packets["analog"][:, [2, 0, 3, 1]])
+        np.testing.assert_array_equal(rec.analog[3:6, 1], packets["analog"][3:6, 0])
+        np.testing.assert_array_equal(rec.get_traces(10, 15, channels=[3, 0]), packets["analog"][10:15, [1, 2]])
+
+    with TrodesRec(tmp_path / "session.rec", channel_order="hardware") as rec:
+        np.testing.assert_array_equal(rec.get_traces(), packets["analog"])
+
+
+@pytest.mark.parametrize("chunksize", [10, 7, 1000])
+def test_rec_dio_changes_across_chunks(tmp_path, chunksize):
+    packets = _write_rec(tmp_path / "session.rec", sys_time=False)
+    timestamps = packets["timestamp"]
+
+    with TrodesRec(tmp_path / "session.rec", chunksize=chunksize) as rec:
+        on, off = rec.get_dio_data("Din1")
+        # the initial (low) state is reported at the first packet
+        np.testing.assert_array_equal(on, timestamps[[9]])
+        np.testing.assert_array_equal(off, timestamps[[0, 20]])
+        on, off = rec.get_dio_data("Din3")
+        np.testing.assert_array_equal(on, timestamps[[0]])
+        np.testing.assert_array_equal(off, timestamps[[30]])